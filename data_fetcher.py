@@ -1,9 +1,84 @@
 from binance.client import Client
+import aiohttp
+import asyncio
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-# Initialize Binance Client
+# Initialize Binance Client.
+# The client is process-global: its requests.Session (and pooled keep-alive
+# connections) is reused by every sync fallback call in this process.
 client = Client()
+client.session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+))
+
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+KLINES_LIMIT = 1000  # Max klines Binance returns per request
+MAX_CONCURRENT_REQUESTS = 5
+
+# Kline interval lengths in milliseconds
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000, '3d': 259_200_000,
+    '1w': 604_800_000, '1M': 2_592_000_000
+}
+
+async def _fetch_window(session, sem, symbol, interval, start_ms, end_ms):
+    """Fetch a single window of at most KLINES_LIMIT klines"""
+    params = {
+        'symbol': symbol,
+        'interval': interval,
+        'startTime': start_ms,
+        'endTime': end_ms,
+        'limit': KLINES_LIMIT
+    }
+    async with sem:
+        async with session.get(KLINES_URL, params=params) as response:
+            response.raise_for_status()
+            return await response.json()
+
+async def _fetch_all_windows(symbol, interval, windows):
+    """Fetch all windows concurrently over one shared connection pool"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    timeout = aiohttp.ClientTimeout(total=30)
+    connector = aiohttp.TCPConnector(limit=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        return await asyncio.gather(*[
+            _fetch_window(session, sem, symbol, interval, start_ms, end_ms)
+            for start_ms, end_ms in windows
+        ])
+
+def _fetch_klines(symbol, interval, start_date, end_date):
+    """Split the date range into fixed windows and fetch them in parallel.
+    Returns [open_time, open, high, low, close, volume] rows sorted by open time."""
+    start_ms = int(start_date.timestamp() * 1000)
+    end_ms = int(end_date.timestamp() * 1000)
+    window_ms = KLINES_LIMIT * INTERVAL_MS[interval]
+    windows = [(t, min(t + window_ms - 1, end_ms)) for t in range(start_ms, end_ms, window_ms)]
+    
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        results = asyncio.run(_fetch_all_windows(symbol, interval, windows))
+    else:
+        # Already inside an event loop (e.g. notebook) - use the sync client
+        klines = client.get_historical_klines(
+            symbol=symbol,
+            interval=interval,
+            start_str=start_ms,
+            end_str=end_ms
+        )
+        return [kline[:6] for kline in klines]
+    
+    # Concatenate windows, drop duplicates by open time and keep only the OHLCV fields
+    unique = {kline[0]: kline[:6] for window in results for kline in window}
+    return [unique[open_time] for open_time in sorted(unique)]
 
 def fetch_binance_data(symbol="BTCUSDT", interval="1h", days=220):
     """
@@ -22,45 +97,24 @@ def fetch_binance_data(symbol="BTCUSDT", interval="1h", days=220):
         start_date = end_date - timedelta(days=days)
         
         # Fetch klines (candlestick data)
-        klines = client.get_historical_klines(
-            symbol=symbol,
-            interval=interval,
-            start_str=start_date.strftime("%d %b, %Y"),
-            end_str=end_date.strftime("%d %b, %Y")
-        )
+        klines = _fetch_klines(symbol, interval, start_date, end_date)
         
-        # Convert to DataFrame
-        df = pd.DataFrame(klines, columns=[
-            'Open Time', 'Open', 'High', 'Low', 'Close', 'Volume',
-            'Close Time', 'Quote Asset Volume', 'Number of Trades',
-            'Taker Buy Base Asset Volume', 'Taker Buy Quote Asset Volume', 'Ignore'
-        ])
-        
-        # Convert data types
-        numeric_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-        
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col])
+        # Convert the raw string klines to typed arrays in one pass
+        arr = np.asarray(klines)
+        open_time = arr[:, 0].astype(np.int64)
+        ohlcv = arr[:, 1:].astype(np.float64)
         
-        # Convert timestamp to datetime
-        df['Open Time'] = pd.to_datetime(df['Open Time'], unit='ms')
-        df['Close Time'] = pd.to_datetime(df['Close Time'], unit='ms')
-        
-        # Rename columns to match standard format
-        df = df.rename(columns={
-            'Open Time': 'Datetime',
-            'Open': 'Open',
-            'High': 'High', 
-            'Low': 'Low',
-            'Close': 'Close',
-            'Volume': 'Volume'
+        df = pd.DataFrame({
+            'Datetime': pd.to_datetime(open_time, unit='ms'),
+            'Open': ohlcv[:, 0],
+            'High': ohlcv[:, 1],
+            'Low': ohlcv[:, 2],
+            'Close': ohlcv[:, 3],
+            'Volume': ohlcv[:, 4]
         })
         
-        # Select and reorder columns
-        df = df[['Datetime', 'Open', 'High', 'Low', 'Close', 'Volume']]
-        
         print(f"✅ Successfully fetched {len(df)} records")
-        print(f"📅 Date range: {df['Datetime'].min()} to {df['Datetime'].max()}")
+        print(f"📅 Date range: {df['Datetime'].iloc[0]} to {df['Datetime'].iloc[-1]}")
         print(f"💰 Price range: ${df['Close'].min():.2f} - ${df['Close'].max():.2f}")
         
         return df
@@ -69,10 +123,10 @@ def fetch_binance_data(symbol="BTCUSDT", interval="1h", days=220):
         print(f"❌ Error fetching data: {e}")
         return None
 
-def save_to_csv(df, symbol="BTCUSDT"):
-    """Save DataFrame to CSV"""
-    filename = f"binance_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    df.to_csv(filename, index=False)
+def save_to_parquet(df, symbol="BTCUSDT"):
+    """Save DataFrame to Parquet"""
+    filename = f"binance_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+    df.to_parquet(filename, engine='pyarrow', compression='snappy', index=False)
     print(f"💾 Data saved to: {filename}")
     return filename
 
@@ -106,8 +160,8 @@ if __name__ == "__main__":
         # Display summary
         display_data_summary(btc_data)
         
-        # Save to CSV
-        save_to_csv(btc_data)
+        # Save to Parquet
+        save_to_parquet(btc_data)
         
         print(f"\n🎉 Data fetching completed successfully!")
     else:
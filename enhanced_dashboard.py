@@ -4,11 +4,15 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
 from datetime import datetime, timedelta
 import os
 import json
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -49,6 +53,66 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Backtest data files (legacy Parquet/CSV files are still read if the preferred file is missing)
+TRADES_PATH = "data/backtest_trading_history.parquet"
+PORTFOLIO_PATH = "data/backtest_portfolio_history.parquet"
+MARKET_PATH = "data/backtest_market_data.arrow"
+PERFORMANCE_PATH = "data/backtest_performance.json"
+LEGACY_EXTENSIONS = ('.parquet', '.csv')
+DOWNCAST_COLUMNS = ('price', 'trade_amount', 'position_size', 'cash', 'btc_holdings', 'btc_value', 'total_value')
+
+def resolve_data_path(path):
+    """Return the preferred path if it exists, otherwise the first legacy file found"""
+    if os.path.exists(path):
+        return path
+    base = os.path.splitext(path)[0]
+    for ext in LEGACY_EXTENSIONS:
+        if os.path.exists(base + ext):
+            return base + ext
+    return None
+
+def read_data_file(path, date_column):
+    """Read an Arrow IPC/Parquet file, or a legacy CSV file with its timestamp column parsed"""
+    if path.endswith('.arrow'):
+        # Memory-map the Arrow IPC file so the OS page cache serves repeated reloads
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+    
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    
+    # Multi-threaded pyarrow parser, timestamps parsed while reading
+    return pd.read_csv(path, engine='pyarrow', parse_dates=[date_column])
+
+def downcast_numeric(df):
+    """Shrink dashboard value columns to float32 / the smallest integer type where the values survive the cast"""
+    for col in DOWNCAST_COLUMNS:
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            downcast = 'integer' if pd.api.types.is_integer_dtype(df[col]) else 'float'
+            df[col] = pd.to_numeric(df[col], downcast=downcast)
+    return df
+
+@st.cache_data(show_spinner=False)
+def _load_cached(paths, mtimes):
+    """Read the backtest files; mtimes are part of the cache key so rewritten files are reloaded"""
+    trades_path, portfolio_path, market_path, performance_path = paths
+    
+    # Load data (Parquet keeps the timestamp dtypes, no re-parsing needed)
+    trades_df = read_data_file(trades_path, 'timestamp')
+    # Low-cardinality labels are dictionary-encoded so filters and groupbys work on int codes
+    for col in ('action', 'decision_source'):
+        trades_df[col] = trades_df[col].astype('category')
+    portfolio_df = read_data_file(portfolio_path, 'timestamp')
+    market_df = read_data_file(market_path, 'Datetime')
+    for df in (trades_df, portfolio_df, market_df):
+        downcast_numeric(df)
+    
+    # Load performance
+    with open(performance_path, 'r') as f:
+        performance_data = json.load(f)
+    
+    return trades_df, portfolio_df, market_df, performance_data
+
 def load_backtest_data():
     """Load backtest data with error handling"""
     try:
@@ -57,37 +121,27 @@ def load_backtest_data():
             st.error("❌ 'data' directory not found!")
             return None, None, None, None
         
-        # Load trading history
-        trades_path = "data/backtest_trading_history.csv"
-        portfolio_path = "data/backtest_portfolio_history.csv"
-        market_path = "data/backtest_market_data.csv"
-        performance_path = "data/backtest_performance.json"
+        # Locate backtest files
+        trades_path = resolve_data_path(TRADES_PATH)
+        portfolio_path = resolve_data_path(PORTFOLIO_PATH)
+        market_path = resolve_data_path(MARKET_PATH)
         
         # Check if files exist
         files_exist = all([
-            os.path.exists(trades_path), 
-            os.path.exists(portfolio_path),
-            os.path.exists(market_path),
-            os.path.exists(performance_path)
+            trades_path,
+            portfolio_path,
+            market_path,
+            os.path.exists(PERFORMANCE_PATH)
         ])
         
         if not files_exist:
             st.warning("📊 Backtest data not found. Run the backtest first.")
             return None, None, None, None
         
-        # Load data
-        trades_df = pd.read_csv(trades_path)
-        portfolio_df = pd.read_csv(portfolio_path)
-        market_df = pd.read_csv(market_path)
-        
-        # Convert timestamps
-        trades_df['timestamp'] = pd.to_datetime(trades_df['timestamp'])
-        portfolio_df['timestamp'] = pd.to_datetime(portfolio_df['timestamp'])
-        market_df['Datetime'] = pd.to_datetime(market_df['Datetime'])
-        
-        # Load performance
-        with open(performance_path, 'r') as f:
-            performance_data = json.load(f)
+        # Reuse the cached DataFrames until one of the files changes on disk
+        paths = (trades_path, portfolio_path, market_path, PERFORMANCE_PATH)
+        mtimes = tuple(os.path.getmtime(p) for p in paths)
+        trades_df, portfolio_df, market_df, performance_data = _load_cached(paths, mtimes)
         
         st.success(f"✅ Loaded {len(trades_df)} trades and {len(portfolio_df)} portfolio records!")
         return trades_df, portfolio_df, market_df, performance_data
@@ -100,69 +154,72 @@ def create_sample_backtest_data():
     """Create sample backtest data for demonstration"""
     st.warning("📊 Creating sample backtest data...")
     
-    # Create sample trades
-    sample_trades = []
+    rng = np.random.default_rng()
     current_time = datetime.now()
     
-    # Simulate 6 months of trading
-    for i in range(30):
-        action = 'BUY' if i % 3 == 0 else 'SELL' if i % 3 == 1 else 'HOLD'
-        if action != 'HOLD':
-            sample_trades.append({
-                'timestamp': current_time - timedelta(days=i*6),
-                'action': action,
-                'price': 85000 - i*500 + np.random.normal(0, 1000),
-                'position_size': np.random.choice([5, 10, 15]),
-                'trade_amount': 2000 + i*200,
-                'btc_traded': (2000 + i*200) / (85000 - i*500),
-                'reason': f'Sample {action} trade',
-                'decision_source': np.random.choice(['AI', 'RULES']),
-                'cash_before': 100000 - i*3000,
-                'btc_before': i*0.01,
-                'portfolio_value_before': 100000 + i*500,
-                'cash_after': 100000 - (i+1)*3000,
-                'btc_after': (i+1)*0.01,
-                'portfolio_value_after': 100000 + (i+1)*500,
-                'realized_profit': i*100
-            })
-    
-    trades_df = pd.DataFrame(sample_trades)
-    trades_df.to_csv('data/backtest_trading_history.csv', index=False)
+    # Create sample trades column-wise: 6 months of slots, every third slot is a HOLD (no trade)
+    i = np.arange(30)
+    i = i[i % 3 != 2]
+    is_buy = i % 3 == 0
+    trade_amount = 2000 + i * 200
+    
+    trades_df = pd.DataFrame({
+        'timestamp': current_time - pd.to_timedelta(i * 6, unit='D'),
+        'action': np.where(is_buy, 'BUY', 'SELL'),
+        'price': 85000 - i * 500 + rng.normal(0, 1000, len(i)),
+        'position_size': rng.choice([5, 10, 15], len(i)),
+        'trade_amount': trade_amount,
+        'btc_traded': trade_amount / (85000 - i * 500),
+        'reason': np.where(is_buy, 'Sample BUY trade', 'Sample SELL trade'),
+        'decision_source': rng.choice(['AI', 'RULES'], len(i)),
+        'cash_before': 100000 - i * 3000,
+        'btc_before': i * 0.01,
+        'portfolio_value_before': 100000 + i * 500,
+        'cash_after': 100000 - (i + 1) * 3000,
+        'btc_after': (i + 1) * 0.01,
+        'portfolio_value_after': 100000 + (i + 1) * 500,
+        'realized_profit': i * 100
+    })
+    trades_df.to_parquet(TRADES_PATH, compression='snappy', index=False)
     
     # Create sample portfolio history
-    sample_portfolio = []
-    for i in range(60):
-        sample_portfolio.append({
-            'timestamp': current_time - timedelta(days=i*3),
-            'price': 85000 - i*250 + np.random.normal(0, 500),
-            'cash': 100000 - i*1000,
-            'btc_holdings': i*0.005,
-            'btc_value': i*0.005 * (85000 - i*250),
-            'total_value': 100000 + i*250,
-            'realized_profit': i*50,
-            'unrealized_profit': i*250
-        })
-    
-    portfolio_df = pd.DataFrame(sample_portfolio)
-    portfolio_df.to_csv('data/backtest_portfolio_history.csv', index=False)
+    j = np.arange(60)
+    portfolio_df = pd.DataFrame({
+        'timestamp': current_time - pd.to_timedelta(j * 3, unit='D'),
+        'price': 85000 - j * 250 + rng.normal(0, 500, len(j)),
+        'cash': 100000 - j * 1000,
+        'btc_holdings': j * 0.005,
+        'btc_value': j * 0.005 * (85000 - j * 250),
+        'total_value': 100000 + j * 250,
+        'realized_profit': j * 50,
+        'unrealized_profit': j * 250
+    })
+    portfolio_df.to_parquet(PORTFOLIO_PATH, compression='snappy', index=False)
     
     # Create sample market data
-    dates = pd.date_range(start=current_time - timedelta(days=180), end=current_time, freq='H')
+    dates = pd.date_range(start=current_time - timedelta(days=180), end=current_time, freq='h')
+    n = len(dates)
+    
+    # One normal draw for every random walk, scaled per column: Open, Close, SMA_20, SMA_50, EMA_12
+    scales = np.array([100, 100, 80, 60, 90])
+    walks = 80000 + (rng.standard_normal((n, len(scales))) * scales).cumsum(axis=0)
+    open_prices, close_prices, sma_20, sma_50, ema_12 = walks.T
+    
     market_data = pd.DataFrame({
         'Datetime': dates,
-        'Open': 80000 + np.cumsum(np.random.normal(0, 100, len(dates))),
-        'High': 80000 + np.cumsum(np.random.normal(0, 100, len(dates))) + 200,
-        'Low': 80000 + np.cumsum(np.random.normal(0, 100, len(dates))) - 200,
-        'Close': 80000 + np.cumsum(np.random.normal(0, 100, len(dates))),
-        'Volume': np.random.uniform(1000, 5000, len(dates)),
-        'RSI_14': np.random.uniform(30, 70, len(dates)),
-        'SMA_20': 80000 + np.cumsum(np.random.normal(0, 80, len(dates))),
-        'SMA_50': 80000 + np.cumsum(np.random.normal(0, 60, len(dates))),
-        'EMA_12': 80000 + np.cumsum(np.random.normal(0, 90, len(dates))),
-        'MACD': np.random.normal(0, 50, len(dates)),
-        'ATR_14': np.random.uniform(800, 1200, len(dates))
+        'Open': open_prices,
+        'High': np.maximum(open_prices, close_prices) + 200,
+        'Low': np.minimum(open_prices, close_prices) - 200,
+        'Close': close_prices,
+        'Volume': rng.uniform(1000, 5000, n),
+        'RSI_14': rng.uniform(30, 70, n),
+        'SMA_20': sma_20,
+        'SMA_50': sma_50,
+        'EMA_12': ema_12,
+        'MACD': rng.normal(0, 50, n),
+        'ATR_14': rng.uniform(800, 1200, n)
     })
-    market_data.to_csv('data/backtest_market_data.csv', index=False)
+    feather.write_feather(market_data, MARKET_PATH, compression='uncompressed')
     
     # Create performance summary
     performance = {
@@ -179,75 +236,114 @@ def create_sample_backtest_data():
         'data_period': "6 months"
     }
     
-    with open('data/backtest_performance.json', 'w') as f:
+    with open(PERFORMANCE_PATH, 'w') as f:
         json.dump(performance, f, indent=2)
     
     st.success("✅ Sample backtest data created! Refresh to view dashboard.")
     return trades_df, portfolio_df, market_data, performance
 
-def run_backtest():
+def _run_job(label, target, script, timeout, use_subprocess=False):
+    """Run a job in-process on a worker thread, or as a separate script when use_subprocess=True"""
+    if use_subprocess:
+        result = subprocess.run([
+            sys.executable, script
+        ], capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        return True
+    
+    progress = st.progress(0.0, text=label)
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(target)
+    started = time.time()
+    try:
+        while not future.done():
+            elapsed = time.time() - started
+            if elapsed > timeout:
+                raise TimeoutError(f"{label} timed out")
+            progress.progress(min(elapsed / timeout, 0.99), text=f"{label} ({elapsed:.0f}s)")
+            time.sleep(0.1)
+        progress.progress(1.0, text=label)
+        return future.result()
+    finally:
+        # A timed-out worker thread cannot be killed; let it finish in the background
+        executor.shutdown(wait=False)
+
+def _run_backtest_job():
+    from optimized_backtest import run_optimized_backtest
+    return run_optimized_backtest()
+
+def _run_trading_system_job():
+    from trading_system import RealTradingSystem
+    with RealTradingSystem() as system:
+        return system.run_complete_system()
+
+def _force_trades_job():
+    from scripts.force_trades import force_trading_activity
+    force_trading_activity()
+    return True
+
+def run_backtest(use_subprocess=False):
     """Run the backtest system"""
     try:
         st.info("🚀 Running 6-month backtest with Gemma AI...")
         
-        # Run the backtest script
-        result = subprocess.run([
-            sys.executable, "enhanced_backtest.py"
-        ], capture_output=True, text=True, timeout=300)
+        result = _run_job("Running backtest", _run_backtest_job,
+                          "optimized_backtest.py", 300, use_subprocess)
         
-        if result.returncode == 0:
+        if result is not None:
             st.success("✅ Backtest completed successfully!")
             st.rerun()
         else:
-            st.error(f"❌ Backtest failed: {result.stderr}")
+            st.error("❌ Backtest failed: could not fetch market data")
             
-    except subprocess.TimeoutExpired:
+    except (subprocess.TimeoutExpired, TimeoutError):
         st.error("❌ Backtest timed out after 5 minutes")
     except Exception as e:
         st.error(f"❌ Error running backtest: {e}")
 
-def run_trading_system():
+def run_trading_system(use_subprocess=False):
     """Run the live trading system"""
     try:
         st.info("🔴 Starting live trading system...")
         
-        result = subprocess.run([
-            sys.executable, "main.py"
-        ], capture_output=True, text=True, timeout=180)
+        result = _run_job("Running trading system", _run_trading_system_job,
+                          "trading_system.py", 180, use_subprocess)
         
-        if result.returncode == 0:
+        if result:
             st.success("✅ Trading system completed!")
         else:
-            st.error(f"❌ Trading system failed: {result.stderr}")
+            st.error("❌ Trading system failed, check the logs")
             
-    except subprocess.TimeoutExpired:
+    except (subprocess.TimeoutExpired, TimeoutError):
         st.error("❌ Trading system timed out")
     except Exception as e:
         st.error(f"❌ Error: {e}")
 
-def force_test_trades():
+def force_test_trades(use_subprocess=False):
     """Force test trades for dashboard data"""
     try:
         st.info("⚡ Forcing test trades...")
         
-        result = subprocess.run([
-            sys.executable, "force_trades.py"
-        ], capture_output=True, text=True, timeout=60)
+        _run_job("Forcing test trades", _force_trades_job,
+                 os.path.join("scripts", "force_trades.py"), 60, use_subprocess)
         
-        if result.returncode == 0:
-            st.success("✅ Test trades created!")
-            st.rerun()
-        else:
-            st.error(f"❌ Failed: {result.stderr}")
+        st.success("✅ Test trades created!")
+        st.rerun()
             
     except Exception as e:
         st.error(f"❌ Error: {e}")
 
+@st.cache_resource
+def get_trading_system():
+    """Create the trading system (and its HTTP session) once per process"""
+    from trading_system import RealTradingSystem
+    return RealTradingSystem()
+
 def send_daily_report():
     """Send daily trading report"""
     try:
-        from trading_system import RealTradingSystem
-        system = RealTradingSystem()
+        system = get_trading_system()
         system.get_market_data_for_dashboard()
         success = system.send_daily_report()
         if success:
@@ -257,6 +353,154 @@ def send_daily_report():
     except Exception as e:
         st.sidebar.error(f"❌ Error: {e}")
 
+@st.cache_data(show_spinner=False)
+def build_portfolio_fig(timestamps, total_value, buy_times=None, buy_y=None, sell_times=None, sell_y=None):
+    """Portfolio value chart with optional buy/sell markers"""
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=timestamps,
+        y=total_value,
+        mode='lines+markers',
+        name='Portfolio Value',
+        line=dict(color='#00D4AA', width=3),
+        fill='tozeroy',
+        fillcolor='rgba(0, 212, 170, 0.1)'
+    ))
+    
+    if buy_times is not None:
+        fig.add_trace(go.Scattergl(
+            x=buy_times,
+            y=buy_y,
+            mode='markers',
+            name='BUY Signals',
+            marker=dict(color='#00D4AA', size=10, symbol='triangle-up')
+        ))
+    
+    if sell_times is not None:
+        fig.add_trace(go.Scattergl(
+            x=sell_times,
+            y=sell_y,
+            mode='markers',
+            name='SELL Signals',
+            marker=dict(color='#FF4B4B', size=10, symbol='triangle-down')
+        ))
+    
+    fig.update_layout(
+        title='Portfolio Value Over Time with Trade Signals',
+        height=500,
+        xaxis_title='Date',
+        yaxis_title='Portfolio Value ($)',
+        template='plotly_white',
+        showlegend=True
+    )
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_profit_pie(realized_profit, unrealized_profit):
+    """Realized vs unrealized profit pie"""
+    profit_df = pd.DataFrame({
+        'Type': ['Realized Profit', 'Unrealized Profit'],
+        'Amount': [realized_profit, unrealized_profit]
+    })
+    
+    fig = px.pie(
+        profit_df, 
+        values='Amount', 
+        names='Type',
+        color='Type',
+        color_discrete_map={
+            'Realized Profit': '#00D4AA',
+            'Unrealized Profit': '#FFA726'
+        }
+    )
+    fig.update_layout(title='Profit Distribution')
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_allocation_pie(cash, btc_value):
+    """Current cash vs bitcoin allocation pie"""
+    allocation_df = pd.DataFrame({
+        'Asset': ['Cash', 'Bitcoin'],
+        'Value': [cash, btc_value]
+    })
+    
+    fig = px.pie(
+        allocation_df, 
+        values='Value', 
+        names='Asset',
+        color='Asset',
+        color_discrete_map={'Cash': '#4CAF50', 'Bitcoin': '#FF9800'}
+    )
+    fig.update_layout(title='Current Portfolio Allocation')
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_composition_fig(timestamps, cash, btc_value):
+    """Stacked cash / bitcoin value over time"""
+    fig = go.Figure()
+    
+    # WebGL traces have no stackgroup, so stack by hand: bitcoin is drawn on top of cash
+    fig.add_trace(go.Scattergl(
+        x=timestamps,
+        y=cash,
+        mode='lines',
+        name='Cash',
+        fill='tozeroy',
+        line=dict(color='#4CAF50', width=2)
+    ))
+    
+    fig.add_trace(go.Scattergl(
+        x=timestamps,
+        y=np.asarray(cash) + np.asarray(btc_value),
+        customdata=btc_value,
+        mode='lines',
+        name='Bitcoin Value',
+        fill='tonexty',
+        line=dict(color='#FF9800', width=2),
+        hovertemplate='%{customdata:$,.2f}<extra>Bitcoin Value</extra>'
+    ))
+    
+    fig.update_layout(
+        title='Portfolio Composition Over Time',
+        height=400,
+        xaxis_title='Date',
+        yaxis_title='Value ($)',
+        template='plotly_white'
+    )
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_btc_holdings_fig(timestamps, btc_holdings):
+    """BTC holdings over time"""
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=timestamps,
+        y=btc_holdings,
+        mode='lines',
+        name='BTC Holdings',
+        line=dict(color='#FF9800', width=3)
+    ))
+    
+    fig.update_layout(
+        title='Bitcoin Holdings Over Time',
+        height=300,
+        xaxis_title='Date',
+        yaxis_title='BTC Amount',
+        template='plotly_white'
+    )
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_decision_pie(decision_counts):
+    """AI vs rule-based decision share"""
+    return px.pie(
+        values=decision_counts.values,
+        names=decision_counts.index,
+        title='AI vs Rule-Based Decisions',
+        color=decision_counts.index,
+        color_discrete_map={'AI': '#00D4AA', 'RULES': '#FFA726'}
+    )
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">🚀 Bitcoin AI Trading Dashboard</h1>', unsafe_allow_html=True)
@@ -278,7 +522,7 @@ def main():
             
             1. **Run the 6-month backtest:**
                ```bash
-               python enhanced_backtest.py
+               python optimized_backtest.py
                ```
             
             2. **Or click the button above to create sample data**
@@ -287,6 +531,15 @@ def main():
             """)
             return
     
+    # Split trades by action once, reused by every tab
+    trade_groups = {action: group for action, group in trades_df.groupby('action', observed=True, sort=False)}
+    buy_trades = trade_groups.get('BUY', trades_df.iloc[:0])
+    sell_trades = trade_groups.get('SELL', trades_df.iloc[:0])
+    
+    # Latest portfolio snapshot as plain scalars, reused by the allocation/profit charts
+    has_portfolio = portfolio_df is not None and len(portfolio_df) > 0
+    latest = portfolio_df.iloc[-1].to_dict() if has_portfolio else {}
+    
     # Display performance metrics
     col1, col2, col3, col4, col5 = st.columns(5)
     
@@ -343,51 +596,27 @@ def main():
     with tab1:
         st.subheader("Portfolio Performance Analysis")
         
-        if portfolio_df is not None and len(portfolio_df) > 0:
-            # Portfolio value chart
-            fig1 = go.Figure()
-            fig1.add_trace(go.Scatter(
-                x=portfolio_df['timestamp'],
-                y=portfolio_df['total_value'],
-                mode='lines+markers',
-                name='Portfolio Value',
-                line=dict(color='#00D4AA', width=3),
-                fill='tozeroy',
-                fillcolor='rgba(0, 212, 170, 0.1)'
-            ))
+        if has_portfolio:
+            buy_times = buy_y = sell_times = sell_y = None
             
             # Add buy/sell markers
             if trades_df is not None and len(trades_df) > 0:
-                buy_trades = trades_df[trades_df['action'] == 'BUY']
-                sell_trades = trades_df[trades_df['action'] == 'SELL']
-                
-                fig1.add_trace(go.Scatter(
-                    x=buy_trades['timestamp'],
-                    y=[portfolio_df[portfolio_df['timestamp'] <= t].iloc[-1]['total_value'] 
-                       if len(portfolio_df[portfolio_df['timestamp'] <= t]) > 0 else final_value 
-                       for t in buy_trades['timestamp']],
-                    mode='markers',
-                    name='BUY Signals',
-                    marker=dict(color='#00D4AA', size=10, symbol='triangle-up')
-                ))
+                buy_times = buy_trades['timestamp'].sort_values()
+                sell_times = sell_trades['timestamp'].sort_values()
                 
-                fig1.add_trace(go.Scatter(
-                    x=sell_trades['timestamp'],
-                    y=[portfolio_df[portfolio_df['timestamp'] <= t].iloc[-1]['total_value'] 
-                       if len(portfolio_df[portfolio_df['timestamp'] <= t]) > 0 else final_value 
-                       for t in sell_trades['timestamp']],
-                    mode='markers',
-                    name='SELL Signals',
-                    marker=dict(color='#FF4B4B', size=10, symbol='triangle-down')
-                ))
-            
-            fig1.update_layout(
-                title='Portfolio Value Over Time with Trade Signals',
-                height=500,
-                xaxis_title='Date',
-                yaxis_title='Portfolio Value ($)',
-                template='plotly_white',
-                showlegend=True
+                # Portfolio value at (or before) each trade, looked up with one sorted merge per side
+                portfolio_sorted = portfolio_df.sort_values('timestamp')[['timestamp', 'total_value']]
+                buy_y = pd.merge_asof(
+                    buy_times.to_frame(), portfolio_sorted, on='timestamp', direction='backward'
+                )['total_value'].fillna(final_value)
+                sell_y = pd.merge_asof(
+                    sell_times.to_frame(), portfolio_sorted, on='timestamp', direction='backward'
+                )['total_value'].fillna(final_value)
+            
+            # Portfolio value chart (cached on its input series)
+            fig1 = build_portfolio_fig(
+                portfolio_df['timestamp'], portfolio_df['total_value'],
+                buy_times, buy_y, sell_times, sell_y
             )
             st.plotly_chart(fig1, use_container_width=True)
             
@@ -398,47 +627,16 @@ def main():
                 st.subheader("Profit Analysis")
                 
                 # Realized vs Unrealized profit
-                if 'realized_profit' in portfolio_df.columns and 'unrealized_profit' in portfolio_df.columns:
-                    latest = portfolio_df.iloc[-1]
-                    profit_data = {
-                        'Type': ['Realized Profit', 'Unrealized Profit'],
-                        'Amount': [latest['realized_profit'], latest['unrealized_profit']]
-                    }
-                    profit_df = pd.DataFrame(profit_data)
-                    
-                    fig_pie = px.pie(
-                        profit_df, 
-                        values='Amount', 
-                        names='Type',
-                        color='Type',
-                        color_discrete_map={
-                            'Realized Profit': '#00D4AA',
-                            'Unrealized Profit': '#FFA726'
-                        }
-                    )
-                    fig_pie.update_layout(title='Profit Distribution')
+                if 'realized_profit' in latest and 'unrealized_profit' in latest:
+                    fig_pie = build_profit_pie(latest['realized_profit'], latest['unrealized_profit'])
                     st.plotly_chart(fig_pie, use_container_width=True)
             
             with col2:
                 st.subheader("Asset Allocation")
                 
                 # Current allocation
-                if not portfolio_df.empty:
-                    latest = portfolio_df.iloc[-1]
-                    allocation_data = {
-                        'Asset': ['Cash', 'Bitcoin'],
-                        'Value': [latest['cash'], latest['btc_value']]
-                    }
-                    allocation_df = pd.DataFrame(allocation_data)
-                    
-                    fig_alloc = px.pie(
-                        allocation_df, 
-                        values='Value', 
-                        names='Asset',
-                        color='Asset',
-                        color_discrete_map={'Cash': '#4CAF50', 'Bitcoin': '#FF9800'}
-                    )
-                    fig_alloc.update_layout(title='Current Portfolio Allocation')
+                if has_portfolio:
+                    fig_alloc = build_allocation_pie(latest['cash'], latest['btc_value'])
                     st.plotly_chart(fig_alloc, use_container_width=True)
         else:
             st.info("No portfolio data available for performance analysis.")
@@ -452,47 +650,47 @@ def main():
             display_df = display_df.sort_values('timestamp', ascending=False)
             
             # Format for display
-            display_df['trade_amount_display'] = display_df['trade_amount'].apply(
-                lambda x: f"${x:,.2f}" if pd.notna(x) else "N/A"
+            display_df['trade_amount_display'] = display_df['trade_amount'].map("${:,.2f}".format).where(
+                display_df['trade_amount'].notna(), "N/A"
             )
-            display_df['price_display'] = display_df['price'].apply(lambda x: f"${x:,.2f}")
+            display_df['price_display'] = display_df['price'].map("${:,.2f}".format)
             display_df['timestamp_display'] = display_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
-            display_df['position_size_display'] = display_df['position_size'].apply(lambda x: f"{x}%")
+            display_df['position_size_display'] = display_df['position_size'].astype(str) + '%'
             
-            # Color coding for actions
-            def color_action(action):
-                if action == 'BUY':
-                    return 'color: #00D4AA'
-                elif action == 'SELL':
-                    return 'color: #FF4B4B'
-                else:
-                    return 'color: #666666'
+            # Color coding for actions (whole column at once)
+            def color_action_vec(col):
+                actions = col.to_numpy()
+                return np.where(actions == 'BUY', 'color: #00D4AA',
+                                np.where(actions == 'SELL', 'color: #FF4B4B', 'color: #666666'))
             
             styled_df = display_df[[
                 'timestamp_display', 'action', 'price_display', 
                 'position_size_display', 'trade_amount_display', 
                 'decision_source', 'reason'
-            ]].style.applymap(color_action, subset=['action'])
+            ]].style.apply(color_action_vec, subset=['action'])
             
             st.dataframe(styled_df, use_container_width=True, height=400)
             
-            # Trade statistics
+            # Trade statistics, per-action sums/counts in a single grouped pass
+            volume_by_action = trades_df.groupby('action', observed=True, dropna=False)['trade_amount'].agg(['sum', 'count'])
+            buy_volume = volume_by_action['sum'].get('BUY', 0)
+            sell_volume = volume_by_action['sum'].get('SELL', 0)
+            total_volume = volume_by_action['sum'].sum()
+            trade_count = volume_by_action['count'].sum()
+            avg_trade_size = total_volume / trade_count if trade_count > 0 else 0
+            
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                total_volume = trades_df['trade_amount'].sum()
                 st.metric("Total Volume", f"${total_volume:,.0f}")
             
             with col2:
-                avg_trade_size = trades_df['trade_amount'].mean()
                 st.metric("Avg Trade Size", f"${avg_trade_size:,.0f}")
             
             with col3:
-                buy_volume = trades_df[trades_df['action'] == 'BUY']['trade_amount'].sum()
                 st.metric("Buy Volume", f"${buy_volume:,.0f}")
             
             with col4:
-                sell_volume = trades_df[trades_df['action'] == 'SELL']['trade_amount'].sum()
                 st.metric("Sell Volume", f"${sell_volume:,.0f}")
         else:
             st.info("No trading history available.")
@@ -500,54 +698,15 @@ def main():
     with tab3:
         st.subheader("Portfolio Composition Over Time")
         
-        if portfolio_df is not None and len(portfolio_df) > 0:
+        if has_portfolio:
             # Portfolio composition chart
-            fig_comp = go.Figure()
-            
-            fig_comp.add_trace(go.Scatter(
-                x=portfolio_df['timestamp'],
-                y=portfolio_df['cash'],
-                mode='lines',
-                name='Cash',
-                stackgroup='one',
-                line=dict(color='#4CAF50', width=2)
-            ))
-            
-            fig_comp.add_trace(go.Scatter(
-                x=portfolio_df['timestamp'],
-                y=portfolio_df['btc_value'],
-                mode='lines',
-                name='Bitcoin Value',
-                stackgroup='one',
-                line=dict(color='#FF9800', width=2)
-            ))
-            
-            fig_comp.update_layout(
-                title='Portfolio Composition Over Time',
-                height=400,
-                xaxis_title='Date',
-                yaxis_title='Value ($)',
-                template='plotly_white'
+            fig_comp = build_composition_fig(
+                portfolio_df['timestamp'], portfolio_df['cash'], portfolio_df['btc_value']
             )
             st.plotly_chart(fig_comp, use_container_width=True)
             
             # BTC Holdings chart
-            fig_btc = go.Figure()
-            fig_btc.add_trace(go.Scatter(
-                x=portfolio_df['timestamp'],
-                y=portfolio_df['btc_holdings'],
-                mode='lines',
-                name='BTC Holdings',
-                line=dict(color='#FF9800', width=3)
-            ))
-            
-            fig_btc.update_layout(
-                title='Bitcoin Holdings Over Time',
-                height=300,
-                xaxis_title='Date',
-                yaxis_title='BTC Amount',
-                template='plotly_white'
-            )
+            fig_btc = build_btc_holdings_fig(portfolio_df['timestamp'], portfolio_df['btc_holdings'])
             st.plotly_chart(fig_btc, use_container_width=True)
         else:
             st.info("No portfolio composition data available.")
@@ -559,13 +718,7 @@ def main():
             # AI vs Rule decisions
             decision_counts = trades_df['decision_source'].value_counts()
             
-            fig_ai = px.pie(
-                values=decision_counts.values,
-                names=decision_counts.index,
-                title='AI vs Rule-Based Decisions',
-                color=decision_counts.index,
-                color_discrete_map={'AI': '#00D4AA', 'RULES': '#FFA726'}
-            )
+            fig_ai = build_decision_pie(decision_counts)
             st.plotly_chart(fig_ai, use_container_width=True)
             
             # Decision performance by source
@@ -576,17 +729,17 @@ def main():
                 
                 # Calculate average profit by decision source
                 if 'profit' in trades_df.columns:
-                    profit_by_source = trades_df.groupby('decision_source')['profit'].mean()
+                    profit_by_source = trades_df.groupby('decision_source', observed=True)['profit'].mean()
                     st.bar_chart(profit_by_source)
             
             with col2:
                 st.subheader("Trade Frequency")
                 
-                # Trades over time by source
-                trades_over_time = trades_df.groupby([
-                    pd.Grouper(key='timestamp', freq='W'),
-                    'decision_source'
-                ]).size().unstack(fill_value=0)
+                # Trades per week by source (categorical keys are counted on their codes)
+                trades_over_time = pd.crosstab(
+                    trades_df['timestamp'].dt.to_period('W').dt.start_time,
+                    trades_df['decision_source']
+                )
                 
                 if not trades_over_time.empty:
                     st.line_chart(trades_over_time)
@@ -614,7 +767,7 @@ def main():
             **Final Portfolio:** ${:,.0f}
             """.format(
                 len(trades_df) if trades_df is not None else 0,
-                len(portfolio_df) if portfolio_df is not None else 0,
+                len(portfolio_df) if has_portfolio else 0,
                 len(market_df) if market_df is not None else 0,
                 performance_data.get('data_period', 'N/A'),
                 performance_data.get('initial_capital', 0),
@@ -1,23 +1,191 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import aiohttp
+import asyncio
+import orjson
+import os
+import re
+import atexit
+import time
+import weakref
+from collections import OrderedDict, deque
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+# Outermost JSON object / array in a model reply
+_JSON_RE = re.compile(r'\{.*\}', re.S)
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.S)
+
+# Request bodies are serialized once with orjson and sent as raw bytes
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Agents whose decision caches still need saving; one exit hook covers all of them
+_OPEN_AGENTS = weakref.WeakSet()
+
+def _save_open_agents():
+    for agent in list(_OPEN_AGENTS):
+        agent._save_cache()
+
+atexit.register(_save_open_agents)
+
+def precompute_features(df):
+    """Add trend/volatility/rsi_status label columns to an indicator frame in one vectorized pass.
+    Bars built from these rows can pass the labels in market_data so prompts skip per-bar branching."""
+    df['trend'] = np.where(df['SMA_50'] > df['SMA_200'], 'BULLISH', 'BEARISH')
+    df['volatility'] = np.where(df['ATR_14'] > 1000, 'HIGH', 'NORMAL')
+    df['rsi_status'] = np.select([df['RSI_14'] < 30, df['RSI_14'] > 70], ['OVERSOLD', 'OVERBOUGHT'], 'NEUTRAL')
+    return df
+
 class GemmaTradingAgent:
     """Gemma AI that learns from strategy rules and makes intelligent decisions"""
     
+    MAX_CONCURRENT_REQUESTS = 8
+    # In-flight generate calls; match the server's OLLAMA_NUM_PARALLEL (extra requests only queue there)
+    OLLAMA_PARALLEL = int(os.getenv('OLLAMA_NUM_PARALLEL', '4'))
+    FAILURE_THRESHOLD = 3  # consecutive failures before Ollama calls are suspended
+    COOLDOWN_SECONDS = 60
+    CACHE_PATH = "data/ai_cache.json"
+    CACHE_SIZE = 10000
+    CACHE_MAX_AGE = 30 * 86400  # seconds a persisted decision stays usable
+    LEARNING_HISTORY_SIZE = 10000
+    LEARNING_FIELDS = ("timestamp", "price", "rsi", "rule_action", "ai_action", "ai_position_size")
+    
+    # Label lookups indexed by the comparison result
+    _TREND = ("BEARISH", "BULLISH")
+    _VOLATILITY = ("NORMAL", "HIGH")
+    _RSI_STATUS = ("NEUTRAL", "OVERSOLD", "OVERBOUGHT")
+    
+    _PROMPT_TMPL = """You are an advanced Bitcoin trading AI. Learn from the rule-based strategy and make better decisions.
+
+MARKET ANALYSIS:
+- Price: ${price:.2f}, Trend: {trend}, Volatility: {volatility}
+- RSI: {rsi:.1f} ({rsi_status}), MACD: {macd:.4f}
+- SMA50: ${sma50:.2f}, SMA200: ${sma200:.2f}
+- Holdings: BTC: {btc:.4f}, Cash: ${cash:.0f}
+
+RULE-BASED STRATEGY DECISION:
+- Action: {action}
+- Position Size: {position_size}%
+- Reason: {reason}
+
+YOUR TASK: Analyze if the rule-based decision is optimal. Consider risk management and market context.
+
+Respond with JSON only:
+{{
+    "action": "BUY/SELL/HOLD",
+    "position_size": 0-100,
+    "reason": "Your improved reasoning",
+    "improvement": "What you improved"
+}}
+
+JSON:"""
+    
     def __init__(self):
         self.ollama_url = "http://localhost:11434/api/generate"
         self.ai_enabled = False
-        self.learning_history = []
+        self.learning_history = deque(maxlen=self.LEARNING_HISTORY_SIZE)  # tuples laid out as LEARNING_FIELDS
+        
+        # Circuit breaker: after repeated failures skip Ollama entirely until the cooldown passes
+        self._failures = 0
+        self._cooldown_until = 0.0
+        
+        # LRU of (decision, time cached) keyed by quantized market features, persisted across runs
+        self._cache = self._load_cache()
+        _OPEN_AGENTS.add(self)
+        
+        # One pooled keep-alive session for every Ollama call
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0))
+        self.session.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip, deflate"})
+        
         self.check_ai_connection()
     
+    def close(self):
+        """Save the decision cache and release pooled connections"""
+        self._save_cache()
+        _OPEN_AGENTS.discard(self)
+        self.session.close()
+    
+    def _load_cache(self):
+        """Load the persisted decision cache, empty if missing or unreadable. Records are
+        [key, decision, time cached]; invalid or expired ones are dropped"""
+        try:
+            with open(self.CACHE_PATH, 'rb') as f:
+                records = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return OrderedDict()
+        
+        cache = OrderedDict()
+        oldest = time.time() - self.CACHE_MAX_AGE
+        for record in records if isinstance(records, list) else []:
+            try:
+                key, decision, cached_at = record
+                decision = self._sanitize_decision(dict(decision))
+                if decision is not None and len(key) == 6 and float(cached_at) >= oldest:
+                    cache[tuple(key)] = (decision, float(cached_at))
+            except (TypeError, ValueError):
+                continue
+        return cache
+    
+    def _save_cache(self):
+        """Merge this agent's decisions into the cache file (written to a temp file, then swapped in)"""
+        try:
+            cache = self._load_cache()
+            for key, entry in self._cache.items():
+                cache.pop(key, None)
+                cache[key] = entry
+            while len(cache) > self.CACHE_SIZE:
+                cache.popitem(last=False)
+            
+            os.makedirs(os.path.dirname(self.CACHE_PATH), exist_ok=True)
+            tmp_path = f"{self.CACHE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps([[list(key), decision, cached_at] for key, (decision, cached_at) in cache.items()]))
+            os.replace(tmp_path, self.CACHE_PATH)
+        except Exception as e:
+            print(f"⚠️ Gemma AI: Could not save decision cache - {e}")
+    
+    def _cache_key(self, market_data, rule_decision):
+        """Quantized features that determine the AI answer, as builtin types so the key
+        survives the JSON cache file (precomputed frames hand in NumPy scalars)"""
+        trend, volatility, rsi_status = self._market_context(market_data)
+        return (round(float(market_data['rsi']), 1), str(trend), str(volatility), str(rsi_status),
+                str(rule_decision['action']), int(rule_decision['position_size']))
+    
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        self._cache.move_to_end(key)
+        return dict(entry[0])
+    
+    def _cache_put(self, key, decision):
+        self._cache[key] = (dict(decision), time.time())
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def _ai_available(self):
+        """AI is enabled and not cooling down after repeated failures"""
+        return self.ai_enabled and time.monotonic() >= self._cooldown_until
+    
+    def _record_success(self):
+        self._failures = 0
+    
+    def _record_failure(self):
+        self._failures += 1
+        if self._failures >= self.FAILURE_THRESHOLD:
+            self._cooldown_until = time.monotonic() + self.COOLDOWN_SECONDS
+            self._failures = 0
+            print(f"⚠️ Gemma AI: {self.FAILURE_THRESHOLD} failures in a row, using rules for {self.COOLDOWN_SECONDS}s")
+    
     def check_ai_connection(self):
         """Check if AI is available with better error handling"""
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = self.session.get("http://localhost:11434/api/tags", timeout=5)
             if response.status_code == 200:
-                models = response.json().get("models", [])
+                models = orjson.loads(response.content).get("models", [])
                 if any("gemma" in m.get("name", "").lower() for m in models):
                     self.ai_enabled = True
                     print("✅ Gemma AI: Connected and ready to learn")
@@ -31,103 +199,304 @@ class GemmaTradingAgent:
     
     def get_ai_decision(self, market_data, strategy_state, rule_decision):
         """Get AI decision that learns from rule-based strategy with timeout handling"""
-        if not self.ai_enabled:
+        if not self._ai_available():
+            return rule_decision
+        
+        key = self._cache_key(market_data, rule_decision)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            payload = self._build_payload(market_data, strategy_state, rule_decision)
+            
+            # Stream tokens and hang up as soon as the JSON object is complete
+            with self.session.post(self.ollama_url, data=orjson.dumps(payload), headers=_JSON_HEADERS,
+                                   stream=True, timeout=15) as response:
+                if response.status_code == 200:
+                    text = ''
+                    for line in response.iter_lines():
+                        if line:
+                            text, done = self._append_stream_chunk(text, line)
+                            if done:
+                                break
+                    self._record_success()
+                    return self._accept_decision(text, market_data, rule_decision, key)
+                else:
+                    print(f"⚠️ Gemma AI: HTTP error {response.status_code}")
+                
+        except Exception as e:
+            print(f"⚠️ Gemma AI error: {e}, using rule-based strategy")
+        
+        self._record_failure()
+        
+        return rule_decision
+    
+    async def get_ai_decision_async(self, session, market_data, strategy_state, rule_decision):
+        """Async get_ai_decision over a shared aiohttp session, so several bars can be in flight"""
+        if not self._ai_available():
             return rule_decision
         
+        key = self._cache_key(market_data, rule_decision)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Build learning prompt with rule-based context
-            prompt = self._build_learning_prompt(market_data, strategy_state, rule_decision)
+            payload = self._build_payload(market_data, strategy_state, rule_decision)
             
+            async with session.post(self.ollama_url, data=orjson.dumps(payload), headers=_JSON_HEADERS) as response:
+                if response.status == 200:
+                    text = ''
+                    async for line in response.content:
+                        if line.strip():
+                            text, done = self._append_stream_chunk(text, line)
+                            if done:
+                                break
+                    self._record_success()
+                    return self._accept_decision(text, market_data, rule_decision, key)
+                print(f"⚠️ Gemma AI: HTTP error {response.status}")
+                
+        except Exception as e:
+            print(f"⚠️ Gemma AI error: {e}, using rule-based strategy")
+        
+        self._record_failure()
+        
+        return rule_decision
+    
+    async def _get_batch_decision_async(self, session, items):
+        """Ask for one decision per bar in a single Ollama request"""
+        rule_decisions = [rule_decision for _, _, rule_decision in items]
+        if not self._ai_available():
+            return rule_decisions
+        
+        try:
             payload = {
                 "model": "gemma:2b",
-                "prompt": prompt,
+                "prompt": self._build_batch_prompt(items),
                 "stream": False,
-                "options": {"temperature": 0.1, "num_predict": 200}
+                "options": {"temperature": 0.0, "num_predict": 64 * len(items)}
             }
             
-            response = requests.post(self.ollama_url, json=payload, timeout=15)
-            if response.status_code == 200:
-                result = response.json()
-                ai_decision = self._parse_ai_response(result["response"])
-                
-                # Log learning for analysis
-                self._log_learning(market_data, rule_decision, ai_decision)
-                
-                print(f"🤖 GEMMA: {ai_decision['action']} {ai_decision['position_size']}% - {ai_decision['reason'][:50]}...")
-                return ai_decision
-            else:
-                print(f"⚠️ Gemma AI: HTTP error {response.status_code}")
+            async with session.post(self.ollama_url, data=orjson.dumps(payload), headers=_JSON_HEADERS) as response:
+                if response.status == 200:
+                    result = orjson.loads(await response.read())
+                    decisions = self._parse_ai_response_batch(result["response"], rule_decisions)
+                    for (market_data, _, rule_decision), ai_decision in zip(items, decisions):
+                        self._log_learning(market_data, rule_decision, ai_decision)
+                        if ai_decision is not rule_decision:
+                            self._cache_put(self._cache_key(market_data, rule_decision), ai_decision)
+                    print(f"🤖 GEMMA: {len(decisions)} bars - {', '.join(d['action'] for d in decisions)}")
+                    self._record_success()
+                    return decisions
+                print(f"⚠️ Gemma AI: HTTP error {response.status}")
                 
         except Exception as e:
-            print(f"⚠️ Gemma AI error: {e}, using rule-based strategy")
+            print(f"⚠️ Gemma AI batch error: {e}, using rule-based strategy")
         
-        return rule_decision
+        self._record_failure()
+        
+        return rule_decisions
+    
+    async def _get_ai_decisions_async(self, items, K):
+        """Send the items in chunks of K bars, chunks running concurrently over one connection pool"""
+        # Per-socket timeouts only: requests queued behind the connection limit should not expire
+        timeout = aiohttp.ClientTimeout(sock_connect=5, sock_read=15 * K)
+        connector = aiohttp.TCPConnector(limit=self.MAX_CONCURRENT_REQUESTS)
+        sem = asyncio.Semaphore(self.OLLAMA_PARALLEL)
+        
+        async def run_chunk(session, chunk):
+            async with sem:
+                return await self._get_batch_decision_async(session, chunk)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            chunks = await asyncio.gather(*[
+                run_chunk(session, items[i:i + K])
+                for i in range(0, len(items), K)
+            ])
+        return [decision for chunk in chunks for decision in chunk]
+    
+    def get_ai_decisions_batch(self, items, K=8):
+        """Get decisions for many (market_data, strategy_state, rule_decision) items, K bars per Ollama call"""
+        items = list(items)
+        if not self._ai_available() or not items:
+            return [rule_decision for _, _, rule_decision in items]
+        
+        # Serve cached bars directly, only the misses go to Ollama
+        decisions = [self._cache_get(self._cache_key(market_data, rule_decision))
+                     for market_data, _, rule_decision in items]
+        misses = [i for i, decision in enumerate(decisions) if decision is None]
+        if misses:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                fetched = asyncio.run(self._get_ai_decisions_async([items[i] for i in misses], K))
+            else:
+                # Already inside an event loop (e.g. FastAPI handler, notebook) - one sync request per bar
+                fetched = [self.get_ai_decision(*items[i]) for i in misses]
+            for i, decision in zip(misses, fetched):
+                decisions[i] = decision
+        return decisions
+    
+    def _build_payload(self, market_data, strategy_state, rule_decision):
+        """Build the Ollama generate request for one bar"""
+        # Build learning prompt with rule-based context
+        prompt = self._build_learning_prompt(market_data, strategy_state, rule_decision)
+        
+        return {
+            "model": "gemma:2b",
+            "prompt": prompt,
+            "stream": True,
+            # Greedy decoding keeps cached answers reproducible; no stop sequence because
+            # Ollama strips it from the output and the closing brace would be lost
+            "options": {"temperature": 0.0, "num_predict": 64}
+        }
+    
+    def _append_stream_chunk(self, text, line):
+        """Add one streamed NDJSON chunk; done once generation ends or a complete JSON object is in"""
+        chunk = orjson.loads(line)
+        text += chunk.get("response", "")
+        return text, chunk.get("done", False) or self._json_object_end(text) != -1
+    
+    @staticmethod
+    def _json_object_end(text):
+        """Index just past the first balanced {...} in text, -1 while it is still incomplete"""
+        start = text.find('{')
+        if start == -1:
+            return -1
+        
+        depth = 0
+        in_string = escaped = False
+        for i in range(start, len(text)):
+            c = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == '\\':
+                    escaped = True
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+        return -1
+    
+    def _accept_decision(self, response_text, market_data, rule_decision, key):
+        """Parse an Ollama response, cache it and record it in the learning history"""
+        ai_decision = self._parse_ai_response(response_text)
+        if ai_decision['reason'] != "AI parse error":
+            self._cache_put(key, ai_decision)
+        
+        # Log learning for analysis
+        self._log_learning(market_data, rule_decision, ai_decision)
+        
+        print(f"🤖 GEMMA: {ai_decision['action']} {ai_decision['position_size']}% - {ai_decision['reason'][:50]}...")
+        return ai_decision
     
     def _build_learning_prompt(self, market_data, strategy_state, rule_decision):
         """Build prompt that teaches Gemma the trading strategy"""
-        price = market_data['price']
-        rsi = market_data['rsi']
-        sma20 = market_data['sma20']
-        sma50 = market_data['sma50']
-        sma200 = market_data['sma200']
-        ema12 = market_data['ema12']
-        ema26 = market_data['ema26']
-        macd = market_data['macd']
-        atr = market_data['atr']
+        # Current market analysis
+        trend, volatility, rsi_status = self._market_context(market_data)
         
-        cash = strategy_state['cash']
-        btc = strategy_state['btc']
+        return self._PROMPT_TMPL.format_map({
+            'price': market_data['price'],
+            'trend': trend,
+            'volatility': volatility,
+            'rsi': market_data['rsi'],
+            'rsi_status': rsi_status,
+            'macd': market_data['macd'],
+            'sma50': market_data['sma50'],
+            'sma200': market_data['sma200'],
+            'btc': strategy_state['btc'],
+            'cash': strategy_state['cash'],
+            'action': rule_decision['action'],
+            'position_size': rule_decision['position_size'],
+            'reason': rule_decision['reason']
+        })
+    
+    def _market_context(self, market_data):
+        """Classify trend, volatility and RSI state for a bar (precomputed labels win)"""
+        if 'trend' in market_data:
+            return market_data['trend'], market_data['volatility'], market_data['rsi_status']
         
-        # Current market analysis
-        trend = "BULLISH" if sma50 > sma200 else "BEARISH"
-        volatility = "HIGH" if atr > 1000 else "NORMAL"
-        rsi_status = "OVERSOLD" if rsi < 30 else "OVERBOUGHT" if rsi > 70 else "NEUTRAL"
+        rsi = market_data['rsi']
+        return (self._TREND[int(market_data['sma50'] > market_data['sma200'])],
+                self._VOLATILITY[int(market_data['atr'] > 1000)],
+                self._RSI_STATUS[int(rsi < 30) + 2 * int(rsi > 70)])
+    
+    def _build_batch_prompt(self, items):
+        """Build one prompt covering several bars, answered with a JSON array"""
+        bars = []
+        for n, (market_data, strategy_state, rule_decision) in enumerate(items, 1):
+            trend, volatility, rsi_status = self._market_context(market_data)
+            bars.append(
+                f"BAR {n}: Price ${market_data['price']:.2f}, Trend {trend}, Volatility {volatility}, "
+                f"RSI {market_data['rsi']:.1f} ({rsi_status}), MACD {market_data['macd']:.4f}, "
+                f"SMA50 ${market_data['sma50']:.2f}, SMA200 ${market_data['sma200']:.2f}, "
+                f"BTC {strategy_state['btc']:.4f}, Cash ${strategy_state['cash']:.0f} | "
+                f"Rule: {rule_decision['action']} {rule_decision['position_size']}% - {rule_decision['reason']}"
+            )
         
         return f"""You are an advanced Bitcoin trading AI. Learn from the rule-based strategy and make better decisions.
 
-MARKET ANALYSIS:
-- Price: ${price:.2f}, Trend: {trend}, Volatility: {volatility}
-- RSI: {rsi:.1f} ({rsi_status}), MACD: {macd:.4f}
-- SMA50: ${sma50:.2f}, SMA200: ${sma200:.2f}
-- Holdings: BTC: {btc:.4f}, Cash: ${cash:.0f}
-
-RULE-BASED STRATEGY DECISION:
-- Action: {rule_decision['action']}
-- Position Size: {rule_decision['position_size']}%
-- Reason: {rule_decision['reason']}
+For each bar below, analyze if the rule-based decision is optimal. Consider risk management and market context.
 
-YOUR TASK: Analyze if the rule-based decision is optimal. Consider risk management and market context.
+{chr(10).join(bars)}
 
-Respond with JSON only:
-{{
-    "action": "BUY/SELL/HOLD",
-    "position_size": 0-100,
-    "reason": "Your improved reasoning",
-    "improvement": "What you improved"
-}}
+Return a JSON array with one object per bar, in the same order, and nothing else:
+[{{"action": "BUY/SELL/HOLD", "position_size": 0-100, "reason": "Your improved reasoning", "improvement": "What you improved"}}]
 
 JSON:"""
     
+    def _parse_ai_response_batch(self, response, rule_decisions):
+        """Parse a JSON array of decisions; bars without a valid entry keep their rule decision"""
+        decisions = list(rule_decisions)
+        match = _JSON_ARRAY_RE.search(response)
+        if not match:
+            return decisions
+        
+        try:
+            parsed = orjson.loads(match.group(0))
+        except orjson.JSONDecodeError:
+            return decisions
+        
+        if isinstance(parsed, list):
+            for i, decision in enumerate(parsed[:len(decisions)]):
+                decision = self._sanitize_decision(decision)
+                if decision is not None:
+                    decisions[i] = decision
+        
+        return decisions
+    
+    def _sanitize_decision(self, decision):
+        """Validate and normalise a decision dict, None if it is unusable"""
+        try:
+            if isinstance(decision, dict) and all(key in decision for key in ['action', 'position_size', 'reason']):
+                decision['action'] = decision['action'].upper()
+                decision['position_size'] = min(float(decision['position_size']), 100)
+                if 'improvement' not in decision:
+                    decision['improvement'] = "No specific improvement noted"
+                return decision
+        except (AttributeError, TypeError, ValueError):
+            pass
+        return None
+    
     def _parse_ai_response(self, response):
         """Parse AI response with error handling"""
-        try:
-            clean_response = response.strip()
-            start = clean_response.find('{')
-            end = clean_response.rfind('}') + 1
-            
-            if start != -1 and end != 0:
-                json_str = clean_response[start:end]
-                decision = json.loads(json_str)
-                
+        match = _JSON_RE.search(response)
+        if match:
+            try:
                 # Validate and sanitize
-                if all(key in decision for key in ['action', 'position_size', 'reason']):
-                    decision['action'] = decision['action'].upper()
-                    decision['position_size'] = min(float(decision['position_size']), 100)
-                    if 'improvement' not in decision:
-                        decision['improvement'] = "No specific improvement noted"
+                decision = self._sanitize_decision(orjson.loads(match.group(0)))
+                if decision is not None:
                     return decision
-        except:
-            pass
+            except orjson.JSONDecodeError:
+                pass
         
         # Return safe default
         return {
@@ -138,12 +507,19 @@ JSON:"""
         }
     
     def _log_learning(self, market_data, rule_decision, ai_decision):
-        """Log the learning process for analysis"""
-        learning_entry = {
-            "timestamp": datetime.now(),
-            "market_data": market_data,
-            "rule_decision": rule_decision,
-            "ai_decision": ai_decision,
-            "improvement": ai_decision.get('improvement', 'No improvement')
-        }
-        self.learning_history.append(learning_entry)
\ No newline at end of file
+        """Log the learning process for analysis (most recent LEARNING_HISTORY_SIZE entries)"""
+        self.learning_history.append((
+            time.time_ns(),  # converted to datetimes only in learning_history_df
+            market_data['price'],
+            market_data['rsi'],
+            rule_decision['action'],
+            ai_decision['action'],
+            ai_decision['position_size']
+        ))
+    
+    def learning_history_df(self):
+        """Learning history as a DataFrame, epoch-ns stamps converted to local datetimes"""
+        df = pd.DataFrame(list(self.learning_history), columns=list(self.LEARNING_FIELDS))
+        local_tz = datetime.now().astimezone().tzinfo
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ns', utc=True).dt.tz_convert(local_tz).dt.tz_localize(None)
+        return df
@@ -1,14 +1,174 @@
 ﻿from fastapi import FastAPI, BackgroundTasks
-from fastapi.responses import HTMLResponse
-import pandas as pd
-import json
+from fastapi.responses import HTMLResponse, ORJSONResponse
+import pyarrow as pa
+import pyarrow.csv as pac
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import orjson
 import os
+import csv
 import asyncio
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import uvicorn
 
-app = FastAPI(title="Bitcoin AI Trading Dashboard", version="1.0.0")
+app = FastAPI(title="Bitcoin AI Trading Dashboard", version="1.0.0", default_response_class=ORJSONResponse)
+
+PERFORMANCE_PATH = 'data/backtest_performance.json'
+# Ollama server settings that let concurrent Gemma requests run in parallel on one loaded model
+OLLAMA_RECOMMENDED_ENV = {'OLLAMA_NUM_PARALLEL': '4', 'OLLAMA_MAX_LOADED_MODELS': '1'}
+PORTFOLIO_PATH = 'data/backtest_portfolio_history.parquet'
+TRADES_PATH = 'data/backtest_trading_history.parquet'
+# Results written before the switch to Parquet
+PORTFOLIO_CSV_PATH = 'data/backtest_portfolio_history.csv'
+TRADES_CSV_PATH = 'data/backtest_trading_history.csv'
+TRADE_COUNTS_PATH = 'data/trade_counts.json'
+TAIL_BYTES = 8192
+PORTFOLIO_COLUMNS = ['btc_holdings', 'cash', 'total_value']  # the fields the dashboard shows
+
+# Dashboard page, built once at import; dashboard() only fills in the values
+DASHBOARD_TMPL = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Bitcoin AI Trading Dashboard</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; background: #0f0f23; color: #00ff00; }}
+        .container {{ max-width: 1200px; margin: 0 auto; }}
+        .header {{ text-align: center; margin-bottom: 40px; }}
+        .card {{ background: #1a1a2e; padding: 20px; margin: 10px; border-radius: 10px; border: 1px solid #00ff00; }}
+        .grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; }}
+        .btn {{ background: #00ff00; color: #000; padding: 10px 20px; border: none; border-radius: 5px; cursor: pointer; margin: 5px; }}
+        .btn:hover {{ background: #00cc00; }}
+        .metric {{ font-size: 24px; font-weight: bold; color: #00ff00; }}
+        .positive {{ color: #00ff00; }}
+        .negative {{ color: #ff4444; }}
+        .warning {{ color: #ffaa00; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🚀 Bitcoin AI Trading Dashboard</h1>
+            <p>6-Month Backtest Results with Gemma AI</p>
+{no_data_warning}
+        </div>
+        
+        <div class="card">
+            <h2>⚡ System Controls</h2>
+            <button class="btn" onclick="runBacktest()">Run 6-Month Backtest</button>
+            <button class="btn" onclick="loadResults()">Refresh Results</button>
+            <div id="status">{status}</div>
+        </div>
+{body}
+        <div class="card">
+            <h3>📋 System Information</h3>
+            <p>Last Run: {last_run}</p>
+            <p>Status: {status_label}</p>
+            <p>Backtest Period: 6 months</p>
+        </div>
+    </div>
+    
+    <script>
+        async function runBacktest() {{
+            document.getElementById('status').innerHTML = '🔄 Running backtest (this may take a few minutes)...';
+            const response = await fetch('/run-backtest', {{method: 'POST'}});
+            const result = await response.json();
+            
+            if(result.status === 'success') {{
+                document.getElementById('status').innerHTML = '✅ Backtest completed! Refreshing...';
+                setTimeout(() => location.reload(), 2000);
+            }} else {{
+                document.getElementById('status').innerHTML = '❌ Error: ' + result.error;
+            }}
+        }}
+        
+        function loadResults() {{
+            location.reload();
+        }}
+    </script>
+</body>
+</html>
+"""
+
+DATA_CARDS_TMPL = """<div class="grid">
+        <div class="card">
+            <h3>📊 Performance</h3>
+            <p>Total Return: <span class="metric {return_class}">{total_return:.2f}%</span></p>
+            <p>Final Value: ${final_value:,.0f}</p>
+            <p>Realized Profit: ${realized_profit:,.0f}</p>
+        </div>
+        
+        <div class="card">
+            <h3>💰 Portfolio</h3>
+            <p>BTC Holdings: {btc_holdings:.4f}</p>
+            <p>Cash: ${cash:,.0f}</p>
+            <p>Total Value: ${total_value:,.0f}</p>
+        </div>
+        
+        <div class="card">
+            <h3>🤖 Trading Activity</h3>
+            <p>Total Trades: {total_trades}</p>
+            <p>AI Decisions: {ai_decisions}</p>
+            <p>Rule Decisions: {rule_decisions}</p>
+        </div>
+    </div>"""
+
+NO_DATA_WARNING = "<p class='warning'>⚠️ No backtest data found. Click 'Run Backtest' below.</p>"
+NO_DATA_TMPL = '<p>No data available. Run the backtest first.</p>'
+
+def file_signature(path):
+    """(mtime_ns, inode, size) of a file, None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+def _coerce(value):
+    """Convert a CSV field to float where possible, like read_csv would"""
+    if value == '':
+        return float('nan')
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def read_csv_header(path):
+    """Read just the header row of a CSV"""
+    with open(path, 'r', newline='') as f:
+        return next(csv.reader(f), [])
+
+def read_csv_last_row(path):
+    """Read the last data row of a CSV by seeking back from the end of the file"""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        block = TAIL_BYTES
+        while True:
+            f.seek(max(size - block, 0))
+            lines = [line for line in f.read().splitlines() if line.strip()]
+            # Two lines guarantee the last one is complete; otherwise widen the window
+            if len(lines) >= 2 or block >= size:
+                break
+            block *= 2
+    
+    if len(lines) < 2 and block >= size:
+        return None  # header only (or empty file)
+    return next(csv.reader([lines[-1].decode('utf-8')]))
+
+def read_parquet_last_row(path, columns):
+    """Read the last row of a Parquet file, decoding only the requested columns of its final row group"""
+    pf = pq.ParquetFile(path)
+    if pf.metadata.num_rows == 0:
+        return {}
+    names = set(pf.schema_arrow.names)
+    table = pf.read_row_group(pf.num_row_groups - 1, columns=[c for c in columns if c in names])
+    return table.slice(table.num_rows - 1).to_pylist()[0]
+
+def _run_optimized_backtest():
+    """Import (on first use, off the event loop) and run the backtest"""
+    import optimized_backtest
+    return optimized_backtest.run()
 
 class TradingSystem:
     def __init__(self):
@@ -17,40 +177,85 @@ class TradingSystem:
         self.performance_data = {}
         self.portfolio_data = {}
         self.trading_data = {}
+        self._portfolio_header = None
+        self._perf_sig = None
+        self._html_cache = None  # (key, html)
+        self._executor = ThreadPoolExecutor(max_workers=1)  # backtests run in-process, one at a time
         
     async def initialize_system(self):
         """Run backtest automatically when system starts"""
-        if not os.path.exists('data/backtest_performance.json'):
+        if not os.path.exists(PERFORMANCE_PATH):
             print("🚀 Initializing: Running first backtest...")
             await self.run_backtest()
         else:
             print("✅ Loading existing backtest data...")
             self.load_existing_data()
     
-    def load_existing_data(self):
-        """Load existing backtest data"""
+    def load_existing_data(self, load_full=False):
+        """Load existing backtest data (only the latest portfolio row and the trade counts unless load_full)"""
         try:
-            with open('data/backtest_performance.json', 'r') as f:
-                self.performance_data = json.load(f)
+            # The backtest rewrites the performance file, so an unchanged stat signature means nothing to reload
+            sig = file_signature(PERFORMANCE_PATH)
+            if sig is not None and sig == self._perf_sig and self.performance_data and not load_full:
+                return
             
-            if os.path.exists('data/backtest_portfolio_history.csv'):
-                portfolio_df = pd.read_csv('data/backtest_portfolio_history.csv')
-                self.portfolio_data = portfolio_df.iloc[-1].to_dict() if len(portfolio_df) > 0 else {}
+            with open(PERFORMANCE_PATH, 'rb') as f:
+                self.performance_data = orjson.loads(f.read())
+            self._perf_sig = sig
             
-            if os.path.exists('data/backtest_trading_history.csv'):
-                trades_df = pd.read_csv('data/backtest_trading_history.csv')
-                self.trading_data = {
-                    "total_trades": len(trades_df),
-                    "ai_decisions": len(trades_df[trades_df['decision_source'] == 'AI']) if 'decision_source' in trades_df.columns else 0,
-                    "rule_decisions": len(trades_df[trades_df['decision_source'] == 'RULES']) if 'decision_source' in trades_df.columns else 0
-                }
+            if load_full or not os.path.exists(TRADE_COUNTS_PATH):
+                self._load_full_history()
+                return
+            
+            if os.path.exists(PORTFOLIO_PATH):
+                self.portfolio_data = read_parquet_last_row(PORTFOLIO_PATH, PORTFOLIO_COLUMNS)
+            elif os.path.exists(PORTFOLIO_CSV_PATH):
+                if self._portfolio_header is None:
+                    self._portfolio_header = read_csv_header(PORTFOLIO_CSV_PATH)
+                row = read_csv_last_row(PORTFOLIO_CSV_PATH)
+                self.portfolio_data = dict(zip(self._portfolio_header, map(_coerce, row))) if row else {}
+            
+            with open(TRADE_COUNTS_PATH, 'rb') as f:
+                self.trading_data = orjson.loads(f.read())
             
         except Exception as e:
             print(f"❌ Error loading existing data: {e}")
+            self._perf_sig = None
             self.performance_data = {}
             self.portfolio_data = {}
             self.trading_data = {}
     
+    def _load_full_history(self):
+        """Recompute portfolio/trade summaries from the full histories"""
+        # Only the needed columns are read (Parquet, or the pyarrow CSV reader for legacy files)
+        if os.path.exists(PORTFOLIO_PATH):
+            self.portfolio_data = read_parquet_last_row(PORTFOLIO_PATH, PORTFOLIO_COLUMNS)
+        elif os.path.exists(PORTFOLIO_CSV_PATH):
+            portfolio = pac.read_csv(PORTFOLIO_CSV_PATH, convert_options=pac.ConvertOptions(
+                include_columns=PORTFOLIO_COLUMNS, include_missing_columns=True
+            ))
+            self.portfolio_data = portfolio.slice(portfolio.num_rows - 1).to_pylist()[0] if portfolio.num_rows > 0 else {}
+        
+        trades = None
+        if os.path.exists(TRADES_PATH):
+            if 'decision_source' in pq.read_schema(TRADES_PATH).names:
+                trades = pq.read_table(TRADES_PATH, columns=['decision_source'])
+            else:
+                num_rows = pq.ParquetFile(TRADES_PATH).metadata.num_rows
+                trades = pa.table({'decision_source': pa.nulls(num_rows, pa.string())})
+        elif os.path.exists(TRADES_CSV_PATH):
+            trades = pac.read_csv(TRADES_CSV_PATH, convert_options=pac.ConvertOptions(
+                include_columns=['decision_source'], include_missing_columns=True
+            ))
+        
+        if trades is not None:
+            source = trades['decision_source']
+            self.trading_data = {
+                "total_trades": trades.num_rows,
+                "ai_decisions": pc.sum(pc.equal(source, 'AI')).as_py() or 0,
+                "rule_decisions": pc.sum(pc.equal(source, 'RULES')).as_py() or 0
+            }
+    
     async def run_backtest(self):
         """Run the optimized backtest"""
         if self.is_running:
@@ -60,26 +265,20 @@ class TradingSystem:
         try:
             print("🤖 Starting backtest...")
             
-            # Run your backtest script
-            process = await asyncio.create_subprocess_exec(
-                'python', 'optimized_backtest.py',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
+            # Run the backtest in this process on a worker thread
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, _run_optimized_backtest)
             
             self.last_run = datetime.now()
             self.is_running = False
             
-            if process.returncode == 0:
+            if result is not None:
                 print("✅ Backtest completed successfully!")
                 # Reload the new data
                 self.load_existing_data()
                 return {"status": "success", "output": "Backtest completed!"}
             else:
-                error_msg = stderr.decode()
-                print(f"❌ Backtest failed: {error_msg}")
+                error_msg = "Backtest failed: could not fetch market data"
+                print(f"❌ {error_msg}")
                 return {"status": "error", "error": error_msg}
                 
         except Exception as e:
@@ -93,133 +292,56 @@ trading_system = TradingSystem()
 @app.on_event("startup")
 async def startup_event():
     """Run when the app starts"""
+    for name, value in OLLAMA_RECOMMENDED_ENV.items():
+        if os.getenv(name) != value:
+            print(f"💡 Recommended Ollama setting: {name}={value} (current: {os.getenv(name, 'unset')})")
     await trading_system.initialize_system()
 
-@app.get("/")
-async def dashboard():
-    """Main dashboard page"""
-    # Check if we have data
-    has_data = bool(trading_system.performance_data)
-    
-    # Build the HTML content safely
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Bitcoin AI Trading Dashboard</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 40px; background: #0f0f23; color: #00ff00; }}
-            .container {{ max-width: 1200px; margin: 0 auto; }}
-            .header {{ text-align: center; margin-bottom: 40px; }}
-            .card {{ background: #1a1a2e; padding: 20px; margin: 10px; border-radius: 10px; border: 1px solid #00ff00; }}
-            .grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; }}
-            .btn {{ background: #00ff00; color: #000; padding: 10px 20px; border: none; border-radius: 5px; cursor: pointer; margin: 5px; }}
-            .btn:hover {{ background: #00cc00; }}
-            .metric {{ font-size: 24px; font-weight: bold; color: #00ff00; }}
-            .positive {{ color: #00ff00; }}
-            .negative {{ color: #ff4444; }}
-            .warning {{ color: #ffaa00; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🚀 Bitcoin AI Trading Dashboard</h1>
-                <p>6-Month Backtest Results with Gemma AI</p>
-    """
+@app.get("/", response_class=HTMLResponse)
+def dashboard():
+    """Main dashboard page (plain def: the stat/reload file I/O runs in the threadpool, off the event loop)"""
+    # Serve the cached page while the backtest results are unchanged
+    sig = file_signature(PERFORMANCE_PATH)
+    cache_key = (sig, trading_system.last_run)
+    if trading_system._html_cache is not None and trading_system._html_cache[0] == cache_key:
+        return HTMLResponse(content=trading_system._html_cache[1])
     
-    # Add warning if no data
-    if not has_data:
-        html_content += "<p class='warning'>⚠️ No backtest data found. Click 'Run Backtest' below.</p>"
+    if sig is not None:
+        trading_system.load_existing_data()
     
-    html_content += """
-            </div>
-            
-            <div class="card">
-                <h2>⚡ System Controls</h2>
-                <button class="btn" onclick="runBacktest()">Run 6-Month Backtest</button>
-                <button class="btn" onclick="loadResults()">Refresh Results</button>
-                <div id="status">"""
-    
-    # Add status message
-    if has_data:
-        html_content += "✅ System ready"
-    else:
-        html_content += "❌ No data - run backtest first"
-    
-    html_content += """</div>
-            </div>
-    """
+    # Check if we have data
+    has_data = bool(trading_system.performance_data)
     
     # Add data cards if we have data
     if has_data:
-        html_content += '<div class="grid">'
-        
-        # Performance card
-        total_return = trading_system.performance_data.get('total_return_percent', 0)
-        return_class = 'positive' if total_return >= 0 else 'negative'
-        
-        html_content += f"""
-            <div class="card">
-                <h3>📊 Performance</h3>
-                <p>Total Return: <span class="metric {return_class}">{total_return:.2f}%</span></p>
-                <p>Final Value: ${trading_system.performance_data.get('final_portfolio_value', 0):,.0f}</p>
-                <p>Realized Profit: ${trading_system.performance_data.get('realized_profit', 0):,.0f}</p>
-            </div>
-            
-            <div class="card">
-                <h3>💰 Portfolio</h3>
-                <p>BTC Holdings: {trading_system.portfolio_data.get('btc_holdings', 0):.4f}</p>
-                <p>Cash: ${trading_system.portfolio_data.get('cash', 0):,.0f}</p>
-                <p>Total Value: ${trading_system.portfolio_data.get('total_value', 0):,.0f}</p>
-            </div>
-            
-            <div class="card">
-                <h3>🤖 Trading Activity</h3>
-                <p>Total Trades: {trading_system.trading_data.get('total_trades', 0)}</p>
-                <p>AI Decisions: {trading_system.trading_data.get('ai_decisions', 0)}</p>
-                <p>Rule Decisions: {trading_system.trading_data.get('rule_decisions', 0)}</p>
-            </div>
-        """
-        
-        html_content += '</div>'
+        performance = trading_system.performance_data
+        portfolio = trading_system.portfolio_data
+        trades = trading_system.trading_data
+        total_return = performance.get('total_return_percent', 0)
+        body = DATA_CARDS_TMPL.format_map({
+            'return_class': 'positive' if total_return >= 0 else 'negative',
+            'total_return': total_return,
+            'final_value': performance.get('final_portfolio_value', 0),
+            'realized_profit': performance.get('realized_profit', 0),
+            'btc_holdings': portfolio.get('btc_holdings', 0),
+            'cash': portfolio.get('cash', 0),
+            'total_value': portfolio.get('total_value', 0),
+            'total_trades': trades.get('total_trades', 0),
+            'ai_decisions': trades.get('ai_decisions', 0),
+            'rule_decisions': trades.get('rule_decisions', 0)
+        })
     else:
-        html_content += '<p>No data available. Run the backtest first.</p>'
-    
-    # System information
-    last_run_str = trading_system.last_run.strftime('%Y-%m-%d %H:%M:%S') if trading_system.last_run else 'Never'
+        body = NO_DATA_TMPL
     
-    html_content += f"""
-            <div class="card">
-                <h3>📋 System Information</h3>
-                <p>Last Run: {last_run_str}</p>
-                <p>Status: {"✅ Ready" if has_data else "❌ No data"}</p>
-                <p>Backtest Period: 6 months</p>
-            </div>
-        </div>
-        
-        <script>
-            async function runBacktest() {{
-                document.getElementById('status').innerHTML = '🔄 Running backtest (this may take a few minutes)...';
-                const response = await fetch('/run-backtest', {{method: 'POST'}});
-                const result = await response.json();
-                
-                if(result.status === 'success') {{
-                    document.getElementById('status').innerHTML = '✅ Backtest completed! Refreshing...';
-                    setTimeout(() => location.reload(), 2000);
-                }} else {{
-                    document.getElementById('status').innerHTML = '❌ Error: ' + result.error;
-                }}
-            }}
-            
-            function loadResults() {{
-                location.reload();
-            }}
-        </script>
-    </body>
-    </html>
-    """
+    html_content = DASHBOARD_TMPL.format_map({
+        'no_data_warning': '' if has_data else NO_DATA_WARNING,
+        'status': "✅ System ready" if has_data else "❌ No data - run backtest first",
+        'body': body,
+        'last_run': trading_system.last_run.strftime('%Y-%m-%d %H:%M:%S') if trading_system.last_run else 'Never',
+        'status_label': "✅ Ready" if has_data else "❌ No data"
+    })
     
+    trading_system._html_cache = (cache_key, html_content)
     return HTMLResponse(content=html_content)
 
 @app.post("/run-backtest")
@@ -230,6 +352,7 @@ async def run_backtest():
 
 @app.get("/health")
 async def health_check():
+    # Kept async: a constant reply is cheapest on the event loop, a plain def would be sent to the threadpool
     return {"status": "healthy", "service": "bitcoin-trading-dashboard"}
 
 if __name__ == "__main__":
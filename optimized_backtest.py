@@ -2,10 +2,24 @@
 from binance.client import Client
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
 import time
 import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from functools import lru_cache
+from itertools import product
+import hashlib
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 import warnings
 import smtplib
@@ -27,6 +41,141 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 GMAIL_USER = os.getenv('GMAIL_USER')
 GMAIL_PASSWORD = os.getenv('GMAIL_PASSWORD')
 
+# Local copy of the downloaded klines; only bars newer than its tail are re-fetched
+KLINES_CACHE_PATH = 'data/klines_{symbol}_{interval}.parquet'
+
+# Static parts of the Gmail alert HTML, built once instead of per email
+EMAIL_HTML_HEAD = """
+            <html>
+                <head>
+                    <style>
+                        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }
+                        .container { background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+                        .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; }
+                        .trade-buy { background-color: #d4edda; border-left: 4px solid #28a745; padding: 15px; margin: 10px 0; border-radius: 5px; }
+                        .trade-sell { background-color: #f8d7da; border-left: 4px solid #dc3545; padding: 15px; margin: 10px 0; border-radius: 5px; }
+                        .metric { background: #f8f9fa; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #007bff; }
+                    </style>
+                </head>
+                <body>
+                    <div class="container">
+                        """
+EMAIL_HTML_FOOT = """
+                        <div style="margin-top: 20px; padding: 15px; background: #e9ecef; border-radius: 5px; font-size: 12px; color: #6c757d;">
+                            <p>This is an automated message from your Bitcoin Trading System.</p>
+                            <p>Time: {time}</p>
+                        </div>
+                    </div>
+                </body>
+            </html>
+            """
+
+# Trade alert bodies, filled with str.format_map per alert
+TRADE_TELEGRAM_TMPL = """
+{emoji} <b>TRADE EXECUTED: {action}</b>
+
+💰 <b>Trade Details:</b>
+Amount: ${trade_amount:,.2f}
+Price: ${current_price:,.2f}
+Quantity: {btc_traded:.6f} BTC
+{profit_line}
+
+📊 <b>Portfolio:</b>
+• BTC: {btc:.4f} BTC
+• Cash: ${cash:,.2f}
+• Total: ${total_value:,.2f}
+
+📝 <b>Reason:</b> {reason}
+        """
+TRADE_EMAIL_ITEM_TMPL = """
+        <div class="{trade_class}">
+            <h3>{emoji} {action} Trade Executed</h3>
+            <p><strong>Amount:</strong> ${trade_amount:,.2f}</p>
+            <p><strong>Price:</strong> ${current_price:,.2f}</p>
+            <p><strong>Quantity:</strong> {btc_traded:.6f} BTC</p>
+            <p><strong>Reason:</strong> {reason}</p>
+            {profit_html}
+        </div>
+        """
+TRADE_EMAIL_PORTFOLIO_TMPL = """
+        <div class="metric">
+            <h4>📊 Portfolio</h4>
+            <p><strong>BTC:</strong> {btc:.4f} BTC</p>
+            <p><strong>Cash:</strong> ${cash:,.2f}</p>
+            <p><strong>Total:</strong> ${total_value:,.2f}</p>
+        </div>
+        """
+TRADE_EMAIL_TMPL = """
+        <div class="header">
+            <h2>🚀 Bitcoin Trading System</h2>
+            <p>Live Trade Execution Alert</p>
+        </div>""" + TRADE_EMAIL_ITEM_TMPL + TRADE_EMAIL_PORTFOLIO_TMPL
+
+# Request bodies are serialized with orjson and sent as raw bytes
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Portfolio snapshot columns, stored as one preallocated array each
+PORTFOLIO_HISTORY_FIELDS = ('price', 'cash', 'btc_holdings', 'btc_value', 'total_value', 'realized_profit', 'unrealized_profit')
+
+# Trade history file; trades are streamed into it in row groups while the backtest runs
+TRADES_PATH = 'data/backtest_trading_history.parquet'
+PORTFOLIO_PATH = 'data/backtest_portfolio_history.parquet'
+# Market data is an uncompressed Arrow IPC file so the dashboard can memory-map it
+MARKET_PATH = 'data/backtest_market_data.arrow'
+TRADE_BATCH_ROWS = 256
+PARALLEL_TRADES_PATH = 'data/{symbol}_{param_hash}.parquet'
+TRADE_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('action', pa.string()),
+    ('price', pa.float64()),
+    ('position_size', pa.float64()),
+    ('reason', pa.string()),
+    ('decision_source', pa.string()),
+    ('cash_before', pa.float64()),
+    ('btc_before', pa.float64()),
+    ('portfolio_value_before', pa.float64()),
+    ('rsi', pa.float64()),
+    ('atr', pa.float64()),
+    ('trend', pa.string()),
+    ('trade_amount', pa.float64()),
+    ('btc_traded', pa.float64()),
+    ('type', pa.string()),
+    ('cash_after', pa.float64()),
+    ('btc_after', pa.float64()),
+    ('portfolio_value_after', pa.float64()),
+    ('realized_profit', pa.float64()),
+    ('profit', pa.float64())  # SELL trades only
+])
+
+# Telegram rejects messages longer than this
+TELEGRAM_MAX_MESSAGE = 4096
+
+# Minimum seconds between backtest progress lines
+PROGRESS_INTERVAL = 0.5
+
+def rolling_mean(values, window):
+    """Trailing mean over a NaN-free float array (cumsum difference), NaN until the window fills"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        csum = np.cumsum(values)
+        out[window - 1:] = csum[window - 1:]
+        out[window:] -= csum[:-window]
+        out[window - 1:] /= window
+    return out
+
+def fill_gaps(values):
+    """Same result as ffill().bfill() on a float array, in one NumPy pass"""
+    valid = ~np.isnan(values)
+    if valid.all() or not valid.any():
+        return values
+    # Index of the latest valid value at or before each position
+    last_valid = np.where(valid, np.arange(len(values)), 0)
+    np.maximum.accumulate(last_valid, out=last_valid)
+    filled = values[last_valid]
+    first = np.argmax(valid)
+    filled[:first] = values[first]
+    return filled
+
 # ==================== ALERT SYSTEM ====================
 class AlertSystem:
     """Handles Telegram and Gmail alerts for recent trading activities only"""
@@ -37,6 +186,19 @@ class AlertSystem:
         self.gmail_user = GMAIL_USER
         self.gmail_password = GMAIL_PASSWORD
         self.alert_count = 0
+        self._count_lock = threading.Lock()
+        
+        # Gmail alerts are queued and sent by a background worker over one SMTP login
+        self._email_queue = queue.Queue()
+        self._email_worker = None
+        self._smtp = None
+        
+        # Keep-alive session so consecutive Telegram alerts reuse one TLS connection
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=2, pool_maxsize=10,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        ))
         
     def send_telegram_alert(self, message):
         """Send formatted message to Telegram"""
@@ -52,9 +214,9 @@ class AlertSystem:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.session.post(url, data=orjson.dumps(payload), headers=JSON_HEADERS, timeout=10)
             if response.status_code == 200:
-                self.alert_count += 1
+                self._count_alert()
                 print("✅ Telegram alert sent!")
                 return True
             else:
@@ -64,8 +226,12 @@ class AlertSystem:
             print(f"❌ Telegram error: {e}")
             return False
     
+    def _count_alert(self):
+        with self._count_lock:
+            self.alert_count += 1
+    
     def send_gmail_alert(self, subject, message):
-        """Send email via Gmail with proper authentication"""
+        """Queue an email for Gmail delivery; returns once it is queued, not sent"""
         if not self.gmail_user or not self.gmail_password:
             print("❌ Missing Gmail credentials")
             return False
@@ -78,100 +244,91 @@ class AlertSystem:
             msg['Subject'] = subject
             
             # HTML content
-            html_content = f"""
-            <html>
-                <head>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-                        .container {{ background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                        .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; }}
-                        .trade-buy {{ background-color: #d4edda; border-left: 4px solid #28a745; padding: 15px; margin: 10px 0; border-radius: 5px; }}
-                        .trade-sell {{ background-color: #f8d7da; border-left: 4px solid #dc3545; padding: 15px; margin: 10px 0; border-radius: 5px; }}
-                        .metric {{ background: #f8f9fa; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #007bff; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        {message}
-                        <div style="margin-top: 20px; padding: 15px; background: #e9ecef; border-radius: 5px; font-size: 12px; color: #6c757d;">
-                            <p>This is an automated message from your Bitcoin Trading System.</p>
-                            <p>Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                        </div>
-                    </div>
-                </body>
-            </html>
-            """
+            html_content = EMAIL_HTML_HEAD + message + EMAIL_HTML_FOOT.format(
+                time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
             
             msg.attach(MIMEText(html_content, 'html'))
             
-            # Send email
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(self.gmail_user, self.gmail_password)
-            text = msg.as_string()
-            server.sendmail(self.gmail_user, self.gmail_user, text)
-            server.quit()
-            
-            self.alert_count += 1
-            print("✅ Gmail alert sent!")
+            # Hand off to the background sender so the trading loop never waits on SMTP
+            if self._email_worker is None:
+                self._email_worker = threading.Thread(target=self._email_loop, name="gmail-alerts", daemon=True)
+                self._email_worker.start()
+            self._email_queue.put(msg)
             return True
             
         except Exception as e:
             print(f"❌ Gmail error: {str(e)}")
             return False
     
+    def _email_loop(self):
+        """Background worker: send queued emails until the None sentinel arrives"""
+        while True:
+            msg = self._email_queue.get()
+            try:
+                if msg is None:
+                    break
+                self._deliver_email(msg)
+            finally:
+                self._email_queue.task_done()
+        self._disconnect_smtp()
+    
+    def _deliver_email(self, msg):
+        """Send one email over the persistent SMTP connection, reconnecting once if it dropped"""
+        for attempt in range(2):
+            try:
+                if self._smtp is None:
+                    server = smtplib.SMTP('smtp.gmail.com', 587, timeout=30)
+                    server.starttls()
+                    server.login(self.gmail_user, self.gmail_password)
+                    self._smtp = server
+                
+                self._smtp.sendmail(self.gmail_user, self.gmail_user, msg.as_string())
+                self._count_alert()
+                print("✅ Gmail alert sent!")
+                return True
+            
+            except smtplib.SMTPServerDisconnected:
+                # Gmail closes idle sessions; log in again and retry
+                self._smtp = None
+            except Exception as e:
+                print(f"❌ Gmail error: {str(e)}")
+                self._disconnect_smtp()
+                return False
+        
+        print("❌ Gmail error: server disconnected")
+        return False
+    
+    def _disconnect_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+    
+    def flush(self):
+        """Block until every queued email has been handled"""
+        if self._email_worker is not None:
+            self._email_queue.join()
+    
+    def close(self):
+        """Wait for queued emails to be sent, then log out of SMTP"""
+        if self._email_worker is not None:
+            self._email_queue.put(None)
+            self._email_worker.join()
+            self._email_worker = None
+    
     def send_trade_alert(self, trade_data, portfolio_state, current_price, market_conditions):
         """Send comprehensive trade alert via Telegram and Gmail for recent trades only"""
-        action = trade_data['action']
-        trade_amount = trade_data.get('trade_amount', 0)
-        btc_traded = trade_data.get('btc_traded', 0)
-        reason = trade_data.get('reason', '')
-        decision_source = trade_data.get('decision_source', 'RULES')
-        profit = trade_data.get('profit', 0)
-        
-        emoji = "🟢" if action == 'BUY' else "🔴" if action == 'SELL' else "⚪"
+        fields = self._trade_alert_fields(trade_data, portfolio_state, current_price)
         
         # Telegram message
-        telegram_message = f"""
-{emoji} <b>TRADE EXECUTED: {action}</b>
-
-💰 <b>Trade Details:</b>
-Amount: ${trade_amount:,.2f}
-Price: ${current_price:,.2f}
-Quantity: {btc_traded:.6f} BTC
-{f'Profit: ${profit:,.2f}' if action == 'SELL' and profit > 0 else ''}
-
-📊 <b>Portfolio:</b>
-• BTC: {portfolio_state['btc']:.4f} BTC
-• Cash: ${portfolio_state['cash']:,.2f}
-• Total: ${portfolio_state['total_value']:,.2f}
-
-📝 <b>Reason:</b> {reason}
-        """
+        telegram_message = TRADE_TELEGRAM_TMPL.format_map(fields)
         
         # Gmail content
-        gmail_subject = f"Trade {action} - ${trade_amount:,.0f} at ${current_price:,.0f}"
-        gmail_message = f"""
-        <div class="header">
-            <h2>🚀 Bitcoin Trading System</h2>
-            <p>Live Trade Execution Alert</p>
-        </div>
-        <div class="{'trade-buy' if action == 'BUY' else 'trade-sell'}">
-            <h3>{emoji} {action} Trade Executed</h3>
-            <p><strong>Amount:</strong> ${trade_amount:,.2f}</p>
-            <p><strong>Price:</strong> ${current_price:,.2f}</p>
-            <p><strong>Quantity:</strong> {btc_traded:.6f} BTC</p>
-            <p><strong>Reason:</strong> {reason}</p>
-            {f'<p><strong>Profit:</strong> ${profit:,.2f}</p>' if action == 'SELL' and profit > 0 else ''}
-        </div>
-        
-        <div class="metric">
-            <h4>📊 Portfolio</h4>
-            <p><strong>BTC:</strong> {portfolio_state['btc']:.4f} BTC</p>
-            <p><strong>Cash:</strong> ${portfolio_state['cash']:,.2f}</p>
-            <p><strong>Total:</strong> ${portfolio_state['total_value']:,.2f}</p>
-        </div>
-        """
+        gmail_subject = f"Trade {fields['action']} - ${fields['trade_amount']:,.0f} at ${current_price:,.0f}"
+        gmail_message = TRADE_EMAIL_TMPL.format_map(fields)
         
         # Send both alerts
         telegram_success = self.send_telegram_alert(telegram_message)
@@ -179,6 +336,59 @@ Quantity: {btc_traded:.6f} BTC
         
         return telegram_success or gmail_success
     
+    def send_trade_alerts_batched(self, trades):
+        """Send several trade alerts as one email and as few Telegram messages as the size limit allows"""
+        if not trades:
+            return False
+        if len(trades) == 1:
+            return self.send_trade_alert(**trades[0])
+        
+        fields = [self._trade_alert_fields(t['trade_data'], t['portfolio_state'], t['current_price']) for t in trades]
+        
+        # Telegram: concatenate the per-trade messages, starting a new one before the limit
+        chunks = ['']
+        for part in map(TRADE_TELEGRAM_TMPL.format_map, fields):
+            if chunks[-1] and len(chunks[-1]) + len(part) > TELEGRAM_MAX_MESSAGE:
+                chunks.append('')
+            chunks[-1] += part
+        telegram_results = [self.send_telegram_alert(chunk) for chunk in chunks]
+        
+        # Gmail: one email with every trade, then the portfolio after the last one
+        gmail_subject = f"{len(trades)} Trades Executed - latest {fields[-1]['action']} at ${fields[-1]['current_price']:,.0f}"
+        gmail_message = ''.join([
+            f"""
+        <div class="header">
+            <h2>🚀 Bitcoin Trading System</h2>
+            <p>{len(trades)} Trade Execution Alerts</p>
+        </div>""",
+            *map(TRADE_EMAIL_ITEM_TMPL.format_map, fields),
+            TRADE_EMAIL_PORTFOLIO_TMPL.format_map(fields[-1])
+        ])
+        gmail_success = self.send_gmail_alert(gmail_subject, gmail_message)
+        
+        return any(telegram_results) or gmail_success
+    
+    def _trade_alert_fields(self, trade_data, portfolio_state, current_price):
+        """Values for the trade alert templates"""
+        action = trade_data['action']
+        profit = trade_data.get('profit', 0)
+        show_profit = action == 'SELL' and profit > 0
+        
+        return {
+            'emoji': "🟢" if action == 'BUY' else "🔴" if action == 'SELL' else "⚪",
+            'action': action,
+            'trade_amount': trade_data.get('trade_amount', 0),
+            'current_price': current_price,
+            'btc_traded': trade_data.get('btc_traded', 0),
+            'reason': trade_data.get('reason', ''),
+            'btc': portfolio_state.btc,
+            'cash': portfolio_state.cash,
+            'total_value': portfolio_state.total_value,
+            'trade_class': 'trade-buy' if action == 'BUY' else 'trade-sell',
+            'profit_line': f'Profit: ${profit:,.2f}' if show_profit else '',
+            'profit_html': f'<p><strong>Profit:</strong> ${profit:,.2f}</p>' if show_profit else ''
+        }
+    
     def send_system_activation_alert(self, current_price, initial_cash):
         """Send system activation alert"""
         message = f"""
@@ -232,43 +442,147 @@ Strategy: {strategy_action} - {strategy_reason}
         """
         self.send_gmail_alert(gmail_subject, gmail_message)
 
+# Rule-based signals as (action, position %, reason), indexed by rule_based_signals codes
+RULE_SIGNALS = (
+    ("HOLD", 0.0, "High volatility (ATR: ${atr:.0f}) - Risk management"),
+    ("BUY", 15.0, "Bullish trend with RSI oversold - Strong buy signal"),
+    ("BUY", 10.0, "Bullish momentum with room to grow"),
+    ("BUY", 8.0, "Strong uptrend confirmation"),
+    ("HOLD", 0.0, "Bullish but waiting for better entry"),
+    ("SELL", 15.0, "Bearish trend with RSI overbought - Strong sell signal"),
+    ("SELL", 10.0, "Bearish momentum building"),
+    ("SELL", 8.0, "Strong downtrend confirmation"),
+    ("HOLD", 0.0, "Bearish but waiting for better exit"),
+)
+SIGNAL_HIGH_VOLATILITY, SIGNAL_BULLISH_WAIT, SIGNAL_BEARISH_WAIT = 0, 4, 8
+
+INDICATOR_COLUMNS = ['Close', 'RSI_14', 'SMA_20', 'SMA_50', 'SMA_200', 'EMA_12', 'EMA_26', 'MACD', 'ATR_14']
+
+@dataclass(slots=True)
+class Portfolio:
+    """Backtest account state; slotted attributes keep the per-bar reads and writes cheap"""
+    cash: float
+    btc: float
+    total_value: float
+    realized_profit: float
+
 class OptimizedBacktest:
     def __init__(self, initial_cash=100000):
         self.initial_cash = initial_cash
-        self.portfolio = {
-            'cash': initial_cash,
-            'btc': 0.0,
-            'total_value': initial_cash,
-            'realized_profit': 0.0
-        }
+        self.portfolio = Portfolio(cash=initial_cash, btc=0.0, total_value=initial_cash, realized_profit=0.0)
         self.trading_history = []
-        self.portfolio_history = []
         self.alert_system = AlertSystem()
+        self.reset_portfolio_history(0)
+        
+        # Running trade counts and volume, saved as the dashboard's trade_counts.json sidecar
+        self.trade_counts = {'total_trades': 0, 'ai_decisions': 0, 'rule_decisions': 0,
+                             'buy_trades': 0, 'sell_trades': 0, 'traded_notional': 0.0}
+        
+        # Streaming trade writer (opened on the first trade) and its pending rows
+        self.trades_path = TRADES_PATH
+        self._trade_writer = None
+        self._trade_batch = []
         
         # Trading parameters
         self.min_trade_usd = 10
         self.atr_high = 1000
         
+    def reset_portfolio_history(self, capacity):
+        """Preallocate one array per snapshot field for up to capacity portfolio snapshots"""
+        self._history_timestamps = np.empty(capacity, dtype='datetime64[us]')
+        self._history = {field: np.empty(capacity, dtype=np.float64) for field in PORTFOLIO_HISTORY_FIELDS}
+        self.portfolio_snapshots = 0
+    
+    def record_portfolio_snapshot(self, timestamp, price):
+        """Store the current portfolio state in the next history slot"""
+        i = self.portfolio_snapshots
+        btc_value = self.portfolio.btc * price
+        self._history_timestamps[i] = np.datetime64(timestamp, 'us')
+        self._history['price'][i] = price
+        self._history['cash'][i] = self.portfolio.cash
+        self._history['btc_holdings'][i] = self.portfolio.btc
+        self._history['btc_value'][i] = btc_value
+        self._history['total_value'][i] = self.portfolio.total_value
+        self._history['realized_profit'][i] = self.portfolio.realized_profit
+        self._history['unrealized_profit'][i] = self.portfolio.total_value - self.initial_cash
+        self.portfolio_snapshots = i + 1
+    
+    def portfolio_history_table(self):
+        """Recorded portfolio snapshots as an Arrow table (zero-copy views of the arrays)"""
+        n = self.portfolio_snapshots
+        return pa.table({
+            'timestamp': self._history_timestamps[:n],
+            **{field: values[:n] for field, values in self._history.items()}
+        })
+    
+    def record_trade(self, trade_details):
+        """Keep a trade and queue it for the trade history file, writing a row group per TRADE_BATCH_ROWS trades"""
+        self.trading_history.append(trade_details)
+        self.trade_counts['total_trades'] += 1
+        self.trade_counts['ai_decisions' if trade_details['decision_source'] == 'AI' else 'rule_decisions'] += 1
+        self.trade_counts['buy_trades' if trade_details['type'] == 'BUY' else 'sell_trades'] += 1
+        self.trade_counts['traded_notional'] += trade_details['trade_amount']
+        self._trade_batch.append(trade_details)
+        if len(self._trade_batch) >= TRADE_BATCH_ROWS:
+            self._flush_trades()
+    
+    def _flush_trades(self):
+        if not self._trade_batch:
+            return
+        if self._trade_writer is None:
+            os.makedirs(os.path.dirname(self.trades_path), exist_ok=True)
+            self._trade_writer = pq.ParquetWriter(self.trades_path + '.tmp', TRADE_SCHEMA, compression='snappy')
+        self._trade_writer.write_table(pa.Table.from_pylist(self._trade_batch, schema=TRADE_SCHEMA))
+        self._trade_batch = []
+    
+    def close_trade_log(self):
+        """Write the remaining trades and publish the file; readers never see a half-written history"""
+        self._flush_trades()
+        if self._trade_writer is None:
+            return False
+        self._trade_writer.close()
+        self._trade_writer = None
+        os.replace(self.trades_path + '.tmp', self.trades_path)
+        return True
+    
     def fetch_6months_binance_data(self, symbol="BTCUSDT", interval="1h"):
-        """Fetch 6 months of Bitcoin data from Binance"""
+        """Fetch 6 months of Bitcoin data from Binance (incrementally, on top of the local klines cache)"""
         print("📊 Fetching 6 months of Bitcoin data from Binance...")
         
         try:
-            # Calculate 6 months ago
-            end_date = datetime.now()
+            # Calculate 6 months ago (Binance candle times are UTC)
+            end_date = pd.Timestamp.now(tz='UTC').tz_localize(None)
             start_date = end_date - timedelta(days=180)
+            cache_path = KLINES_CACHE_PATH.format(symbol=symbol, interval=interval)
+            
+            cached = None
+            if os.path.exists(cache_path):
+                try:
+                    cached = pd.read_parquet(cache_path, engine='pyarrow')
+                except Exception as e:
+                    print(f"⚠️ Ignoring unreadable klines cache: {e}")
+            
+            # Closed candles never change, so only the bars after the cached tail are downloaded;
+            # the last cached bar is re-fetched because it may still have been open
+            if cached is not None and len(cached) > 0 and cached['Datetime'].iloc[-1] >= start_date:
+                last_bar = cached['Datetime'].iloc[-1]
+                if end_date - last_bar < pd.Timedelta(interval):
+                    df = cached[cached['Datetime'] >= start_date].reset_index(drop=True)
+                    print(f"✅ Loaded {len(df)} hours of Bitcoin data from cache (6 months)")
+                    return df
+                fetch_start = last_bar
+            else:
+                cached = None
+                fetch_start = start_date
             
             klines = client.get_historical_klines(
                 symbol=symbol,
                 interval=interval,
-                start_str=start_date.strftime("%d %b, %Y"),
-                end_str=end_date.strftime("%d %b, %Y")
+                start_str=int(fetch_start.value // 1_000_000)
             )
             
-            df = pd.DataFrame(klines, columns=[
-                'Open Time', 'Open', 'High', 'Low', 'Close', 'Volume',
-                'Close Time', 'Quote Asset Volume', 'Number of Trades',
-                'Taker Buy Base Asset Volume', 'Taker Buy Quote Asset Volume', 'Ignore'
+            df = pd.DataFrame([kline[:6] for kline in klines], columns=[
+                'Open Time', 'Open', 'High', 'Low', 'Close', 'Volume'
             ])
             
             # Convert data types
@@ -278,10 +592,20 @@ class OptimizedBacktest:
                 df[col] = pd.to_numeric(df[col])
             
             df = df.rename(columns={'Open Time': 'Datetime'})
-            df = df[['Datetime', 'Open', 'High', 'Low', 'Close', 'Volume']]
+            
+            if cached is not None:
+                df = pd.concat([cached, df], ignore_index=True)
+                df = df.drop_duplicates('Datetime', keep='last')
+            df = df[df['Datetime'] >= start_date].reset_index(drop=True)
+            
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+            except Exception as e:
+                print(f"⚠️ Could not update klines cache: {e}")
             
             print(f"✅ Fetched {len(df)} hours of Bitcoin data (6 months)")
-            print(f"📅 Date range: {df['Datetime'].min()} to {df['Datetime'].max()}")
+            print(f"📅 Date range: {df['Datetime'].iloc[0]} to {df['Datetime'].iloc[-1]}")
             
             return df
             
@@ -293,131 +617,155 @@ class OptimizedBacktest:
         """Calculate comprehensive technical indicators"""
         print("📈 Calculating technical indicators...")
         
-        data = df.copy()
+        close = df['Close'].to_numpy(dtype=np.float64)
+        high = df['High'].to_numpy(dtype=np.float64)
+        low = df['Low'].to_numpy(dtype=np.float64)
+        prev_close = np.concatenate(([np.nan], close[:-1]))
         
         # RSI
-        delta = data['Close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        data['RSI_14'] = 100 - (100 / (1 + rs))
+        delta = close - prev_close
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), 14)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), 14)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
         
         # Moving Averages
-        data['SMA_20'] = data['Close'].rolling(20).mean()
-        data['SMA_50'] = data['Close'].rolling(50).mean()
-        data['SMA_200'] = data['Close'].rolling(200).mean()
-        data['EMA_12'] = data['Close'].ewm(span=12).mean()
-        data['EMA_26'] = data['Close'].ewm(span=26).mean()
+        close_series = df['Close']
+        ema12 = close_series.ewm(span=12).mean().to_numpy()
+        ema26 = close_series.ewm(span=26).mean().to_numpy()
         
         # MACD
-        data['MACD'] = data['EMA_12'] - data['EMA_26']
-        data['MACD_Signal'] = data['MACD'].ewm(span=9).mean()
+        macd = ema12 - ema26
+        macd_signal = pd.Series(macd).ewm(span=9).mean().to_numpy()
         
-        # ATR
-        high_low = data['High'] - data['Low']
-        high_close = abs(data['High'] - data['Close'].shift())
-        low_close = abs(data['Low'] - data['Close'].shift())
-        true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        data['ATR_14'] = true_range.rolling(14).mean()
+        # ATR (fmax skips the missing previous close on the first bar)
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
         
-        # Fill NaN values
-        data = data.ffill().bfill()
+        # Build the indicators as one float block and join it once (assign would insert
+        # them column by column); warm-up NaNs are filled on the arrays, not the frame
+        indicators = pd.DataFrame({
+            'RSI_14': fill_gaps(rsi),
+            'SMA_20': fill_gaps(rolling_mean(close, 20)),
+            'SMA_50': fill_gaps(rolling_mean(close, 50)),
+            'SMA_200': fill_gaps(rolling_mean(close, 200)),
+            'EMA_12': ema12,
+            'EMA_26': ema26,
+            'MACD': macd,
+            'MACD_Signal': macd_signal,
+            'ATR_14': fill_gaps(rolling_mean(true_range, 14))
+        }, index=df.index)
+        data = pd.concat([df, indicators], axis=1)
         
         print("✅ Indicators calculated!")
         return data
 
     def rule_based_strategy(self, market_data, portfolio_state):
-        """Enhanced rule-based strategy with better logic"""
+        """Enhanced rule-based strategy for one bar (scalar counterpart of rule_based_signals)"""
         price = market_data['price']
         rsi = market_data['rsi']
-        sma20 = market_data['sma20']
-        sma50 = market_data['sma50']
-        sma200 = market_data['sma200']
         ema12 = market_data['ema12']
         ema26 = market_data['ema26']
         macd = market_data['macd']
         atr = market_data['atr']
         
-        cash = portfolio_state['cash']
-        btc = portfolio_state['btc']
+        # Same branch order as the masks in rule_based_signals
+        if atr > self.atr_high:
+            signal = SIGNAL_HIGH_VOLATILITY
+        elif market_data['sma50'] > market_data['sma200']:
+            signal = (1 if rsi < 30 else
+                      2 if macd > 0 and rsi < 60 else
+                      3 if price > ema12 and ema12 > ema26 else
+                      SIGNAL_BULLISH_WAIT)
+        else:
+            signal = (5 if rsi > 70 else
+                      6 if macd < 0 and rsi > 40 else
+                      7 if price < ema12 and ema12 < ema26 else
+                      SIGNAL_BEARISH_WAIT)
         
-        strat_action = "HOLD"
-        strat_percent = 0.0
-        reason = ""
-
-        # Market condition analysis
-        trend_strength = "BULLISH" if sma50 > sma200 else "BEARISH"
-        volatility_status = "HIGH" if atr > self.atr_high else "NORMAL"
-        rsi_status = "OVERSOLD" if rsi < 30 else "OVERBOUGHT" if rsi > 70 else "NEUTRAL"
+        return self.rule_decision(signal, portfolio_state.cash, portfolio_state.btc, atr)
+    
+    def rule_decision(self, signal, cash, btc, atr):
+        """Decision dict for a RULE_SIGNALS code; buy/sell signals wait when there is no cash/BTC to trade"""
+        strat_action, strat_percent, reason = RULE_SIGNALS[signal]
+        if strat_action == "BUY" and cash <= self.min_trade_usd:
+            strat_action, strat_percent, reason = RULE_SIGNALS[SIGNAL_BULLISH_WAIT]
+        elif strat_action == "SELL" and btc <= 0:
+            strat_action, strat_percent, reason = RULE_SIGNALS[SIGNAL_BEARISH_WAIT]
+        elif signal == SIGNAL_HIGH_VOLATILITY:
+            reason = reason.format(atr=atr)
         
-        # Enhanced strategy logic
-        if volatility_status == "HIGH":
-            strat_action = "HOLD"
-            reason = f"High volatility (ATR: ${atr:.0f}) - Risk management"
-            
-        elif trend_strength == "BULLISH":
-            if rsi_status == "OVERSOLD" and cash > self.min_trade_usd:
-                strat_action, strat_percent = "BUY", 15.0
-                reason = "Bullish trend with RSI oversold - Strong buy signal"
-            elif macd > 0 and rsi < 60 and cash > self.min_trade_usd:
-                strat_action, strat_percent = "BUY", 10.0
-                reason = "Bullish momentum with room to grow"
-            elif price > ema12 and ema12 > ema26 and cash > self.min_trade_usd:
-                strat_action, strat_percent = "BUY", 8.0
-                reason = "Strong uptrend confirmation"
-            else:
-                strat_action = "HOLD"
-                reason = "Bullish but waiting for better entry"
-                
-        elif trend_strength == "BEARISH":
-            if rsi_status == "OVERBOUGHT" and btc > 0:
-                strat_action, strat_percent = "SELL", 15.0
-                reason = "Bearish trend with RSI overbought - Strong sell signal"
-            elif macd < 0 and rsi > 40 and btc > 0:
-                strat_action, strat_percent = "SELL", 10.0
-                reason = "Bearish momentum building"
-            elif price < ema12 and ema12 < ema26 and btc > 0:
-                strat_action, strat_percent = "SELL", 8.0
-                reason = "Strong downtrend confirmation"
-            else:
-                strat_action = "HOLD"
-                reason = "Bearish but waiting for better exit"
-                
-        else:
-            # Sideways market
-            if rsi < 35 and cash > self.min_trade_usd:
-                strat_action, strat_percent = "BUY", 5.0
-                reason = "RSI oversold in sideways market"
-            elif rsi > 65 and btc > 0:
-                strat_action, strat_percent = "SELL", 5.0
-                reason = "RSI overbought in sideways market"
-            else:
-                strat_action = "HOLD"
-                reason = "Sideways market - No clear signal"
-
         return {
             "action": strat_action,
             "position_size": strat_percent,
             "reason": reason,
             "source": "RULE_BASED"
         }
+    
+    def rule_based_signals(self, data):
+        """Vectorized rule_based_strategy over indicator arrays: one RULE_SIGNALS code per bar, assuming capital is available"""
+        price, rsi, macd, atr = data['Close'], data['RSI_14'], data['MACD'], data['ATR_14']
+        ema12, ema26 = data['EMA_12'], data['EMA_26']
+        bullish = data['SMA_50'] > data['SMA_200']
+        bearish = ~bullish
+        
+        # Same precedence as the if/elif chain in rule_based_strategy
+        conditions = [
+            atr > self.atr_high,
+            bullish & (rsi < 30),
+            bullish & (macd > 0) & (rsi < 60),
+            bullish & (price > ema12) & (ema12 > ema26),
+            bullish,
+            bearish & (rsi > 70),
+            bearish & (macd < 0) & (rsi > 40),
+            bearish & (price < ema12) & (ema12 < ema26),
+        ]
+        return np.select(conditions, np.arange(len(conditions)), default=SIGNAL_BEARISH_WAIT)
 
 class FastGemmaAIAgent:
     """Optimized Gemma AI Trading Agent with faster response times"""
     
+    # Model availability is shared by every agent in the process: (checked_at, available)
+    AI_STATUS_TTL = 60
+    _ai_status_cache = None
+    
+    # AI answers by bucketed market state, shared by every agent in the process (LRU)
+    AI_CACHE_SIZE = 4096
+    _ai_cache = OrderedDict()
+    
+    # _request_ai_decision result when Ollama could not be reached; never cached, so a
+    # transient failure does not pin the market state to the rules for later runs
+    AI_FAILED = object()
+    
+    # Overall budget for prefetch_ai_decisions, well inside the dashboard's 300s backtest timeout
+    AI_PREFETCH_TIMEOUT = 120
+    
     def __init__(self):
         self.ollama_url = "http://localhost:11434/api/generate"
+        # Pooled connection to the local Ollama server; no retries so a timeout falls back to rules at once
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=0))
         self.ai_enabled = self.check_ai_connection()
         self.learning_history = []
-        self.last_ai_call = 0
-        self.ai_call_delay = 2  # Minimum seconds between AI calls
+        
+        # Ollama requests made by prefetch_ai_decisions
+        self._ai_executor = ThreadPoolExecutor(max_workers=2)
         
     def check_ai_connection(self):
-        """Check if AI is available"""
+        """Check if AI is available (cached for AI_STATUS_TTL seconds across agents)"""
+        cached = FastGemmaAIAgent._ai_status_cache
+        if cached is not None and time.monotonic() - cached[0] < self.AI_STATUS_TTL:
+            return cached[1]
+        
+        available = self._query_ai_models()
+        FastGemmaAIAgent._ai_status_cache = (time.monotonic(), available)
+        return available
+    
+    def _query_ai_models(self):
+        """Ask Ollama for its models and look for a Gemma one"""
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=3)
+            response = self.session.get("http://localhost:11434/api/tags", timeout=3)
             if response.status_code == 200:
-                models = response.json().get("models", [])
+                models = orjson.loads(response.content).get("models", [])
                 gemma_models = [m for m in models if "gemma" in m.get("name", "").lower()]
                 if gemma_models:
                     print(f"✅ Gemma AI: Connected - {gemma_models[0]['name']}")
@@ -430,11 +778,9 @@ class FastGemmaAIAgent:
     
     def should_use_ai(self, market_data, rule_decision):
         """Determine if AI should be consulted for this decision"""
-        # Don't use AI too frequently
-        current_time = time.time()
-        if current_time - self.last_ai_call < self.ai_call_delay:
+        if not self.ai_enabled:
             return False
-            
+        
         # Only use AI for significant market movements or conflicting signals
         price = market_data['price']
         sma50 = market_data['sma50']
@@ -453,23 +799,75 @@ class FastGemmaAIAgent:
             rule_decision['position_size'] >= 15  # Large position size
         )
         
-        return significant_event and self.ai_enabled
+        return significant_event
     
     def get_ai_decision(self, market_data, portfolio_state, rule_decision):
-        """Get AI-enhanced trading decision with timeout protection"""
+        """AI-enhanced decision from the market-state cache filled by prefetch_ai_decisions;
+        never blocks, states without an answer trade on the rules"""
         if not self.should_use_ai(market_data, rule_decision):
             return rule_decision
         
+        key = self._market_key(market_data, rule_decision)
+        if key in self._ai_cache:
+            self._ai_cache.move_to_end(key)
+            # None means the AI had no meaningful improvement for this state
+            return self._ai_cache[key] or rule_decision
+        return rule_decision
+    
+    def prefetch_ai_decisions(self, candidates):
+        """Ask Ollama about every significant (market_data, rule_decision) up front, one request
+        per market state not cached yet, and wait up to AI_PREFETCH_TIMEOUT seconds for the
+        answers; states still unanswered then trade on the rules. Returns the number of requests made"""
+        if not self.ai_enabled:
+            return 0
+        
+        futures = {}
+        for market_data, rule_decision in candidates:
+            if not self.should_use_ai(market_data, rule_decision):
+                continue
+            key = self._market_key(market_data, rule_decision)
+            if key in self._ai_cache or key in futures:
+                continue
+            prompt = self._build_fast_prompt(market_data, rule_decision)
+            futures[key] = self._ai_executor.submit(self._request_ai_decision, prompt, rule_decision)
+        
+        done, not_done = wait(futures.values(), timeout=self.AI_PREFETCH_TIMEOUT)
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            print(f"⚠️ Gemma AI: {len(not_done)}/{len(futures)} market states unanswered after "
+                  f"{self.AI_PREFETCH_TIMEOUT}s, using rules for them")
+        
+        failed = 0
+        for key, future in futures.items():
+            if future not in done:
+                continue
+            decision = future.result()
+            if decision is self.AI_FAILED:
+                failed += 1
+                continue
+            self._ai_cache[key] = decision
+            if len(self._ai_cache) > self.AI_CACHE_SIZE:
+                self._ai_cache.popitem(last=False)
+        if failed:
+            print(f"⚠️ Gemma AI: {failed}/{len(futures)} requests failed, using rules for them")
+        return len(futures)
+    
+    def _market_key(self, market_data, rule_decision):
+        """Bucketed market state, so similar bars share one AI answer"""
+        return (
+            market_data['sma50'] > market_data['sma200'],
+            round(market_data['rsi'] / 5),
+            round((market_data['price'] - market_data['sma50']) / market_data['sma50'] * 100),
+            round(market_data['atr'] / 100),
+            rule_decision['action'],
+            rule_decision['position_size']
+        )
+    
+    def _request_ai_decision(self, prompt, rule_decision):
+        """Blocking Ollama call (runs on the agent's executor); the AI decision, None to keep the
+        rules, or AI_FAILED when the request itself failed"""
         try:
-            # Rate limiting
-            current_time = time.time()
-            if current_time - self.last_ai_call < self.ai_call_delay:
-                return rule_decision
-                
-            self.last_ai_call = current_time
-            
-            prompt = self._build_fast_prompt(market_data, portfolio_state, rule_decision)
-            
             payload = {
                 "model": "gemma:2b",
                 "prompt": prompt,
@@ -483,10 +881,10 @@ class FastGemmaAIAgent:
             }
             
             # Reduced timeout for faster fallback
-            response = requests.post(self.ollama_url, json=payload, timeout=8)
+            response = self.session.post(self.ollama_url, data=orjson.dumps(payload), headers=JSON_HEADERS, timeout=8)
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 ai_decision = self._parse_ai_response(result["response"])
                 
                 # Only use AI decision if it's significantly different
@@ -495,7 +893,7 @@ class FastGemmaAIAgent:
                     return ai_decision
                 else:
                     print(f"🤖 GEMMA: Using rule-based (no meaningful improvement)")
-                    return rule_decision
+                    return None
             else:
                 print(f"⚠️ Gemma AI: HTTP error {response.status_code}")
                 
@@ -506,19 +904,24 @@ class FastGemmaAIAgent:
         except Exception as e:
             print(f"⚠️ Gemma AI error: {e}")
         
-        return rule_decision
+        return self.AI_FAILED
     
-    def _build_fast_prompt(self, market_data, portfolio_state, rule_decision):
-        """Build optimized prompt for faster response"""
+    def close(self):
+        """Shut down the request threads (dropping requests a timed-out prefetch left queued)
+        and release pooled connections"""
+        self._ai_executor.shutdown(cancel_futures=True)
+        self.session.close()
+    
+    def _build_fast_prompt(self, market_data, rule_decision):
+        """Build optimized prompt for faster response; holdings are left out because one
+        answer is shared by every bar in the same market state (see _market_key)"""
         price, rsi, sma50, sma200 = market_data['price'], market_data['rsi'], market_data['sma50'], market_data['sma200']
         macd, atr = market_data['macd'], market_data['atr']
-        cash, btc = portfolio_state['cash'], portfolio_state['btc']
         
         trend = "BULL" if sma50 > sma200 else "BEAR"
         rsi_status = "LOW" if rsi < 30 else "HIGH" if rsi > 70 else "MID"
         
         return f"""BTC: ${price:.0f} | Trend: {trend} | RSI: {rsi:.0f}({rsi_status}) | ATR: ${atr:.0f}
-Cash: ${cash:.0f} | BTC: {btc:.4f}
 Rule: {rule_decision['action']} {rule_decision['position_size']}% - {rule_decision['reason']}
 Improve? Respond with JSON: {{"action":"BUY/SELL/HOLD","position_size":0-20,"reason":"brief","improvement":"what changed"}}"""
     
@@ -533,8 +936,15 @@ Improve? Respond with JSON: {{"action":"BUY/SELL/HOLD","position_size":0-20,"rea
             
         return False
     
-    def _parse_ai_response(self, response):
-        """Parse AI response safely"""
+    @staticmethod
+    def _parse_ai_response(response):
+        """Parse AI response safely; a fresh decision dict on every call"""
+        return dict(FastGemmaAIAgent._parse_ai_response_items(response))
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _parse_ai_response_items(response):
+        """Parsed decision as an immutable tuple of (key, value) pairs, memoized on the raw text"""
         try:
             clean_response = response.strip()
             
@@ -544,7 +954,7 @@ Improve? Respond with JSON: {{"action":"BUY/SELL/HOLD","position_size":0-20,"rea
             
             if start != -1 and end != 0:
                 json_str = clean_response[start:end]
-                decision = json.loads(json_str)
+                decision = orjson.loads(json_str)
                 
                 # Validate required fields
                 if all(key in decision for key in ['action', 'position_size', 'reason']):
@@ -554,48 +964,23 @@ Improve? Respond with JSON: {{"action":"BUY/SELL/HOLD","position_size":0-20,"rea
                     decision['source'] = "AI_ENHANCED"
                     if 'improvement' not in decision:
                         decision['improvement'] = "Risk-adjusted position sizing"
-                    return decision
-        except json.JSONDecodeError:
+                    return tuple(decision.items())
+        except orjson.JSONDecodeError:
             print("⚠️ Gemma AI: Invalid JSON response")
         except Exception as e:
             print(f"⚠️ Gemma AI: Parse error - {e}")
         
         # Safe fallback
-        return {
-            "action": "HOLD", 
-            "position_size": 0, 
-            "reason": "AI parse error", 
-            "improvement": "Used fallback",
-            "source": "AI_FALLBACK"
-        }
+        return (
+            ("action", "HOLD"),
+            ("position_size", 0),
+            ("reason", "AI parse error"),
+            ("improvement", "Used fallback"),
+            ("source", "AI_FALLBACK")
+        )
 
-def run_optimized_backtest():
-    """Run optimized 6-month backtest with alerts only for recent trades"""
-    print("🚀 Starting Optimized 6-Month Bitcoin Backtest")
-    print("=" * 60)
-    
-    start_time = time.time()
-    
-    # Initialize backtest
-    backtest = OptimizedBacktest(initial_cash=100000)
-    gemma_agent = FastGemmaAIAgent()
-    
-    # Step 1: Fetch 6 months of data
-    print("\n1. 📊 FETCHING 6 MONTHS OF BINANCE DATA...")
-    df = backtest.fetch_6months_binance_data()
-    if df is None:
-        print("❌ Failed to fetch data")
-        return
-    
-    # Step 2: Calculate indicators
-    print("\n2. 📈 CALCULATING TECHNICAL INDICATORS...")
-    df_with_indicators = backtest.calculate_technical_indicators(df)
-    
-    # Step 3: Run backtest (silent mode for historical data)
-    print("\n3. 🤖 RUNNING HISTORICAL BACKTEST (SILENT MODE)...")
-    print("   Saving all trade decisions to CSV files...")
-    print("   Alerts will only be sent for the most recent trades...")
-    
+def simulate_backtest(backtest, df_with_indicators, gemma_agent=None, verbose=True):
+    """Walk the sampled bars once, trading backtest.portfolio; returns decision counts and the recent trades to alert on"""
     total_rows = len(df_with_indicators)
     processed = 0
     ai_decisions = 0
@@ -604,33 +989,60 @@ def run_optimized_backtest():
     
     # Determine the cutoff point for "recent" trades (last 2 weeks of data)
     recent_cutoff = len(df_with_indicators) - (24 * 14)  # Last 14 days
+    recent_trades = []
     
-    # Process data (every 24th row for performance - ~1 trade per day)
-    for idx, row in df_with_indicators.iloc[::24].iterrows():
-        if idx < 200:  # Skip warm-up period for indicators
-            continue
-            
+    # Process data (every 24th row for performance - ~1 trade per day), skipping the
+    # indicator warm-up period (first 200 rows)
+    first_row = -(-200 // 24) * 24
+    sampled = df_with_indicators.iloc[first_row::24]
+    total_steps = len(sampled)
+    backtest.reset_portfolio_history(total_steps // 30 + 1)
+    next_progress = time.monotonic() + PROGRESS_INTERVAL
+    
+    # Column arrays plus the rule signals for every sampled bar up front; the loop
+    # only has to carry the sequential cash/BTC state
+    indicators = {col: sampled[col].to_numpy(dtype=np.float64) for col in INDICATOR_COLUMNS}
+    signals = backtest.rule_based_signals(indicators)
+    is_recent = np.arange(first_row, total_rows, 24) >= recent_cutoff
+    rows = list(zip(
+        is_recent.tolist(),
+        sampled['Datetime'].tolist(),
+        *(indicators[col].tolist() for col in INDICATOR_COLUMNS),
+        signals.tolist()
+    ))
+    
+    # The AI is asked about every significant bar before the loop, under both rule decisions
+    # the bar can get (with and without cash/BTC to trade), so the loop only reads the agent's
+    # cache and the run does not depend on how fast Ollama answers
+    use_ai = gemma_agent is not None and gemma_agent.ai_enabled
+    if use_ai:
+        candidates = []
+        for _, _, price, rsi, sma20, sma50, sma200, ema12, ema26, macd, atr, signal in rows:
+            market_data = {
+                "price": price, "rsi": rsi, "sma20": sma20, "sma50": sma50, 
+                "sma200": sma200, "ema12": ema12, "ema26": ema26, 
+                "macd": macd, "atr": atr
+            }
+            candidates.append((market_data, backtest.rule_decision(signal, np.inf, np.inf, atr)))
+            candidates.append((market_data, backtest.rule_decision(signal, 0, 0, atr)))
+        requested = gemma_agent.prefetch_ai_decisions(candidates)
+        if verbose:
+            print(f"🤖 Gemma AI: {requested} market states analysed")
+    
+    for recent, timestamp, price, rsi, sma20, sma50, sma200, ema12, ema26, macd, atr, signal in rows:
         processed += 1
-        timestamp = row["Datetime"]
-        price = float(row["Close"])
-        rsi = float(row["RSI_14"])
-        sma20, sma50, sma200 = float(row["SMA_20"]), float(row["SMA_50"]), float(row["SMA_200"])
-        ema12, ema26 = float(row["EMA_12"]), float(row["EMA_26"])
-        macd = float(row["MACD"])
-        atr = float(row["ATR_14"])
-        
-        # Market data
-        market_data = {
-            "price": price, "rsi": rsi, "sma20": sma20, "sma50": sma50, 
-            "sma200": sma200, "ema12": ema12, "ema26": ema26, 
-            "macd": macd, "atr": atr
-        }
-        
-        # Get rule-based decision
-        rule_decision = backtest.rule_based_strategy(market_data, backtest.portfolio)
+        rule_decision = backtest.rule_decision(signal, backtest.portfolio.cash, backtest.portfolio.btc, atr)
         
         # Get AI-enhanced decision (with smart filtering)
-        final_decision = gemma_agent.get_ai_decision(market_data, backtest.portfolio, rule_decision)
+        if use_ai:
+            market_data = {
+                "price": price, "rsi": rsi, "sma20": sma20, "sma50": sma50, 
+                "sma200": sma200, "ema12": ema12, "ema26": ema26, 
+                "macd": macd, "atr": atr
+            }
+            final_decision = gemma_agent.get_ai_decision(market_data, backtest.portfolio, rule_decision)
+        else:
+            final_decision = rule_decision
         
         if final_decision['source'] == "AI_ENHANCED":
             ai_decisions += 1
@@ -639,191 +1051,230 @@ def run_optimized_backtest():
             rule_decisions += 1
             decision_source = "RULES"
         
-        # Execute trade
+        # Execute trade; the trade record is only built when one actually happens
         action = final_decision['action']
         position_size = final_decision['position_size']
-        reason = final_decision['reason']
+        cash_before = backtest.portfolio.cash
+        btc_before = backtest.portfolio.btc
+        value_before = backtest.portfolio.total_value
+        fill = None
         
-        trade_executed = False
-        trade_details = {
-            'timestamp': timestamp,
-            'action': action,
-            'price': price,
-            'position_size': position_size,
-            'reason': reason,
-            'decision_source': decision_source,
-            'cash_before': backtest.portfolio['cash'],
-            'btc_before': backtest.portfolio['btc'],
-            'portfolio_value_before': backtest.portfolio['total_value'],
-            'rsi': rsi,
-            'atr': atr,
-            'trend': "BULLISH" if sma50 > sma200 else "BEARISH"
-        }
-        
-        if action == "BUY" and backtest.portfolio['cash'] > backtest.min_trade_usd:
-            trade_amount = backtest.portfolio['cash'] * (position_size / 100.0)
+        if action == "BUY" and cash_before > backtest.min_trade_usd:
+            trade_amount = cash_before * (position_size / 100.0)
             if trade_amount >= backtest.min_trade_usd:
                 btc_bought = trade_amount / price
-                backtest.portfolio['cash'] -= trade_amount
-                backtest.portfolio['btc'] += btc_bought
-                trade_executed = True
+                backtest.portfolio.cash -= trade_amount
+                backtest.portfolio.btc += btc_bought
                 
-                trade_details.update({
+                fill = {
                     'trade_amount': trade_amount,
                     'btc_traded': btc_bought,
                     'type': 'BUY'
-                })
+                }
                 
-        elif action == "SELL" and backtest.portfolio['btc'] > 0:
-            sell_quantity = backtest.portfolio['btc'] * (position_size / 100.0)
+        elif action == "SELL" and btc_before > 0:
+            sell_quantity = btc_before * (position_size / 100.0)
             if sell_quantity > 0:
                 trade_amount = sell_quantity * price
                 # Simple profit calculation
-                profit = sell_quantity * (price - (backtest.portfolio['cash'] / backtest.portfolio['btc'])) if backtest.portfolio['btc'] > 0 else 0
+                profit = max(sell_quantity * (price - (cash_before / btc_before)), 0)  # Only positive profits
                 
-                backtest.portfolio['cash'] += trade_amount
-                backtest.portfolio['btc'] -= sell_quantity
-                backtest.portfolio['realized_profit'] += max(profit, 0)  # Only positive profits
-                trade_executed = True
+                backtest.portfolio.cash += trade_amount
+                backtest.portfolio.btc -= sell_quantity
+                backtest.portfolio.realized_profit += profit
                 
-                trade_details.update({
+                fill = {
                     'trade_amount': trade_amount,
                     'btc_traded': sell_quantity,
-                    'profit': max(profit, 0),
+                    'profit': profit,
                     'type': 'SELL'
-                })
+                }
         
         # Update portfolio value
-        btc_value = backtest.portfolio['btc'] * price
-        backtest.portfolio['total_value'] = backtest.portfolio['cash'] + btc_value
+        btc_value = backtest.portfolio.btc * price
+        backtest.portfolio.total_value = backtest.portfolio.cash + btc_value
         
         # Record trade
-        if trade_executed:
-            trade_details.update({
-                'cash_after': backtest.portfolio['cash'],
-                'btc_after': backtest.portfolio['btc'],
-                'portfolio_value_after': backtest.portfolio['total_value'],
-                'realized_profit': backtest.portfolio['realized_profit']
-            })
-            backtest.trading_history.append(trade_details)
+        if fill is not None:
+            trade_details = {
+                'timestamp': timestamp,
+                'action': action,
+                'price': price,
+                'position_size': position_size,
+                'reason': final_decision['reason'],
+                'decision_source': decision_source,
+                'cash_before': cash_before,
+                'btc_before': btc_before,
+                'portfolio_value_before': value_before,
+                'rsi': rsi,
+                'atr': atr,
+                'trend': "BULLISH" if sma50 > sma200 else "BEARISH",
+                **fill,
+                'cash_after': backtest.portfolio.cash,
+                'btc_after': backtest.portfolio.btc,
+                'portfolio_value_after': backtest.portfolio.total_value,
+                'realized_profit': backtest.portfolio.realized_profit
+            }
+            backtest.record_trade(trade_details)
             trades_executed += 1
             
-            # SEND ALERTS ONLY FOR RECENT TRADES (last 2 weeks)
-            if idx >= recent_cutoff:
+            # ALERT ONLY FOR RECENT TRADES (last 2 weeks), sent together after the loop
+            if recent:
                 market_conditions = {
                     'rsi': rsi,
                     'atr': atr,
                     'trend': "BULLISH" if sma50 > sma200 else "BEARISH"
                 }
-                backtest.alert_system.send_trade_alert(
-                    trade_data=trade_details,
-                    portfolio_state=backtest.portfolio,
-                    current_price=price,
-                    market_conditions=market_conditions
-                )
-                print(f"📧 Alert sent for recent trade: {action} ${trade_details.get('trade_amount', 0):,.0f}")
+                recent_trades.append({
+                    'trade_data': trade_details,
+                    'portfolio_state': replace(backtest.portfolio),
+                    'current_price': price,
+                    'market_conditions': market_conditions
+                })
         
         # Record portfolio snapshot
-        if len(backtest.portfolio_history) == 0 or processed % 30 == 0:
-            portfolio_snapshot = {
-                'timestamp': timestamp,
-                'price': price,
-                'cash': backtest.portfolio['cash'],
-                'btc_holdings': backtest.portfolio['btc'],
-                'btc_value': btc_value,
-                'total_value': backtest.portfolio['total_value'],
-                'realized_profit': backtest.portfolio['realized_profit'],
-                'unrealized_profit': backtest.portfolio['total_value'] - backtest.initial_cash
-            }
-            backtest.portfolio_history.append(portfolio_snapshot)
+        if backtest.portfolio_snapshots == 0 or processed % 30 == 0:
+            backtest.record_portfolio_snapshot(timestamp, price)
         
-        # Progress update
-        if processed % 10 == 0:
-            progress = (processed / (len(df_with_indicators.iloc[::24]) - 8)) * 100
-            print(f"📈 Progress: {processed}/{(len(df_with_indicators.iloc[::24]) - 8)} ({progress:.1f}%) | "
+        # Progress update, at most once per PROGRESS_INTERVAL seconds and always on the last bar
+        if verbose and (processed == total_steps or processed % 10 == 0 and time.monotonic() >= next_progress):
+            next_progress = time.monotonic() + PROGRESS_INTERVAL
+            progress = (processed / total_steps) * 100
+            print(f"📈 Progress: {processed}/{total_steps} ({progress:.1f}%) | "
                   f"Trades: {trades_executed} | AI: {ai_decisions} | Rules: {rule_decisions}")
     
-    # Step 4: Save results
-    print("\n4. 💾 SAVING BACKTEST RESULTS...")
-    save_backtest_results(backtest, df_with_indicators, gemma_agent.learning_history)
-    
-    # Step 5: Send system activation and completion alerts
-    print("\n5. 📧 SENDING SYSTEM ALERTS...")
-    
-    # Send system activation alert with current price
-    current_price = df_with_indicators['Close'].iloc[-1]
-    backtest.alert_system.send_system_activation_alert(
-        current_price=current_price,
-        initial_cash=backtest.initial_cash
-    )
-    
-    # Send trading completed alert
-    final_strategy_action = "BUY" if backtest.portfolio['btc'] > 0 else "SELL" if backtest.portfolio['cash'] < backtest.initial_cash else "HOLD"
-    final_strategy_reason = "Portfolio rebalancing" if len(backtest.trading_history) > 0 else "Initial setup"
-    
-    backtest.alert_system.send_trading_completed_alert(
-        final_portfolio=backtest.portfolio['total_value'],
-        btc_holdings=backtest.portfolio['btc'],
-        strategy_action=final_strategy_action,
-        strategy_reason=final_strategy_reason
-    )
-    
-    # Step 6: Display summary
-    total_time = time.time() - start_time
-    print(f"\n6. 📊 BACKTEST COMPLETED IN {total_time/60:.1f} MINUTES!")
-    print("=" * 50)
-    
-    final_value = backtest.portfolio['total_value']
-    total_return = ((final_value - backtest.initial_cash) / backtest.initial_cash) * 100
-    
-    # Buy & Hold comparison
-    initial_price = df_with_indicators['Close'].iloc[200]
-    final_price = df_with_indicators['Close'].iloc[-1]
-    buy_hold_value = (backtest.initial_cash / initial_price) * final_price
-    buy_hold_return = ((buy_hold_value - backtest.initial_cash) / backtest.initial_cash) * 100
-    
-    print(f"🏆 PERFORMANCE SUMMARY:")
-    print(f"Initial Capital: ${backtest.initial_cash:,.2f}")
-    print(f"Final Portfolio: ${final_value:,.2f}")
-    print(f"Total Return: {total_return:+.2f}%")
-    print(f"Buy & Hold Return: {buy_hold_return:+.2f}%")
-    print(f"Outperformance: {total_return - buy_hold_return:+.2f}%")
-    print(f"Realized Profit: ${backtest.portfolio['realized_profit']:,.2f}")
-    print(f"BTC Holdings: {backtest.portfolio['btc']:.6f}")
-    print(f"Remaining Cash: ${backtest.portfolio['cash']:,.2f}")
-    
-    print(f"\n🤖 TRADING ACTIVITY:")
-    print(f"Total Trades: {trades_executed}")
-    print(f"AI Decisions: {ai_decisions}")
-    print(f"Rule Decisions: {rule_decisions}")
-    if (ai_decisions + rule_decisions) > 0:
-        print(f"AI Utilization: {(ai_decisions/(ai_decisions+rule_decisions))*100:.1f}%")
-    
-    print(f"\n📧 ALERTS SENT: {backtest.alert_system.alert_count} (Recent trades only)")
-    
-    print(f"\n📊 DASHBOARD DATA READY!")
-    print("Run: streamlit run enhanced_dashboard.py")
-    return backtest
+    return {
+        'ai_decisions': ai_decisions,
+        'rule_decisions': rule_decisions,
+        'trades_executed': trades_executed,
+        'recent_trades': recent_trades
+    }
+
+def run_optimized_backtest():
+    """Run optimized 6-month backtest with alerts only for recent trades"""
+    print("🚀 Starting Optimized 6-Month Bitcoin Backtest")
+    print("=" * 60)
+    
+    start_time = time.time()
+    
+    # Initialize backtest
+    backtest = OptimizedBacktest(initial_cash=100000)
+    gemma_agent = FastGemmaAIAgent()
+    
+    try:
+        # Step 1: Fetch 6 months of data
+        print("\n1. 📊 FETCHING 6 MONTHS OF BINANCE DATA...")
+        df = backtest.fetch_6months_binance_data()
+        if df is None:
+            print("❌ Failed to fetch data")
+            return
+        
+        # Step 2: Calculate indicators
+        print("\n2. 📈 CALCULATING TECHNICAL INDICATORS...")
+        df_with_indicators = backtest.calculate_technical_indicators(df)
+        
+        # Step 3: Run backtest (silent mode for historical data)
+        print("\n3. 🤖 RUNNING HISTORICAL BACKTEST (SILENT MODE)...")
+        print("   Saving all trade decisions to Parquet files...")
+        print("   Alerts will only be sent for the most recent trades...")
+        
+        stats = simulate_backtest(backtest, df_with_indicators, gemma_agent)
+        ai_decisions = stats['ai_decisions']
+        rule_decisions = stats['rule_decisions']
+        trades_executed = stats['trades_executed']
+        recent_trades = stats['recent_trades']
+        
+        if recent_trades:
+            backtest.alert_system.send_trade_alerts_batched(recent_trades)
+            print(f"📧 Alerts sent for {len(recent_trades)} recent trades")
+        
+        gemma_agent.close()
+        
+        # Step 4: Save results
+        print("\n4. 💾 SAVING BACKTEST RESULTS...")
+        backtest.alert_system.flush()  # so alerts_sent counts the queued trade emails
+        save_backtest_results(backtest, df_with_indicators, gemma_agent.learning_history)
+        
+        # Step 5: Send system activation and completion alerts
+        print("\n5. 📧 SENDING SYSTEM ALERTS...")
+        
+        # Send system activation alert with current price
+        current_price = df_with_indicators['Close'].iloc[-1]
+        backtest.alert_system.send_system_activation_alert(
+            current_price=current_price,
+            initial_cash=backtest.initial_cash
+        )
+        
+        # Send trading completed alert
+        final_strategy_action = "BUY" if backtest.portfolio.btc > 0 else "SELL" if backtest.portfolio.cash < backtest.initial_cash else "HOLD"
+        final_strategy_reason = "Portfolio rebalancing" if len(backtest.trading_history) > 0 else "Initial setup"
+        
+        backtest.alert_system.send_trading_completed_alert(
+            final_portfolio=backtest.portfolio.total_value,
+            btc_holdings=backtest.portfolio.btc,
+            strategy_action=final_strategy_action,
+            strategy_reason=final_strategy_reason
+        )
+        
+        # Step 6: Display summary
+        total_time = time.time() - start_time
+        print(f"\n6. 📊 BACKTEST COMPLETED IN {total_time/60:.1f} MINUTES!")
+        print("=" * 50)
+        
+        final_value = backtest.portfolio.total_value
+        total_return = ((final_value - backtest.initial_cash) / backtest.initial_cash) * 100
+        
+        # Buy & Hold comparison
+        initial_price = df_with_indicators['Close'].iloc[200]
+        final_price = df_with_indicators['Close'].iloc[-1]
+        buy_hold_value = (backtest.initial_cash / initial_price) * final_price
+        buy_hold_return = ((buy_hold_value - backtest.initial_cash) / backtest.initial_cash) * 100
+        
+        print(f"🏆 PERFORMANCE SUMMARY:")
+        print(f"Initial Capital: ${backtest.initial_cash:,.2f}")
+        print(f"Final Portfolio: ${final_value:,.2f}")
+        print(f"Total Return: {total_return:+.2f}%")
+        print(f"Buy & Hold Return: {buy_hold_return:+.2f}%")
+        print(f"Outperformance: {total_return - buy_hold_return:+.2f}%")
+        print(f"Realized Profit: ${backtest.portfolio.realized_profit:,.2f}")
+        print(f"BTC Holdings: {backtest.portfolio.btc:.6f}")
+        print(f"Remaining Cash: ${backtest.portfolio.cash:,.2f}")
+        
+        print(f"\n🤖 TRADING ACTIVITY:")
+        print(f"Total Trades: {trades_executed} (Buys: {backtest.trade_counts['buy_trades']} | Sells: {backtest.trade_counts['sell_trades']})")
+        print(f"Traded Volume: ${backtest.trade_counts['traded_notional']:,.2f}")
+        print(f"AI Decisions: {ai_decisions}")
+        print(f"Rule Decisions: {rule_decisions}")
+        if (ai_decisions + rule_decisions) > 0:
+            print(f"AI Utilization: {(ai_decisions/(ai_decisions+rule_decisions))*100:.1f}%")
+        
+        backtest.alert_system.close()
+        print(f"\n📧 ALERTS SENT: {backtest.alert_system.alert_count} (Recent trades only)")
+        
+        print(f"\n📊 DASHBOARD DATA READY!")
+        print("Run: streamlit run enhanced_dashboard.py")
+        return backtest
+    finally:
+        # Also on the early return, since the dashboard runs this in-process
+        gemma_agent.close()
+        backtest.alert_system.close()
 
 def save_backtest_results(backtest, market_data, learning_history):
     """Save all backtest results for dashboard"""
     os.makedirs('data', exist_ok=True)
     
-    # Save trading history
-    if backtest.trading_history:
-        trades_df = pd.DataFrame(backtest.trading_history)
-        trades_df.to_csv('data/backtest_trading_history.csv', index=False)
-        print(f"✅ Saved {len(trades_df)} trades to backtest_trading_history.csv")
+    # Trading history was streamed to Parquet during the run; finish and publish it
+    if backtest.close_trade_log():
+        print(f"✅ Saved {len(backtest.trading_history)} trades to backtest_trading_history.parquet")
     
     # Save portfolio history
-    if backtest.portfolio_history:
-        portfolio_df = pd.DataFrame(backtest.portfolio_history)
-        portfolio_df.to_csv('data/backtest_portfolio_history.csv', index=False)
-        print(f"✅ Saved {len(portfolio_df)} portfolio snapshots to backtest_portfolio_history.csv")
+    if backtest.portfolio_snapshots:
+        pq.write_table(backtest.portfolio_history_table(), PORTFOLIO_PATH, compression='snappy')
+        print(f"✅ Saved {backtest.portfolio_snapshots} portfolio snapshots to backtest_portfolio_history.parquet")
     
     # Save market data
-    market_data.to_csv('data/backtest_market_data.csv', index=False)
-    print("✅ Saved market data to backtest_market_data.csv")
+    feather.write_feather(market_data, MARKET_PATH, compression='uncompressed')
+    print("✅ Saved market data to backtest_market_data.arrow")
     
     # Save AI learning history
     if learning_history:
@@ -831,26 +1282,98 @@ def save_backtest_results(backtest, market_data, learning_history):
         learning_df.to_csv('data/ai_learning_history.csv', index=False)
         print(f"✅ Saved {len(learning_df)} AI learning records")
     
+    # Trade counts sidecar, read by the web dashboard instead of re-parsing the trades CSV
+    trade_counts = backtest.trade_counts
+    with open('data/trade_counts.json', 'w') as f:
+        json.dump(trade_counts, f)
+    
     # Save performance summary
     performance = {
         'initial_capital': backtest.initial_cash,
-        'final_portfolio_value': backtest.portfolio['total_value'],
-        'total_return_percent': ((backtest.portfolio['total_value'] - backtest.initial_cash) / backtest.initial_cash) * 100,
-        'realized_profit': backtest.portfolio['realized_profit'],
-        'btc_holdings': backtest.portfolio['btc'],
-        'remaining_cash': backtest.portfolio['cash'],
-        'total_trades': len(backtest.trading_history),
-        'ai_decisions': len([t for t in backtest.trading_history if t['decision_source'] == 'AI']),
-        'rule_decisions': len([t for t in backtest.trading_history if t['decision_source'] == 'RULES']),
+        'final_portfolio_value': backtest.portfolio.total_value,
+        'total_return_percent': ((backtest.portfolio.total_value - backtest.initial_cash) / backtest.initial_cash) * 100,
+        'realized_profit': backtest.portfolio.realized_profit,
+        'btc_holdings': backtest.portfolio.btc,
+        'remaining_cash': backtest.portfolio.cash,
+        **trade_counts,
         'backtest_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'data_period': f"{market_data['Datetime'].min()} to {market_data['Datetime'].max()}",
+        'data_period': f"{market_data['Datetime'].iloc[0]} to {market_data['Datetime'].iloc[-1]}",  # bars are time-ordered
         'data_points_processed': len(market_data),
         'alerts_sent': backtest.alert_system.alert_count
     }
     
-    with open('data/backtest_performance.json', 'w') as f:
-        json.dump(performance, f, indent=2)
+    with open('data/backtest_performance.json', 'wb') as f:
+        f.write(orjson.dumps(performance, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
     print("✅ Saved performance summary to backtest_performance.json")
 
+def _parallel_backtest_worker(symbol, params, df_with_indicators):
+    """Rules-only backtest of one (symbol, params) combination in a worker process"""
+    backtest = OptimizedBacktest(initial_cash=params.get('initial_cash', 100000))
+    backtest.min_trade_usd = params.get('min_trade_usd', backtest.min_trade_usd)
+    backtest.atr_high = params.get('atr_high', backtest.atr_high)
+    
+    # Each combination streams its trades to its own file, so workers never share a writer
+    param_hash = hashlib.sha1(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()[:10]
+    backtest.trades_path = PARALLEL_TRADES_PATH.format(symbol=symbol, param_hash=param_hash)
+    
+    stats = simulate_backtest(backtest, df_with_indicators, verbose=False)
+    backtest.close_trade_log()
+    
+    final_value = backtest.portfolio.total_value
+    return {
+        'symbol': symbol,
+        'params': params,
+        'final_portfolio_value': final_value,
+        'total_return_percent': ((final_value - backtest.initial_cash) / backtest.initial_cash) * 100,
+        'realized_profit': backtest.portfolio.realized_profit,
+        'btc_holdings': backtest.portfolio.btc,
+        'remaining_cash': backtest.portfolio.cash,
+        'total_trades': stats['trades_executed'],
+        'trades_path': backtest.trades_path if stats['trades_executed'] else None
+    }
+
+def run_parallel_backtests(symbols, param_grid, max_workers=None):
+    """Backtest every symbol against every parameter dict across CPU cores.
+
+    A single run is path-dependent, so the parallelism is across independent
+    (symbol, params) combinations. The rule strategy is used on its own: no AI
+    calls and no alerts are made from the workers. Returns one result dict per
+    combination, best total return first.
+    """
+    print(f"🚀 Running {len(symbols) * len(param_grid)} backtests in parallel...")
+    
+    # Data is fetched once per symbol here, so workers don't race on the klines cache
+    loader = OptimizedBacktest()
+    market_data = {}
+    for symbol in symbols:
+        df = loader.fetch_6months_binance_data(symbol=symbol)
+        if df is None:
+            print(f"❌ Skipping {symbol}: no data")
+            continue
+        market_data[symbol] = loader.calculate_technical_indicators(df)
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as ex:
+        futures = {
+            ex.submit(_parallel_backtest_worker, symbol, params, market_data[symbol]): (symbol, params)
+            for symbol, params in product(market_data, param_grid)
+        }
+        for future in as_completed(futures):
+            symbol, params = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Backtest failed for {symbol} {params}: {e}")
+                continue
+            results.append(result)
+            print(f"✅ {symbol} {params}: {result['total_return_percent']:+.2f}% ({result['total_trades']} trades)")
+    
+    results.sort(key=lambda r: r['total_return_percent'], reverse=True)
+    return results
+
+def run():
+    """Entry point for in-process callers; returns the finished backtest, or None if it failed"""
+    return run_optimized_backtest()
+
 if __name__ == "__main__":
-    run_optimized_backtest()
\ No newline at end of file
+    run()
\ No newline at end of file
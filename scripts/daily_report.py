@@ -2,8 +2,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from trading_system import RealTradingSystem
-import pandas as pd
+from trading_system import RealTradingSystem, last_portfolio_value
 from datetime import datetime
 import time
 
@@ -24,18 +23,21 @@ def send_daily_report():
         
         # Show report summary
         try:
-            trades_df = pd.read_csv("data/real_trading_history.csv")
-            portfolio_df = pd.read_csv("data/portfolio_history.csv")
+            # Count trade rows without parsing them; the value comes from the total_value column only
+            with open("data/real_trading_history.csv") as f:
+                total_trades = max(sum(1 for _ in f) - 1, 0)
             
             print(f"\n📊 REPORT SUMMARY:")
-            print(f"   Total Trades: {len(trades_df)}")
-            print(f"   Portfolio Value: ${portfolio_df['total_value'].iloc[-1]:,.2f}" if not portfolio_df.empty else "   Portfolio Value: $100,000")
+            print(f"   Total Trades: {total_trades}")
+            print(f"   Portfolio Value: ${last_portfolio_value():,.2f}")
             print(f"   BTC Price: ${system.current_price:,.2f}")
             
         except Exception as e:
             print(f"❌ Error reading data: {e}")
     else:
         print("❌ Failed to send daily report")
+    
+    system.close()
 
 if __name__ == "__main__":
     print("🚀 Daily Report System")
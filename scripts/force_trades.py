@@ -2,8 +2,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from trading_system import RealTradingSystem
+from trading_system import RealTradingSystem, PORTFOLIO_DATASET_PATH
 import pandas as pd
+import pyarrow.dataset as ds
 from datetime import datetime
 
 def force_trading_activity():
@@ -59,18 +60,20 @@ def force_trading_activity():
     # Restore original ATR threshold
     system.atr_high = original_atr_high
     
-    # Save final portfolio state
+    # Save final portfolio state and write out the buffered trades
     system.save_portfolio_state()
+    system.flush_history()
     
     print("\n🎉 FORCED TRADING COMPLETED!")
     print("📊 Dashboard should now have data!")
     
     # Show what was created
     try:
-        trades_df = pd.read_csv("data/real_trading_history.csv")
-        portfolio_df = pd.read_csv("data/portfolio_history.csv")
+        # Only the columns printed below are parsed; portfolio rows are just counted
+        trades_df = pd.read_csv("data/real_trading_history.csv", usecols=['action', 'amount', 'price'])
+        portfolio_records = ds.dataset(PORTFOLIO_DATASET_PATH, format='parquet').count_rows()
         print(f"📈 Trades created: {len(trades_df)}")
-        print(f"📊 Portfolio records: {len(portfolio_df)}")
+        print(f"📊 Portfolio records: {portfolio_records}")
         
         if len(trades_df) > 0:
             print("\n📋 Recent Trades:")
@@ -79,6 +82,8 @@ def force_trading_activity():
                 
     except Exception as e:
         print(f"❌ Could not read data files: {e}")
+    
+    system.close()
 
 if __name__ == "__main__":
     force_trading_activity()
\ No newline at end of file
@@ -7,62 +7,8 @@ from datetime import datetime, timedelta
 import pandas as pd
 from typing import Dict, List
 
-class EmailReporter:
-    def __init__(self):
-        self.logger = logging.getLogger(__name__)
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
-        self.gmail_user = os.getenv('GMAIL_USER')
-        self.gmail_password = os.getenv('GMAIL_PASSWORD')
-        self.enabled = bool(self.gmail_user and self.gmail_password)
-        
-        if self.enabled:
-            self.logger.info("✅ Email reporting enabled")
-        else:
-            self.logger.warning("❌ Email reporting disabled - set GMAIL_USER and GMAIL_PASSWORD")
-    
-    def send_weekly_report(self, data_manager, trading_agent) -> bool:
-        """Send weekly performance report"""
-        if not self.enabled:
-            return False
-            
-        try:
-            # Get data for report
-            transactions = data_manager.load_transactions()
-            portfolio_history = data_manager.load_portfolio_history()
-            performance = trading_agent.get_performance_metrics()
-            
-            # Generate report content
-            subject = f"📊 Bitcoin Trading Weekly Report - {datetime.now().strftime('%Y-%m-%d')}"
-            html_content = self._generate_html_report(transactions, portfolio_history, performance)
-            
-            # Send email
-            success = self._send_email(subject, html_content)
-            
-            if success:
-                self.logger.info("✅ Weekly email report sent successfully")
-            else:
-                self.logger.error("❌ Failed to send weekly email report")
-                
-            return success
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error sending weekly report: {e}")
-            return False
-    
-    def _generate_html_report(self, transactions: pd.DataFrame, portfolio_history: pd.DataFrame, performance: Dict) -> str:
-        """Generate HTML email content"""
-        
-        # Calculate weekly metrics
-        weekly_trades = len(transactions) if not transactions.empty else 0
-        current_value = portfolio_history['total_value'].iloc[-1] if not portfolio_history.empty else 0
-        initial_cash = 100000  # Default
-        total_return_pct = ((current_value - initial_cash) / initial_cash) * 100
-        
-        # Recent trades (last 10)
-        recent_trades = transactions.tail(10).to_dict('records') if not transactions.empty else []
-        
-        html = f"""
+# HTML fragments formatted once per report and joined, instead of growing one string with +=
+REPORT_HTML_HEAD = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -82,24 +28,23 @@ class EmailReporter:
         <body>
             <div class="header">
                 <h1>🚀 Bitcoin Trading Weekly Report</h1>
-                <p>Week ending {datetime.now().strftime('%B %d, %Y')}</p>
+                <p>Week ending {week_ending}</p>
             </div>
             
             <div class="metric-card">
                 <h2>📈 Performance Summary</h2>
-                <p><strong>Portfolio Value:</strong> <span class="{'positive' if total_return_pct >= 0 else 'negative'}">${current_value:,.2f}</span></p>
-                <p><strong>Total Return:</strong> <span class="{'positive' if total_return_pct >= 0 else 'negative'}">{total_return_pct:+.2f}%</span></p>
+                <p><strong>Portfolio Value:</strong> <span class="{value_class}">${current_value:,.2f}</span></p>
+                <p><strong>Total Return:</strong> <span class="{value_class}">{total_return_pct:+.2f}%</span></p>
                 <p><strong>Weekly Trades:</strong> {weekly_trades}</p>
-                <p><strong>Total Trades:</strong> {performance.get('total_trades', 0)}</p>
-                <p><strong>Realized Profit:</strong> ${performance.get('realized_profit', 0):,.2f}</p>
+                <p><strong>Total Trades:</strong> {total_trades}</p>
+                <p><strong>Realized Profit:</strong> ${realized_profit:,.2f}</p>
             </div>
             
             <div class="metric-card">
                 <h2>🔔 Recent Trading Activity</h2>
         """
-        
-        if recent_trades:
-            html += """
+
+REPORT_TRADES_TABLE_HEAD = """
                 <table class="trade-table">
                     <tr>
                         <th>Action</th>
@@ -109,28 +54,27 @@ class EmailReporter:
                         <th>Reason</th>
                     </tr>
             """
-            for trade in recent_trades:
-                action_class = "buy" if trade.get('action') == 'BUY' else "sell"
-                html += f"""
+
+REPORT_TRADE_ROW = """
                     <tr>
-                        <td class="{action_class}">{trade.get('action', 'N/A')}</td>
-                        <td>${trade.get('amount', 0):,.2f}</td>
-                        <td>${trade.get('price', 0):,.2f}</td>
-                        <td>{trade.get('quantity', 0):.6f}</td>
-                        <td>{trade.get('reason', 'N/A')}</td>
+                        <td class="{action_class}">{action}</td>
+                        <td>${amount:,.2f}</td>
+                        <td>${price:,.2f}</td>
+                        <td>{quantity:.6f}</td>
+                        <td>{reason}</td>
                     </tr>
                 """
-            html += "</table>"
-        else:
-            html += "<p>No trades this week.</p>"
-        
-        html += """
+
+# Trade columns shown in the report, with the value used when a column is missing
+REPORT_TRADE_DEFAULTS = {'action': 'N/A', 'amount': 0, 'price': 0, 'quantity': 0, 'reason': 'N/A'}
+
+REPORT_HTML_FOOT = """
             </div>
             
             <div class="metric-card">
                 <h2>📊 System Status</h2>
                 <p><strong>Status:</strong> <span style="color: #28a745;">● ACTIVE</span></p>
-                <p><strong>Last Update:</strong> {}</p>
+                <p><strong>Last Update:</strong> {updated}</p>
                 <p><strong>Next Report:</strong> Next Monday 9:00 AM</p>
             </div>
             
@@ -140,9 +84,101 @@ class EmailReporter:
             </div>
         </body>
         </html>
-        """.format(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        """
+
+def _last_portfolio_value(portfolio_history: pd.DataFrame) -> float:
+    """Latest total_value in the portfolio history, 0 when it is empty"""
+    return float(portfolio_history['total_value'].to_numpy()[-1]) if len(portfolio_history) else 0.0
+
+class EmailReporter:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.smtp_server = "smtp.gmail.com"
+        self.smtp_port = 587
+        self.gmail_user = os.getenv('GMAIL_USER')
+        self.gmail_password = os.getenv('GMAIL_PASSWORD')
+        self.enabled = bool(self.gmail_user and self.gmail_password)
+        self._smtp = None
         
-        return html
+        if self.enabled:
+            self.logger.info("✅ Email reporting enabled")
+        else:
+            self.logger.warning("❌ Email reporting disabled - set GMAIL_USER and GMAIL_PASSWORD")
+    
+    def send_weekly_report(self, data_manager, trading_agent) -> bool:
+        """Send weekly performance report"""
+        if not self.enabled:
+            return False
+            
+        try:
+            # Get data for report
+            transactions = data_manager.load_transactions()
+            portfolio_history = data_manager.load_portfolio_history()
+            performance = trading_agent.get_performance_metrics()
+            
+            # Generate report content
+            subject = f"📊 Bitcoin Trading Weekly Report - {datetime.now().strftime('%Y-%m-%d')}"
+            html_content = self._generate_html_report(transactions, portfolio_history, performance)
+            
+            # Send email
+            success = self._send_email(subject, html_content)
+            
+            if success:
+                self.logger.info("✅ Weekly email report sent successfully")
+            else:
+                self.logger.error("❌ Failed to send weekly email report")
+                
+            return success
+            
+        except Exception as e:
+            self.logger.error(f"❌ Error sending weekly report: {e}")
+            return False
+    
+    def _generate_html_report(self, transactions: pd.DataFrame, portfolio_history: pd.DataFrame, performance: Dict) -> str:
+        """Generate HTML email content"""
+        
+        # Calculate weekly metrics
+        weekly_trades = len(transactions)
+        current_value = _last_portfolio_value(portfolio_history)
+        initial_cash = 100000  # Default
+        total_return_pct = ((current_value - initial_cash) / initial_cash) * 100
+        
+        # Recent trades (last 10) as plain tuples in REPORT_TRADE_DEFAULTS column order;
+        # columns the log doesn't have get their defaults
+        recent = transactions.tail(10)
+        missing = {col: default for col, default in REPORT_TRADE_DEFAULTS.items() if col not in recent.columns}
+        recent_trades = list(recent.assign(**missing)[list(REPORT_TRADE_DEFAULTS)].itertuples(index=False, name=None)) if len(recent) else []
+        
+        parts = [REPORT_HTML_HEAD.format(
+            week_ending=datetime.now().strftime('%B %d, %Y'),
+            value_class='positive' if total_return_pct >= 0 else 'negative',
+            current_value=current_value,
+            total_return_pct=total_return_pct,
+            weekly_trades=weekly_trades,
+            total_trades=performance.get('total_trades', 0),
+            realized_profit=performance.get('realized_profit', 0),
+        )]
+        
+        if recent_trades:
+            parts.append(REPORT_TRADES_TABLE_HEAD)
+            parts.extend(
+                REPORT_TRADE_ROW.format(
+                    action_class="buy" if action == 'BUY' else "sell",
+                    action=action,
+                    amount=amount,
+                    price=price,
+                    quantity=quantity,
+                    reason=reason,
+                )
+                for action, amount, price, quantity, reason in recent_trades
+            )
+            parts.append("</table>")
+        else:
+            parts.append("<p>No trades this week.</p>")
+        
+        parts.append(REPORT_HTML_FOOT.format(updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        
+        return ''.join(parts)
     
     def _send_email(self, subject: str, html_content: str) -> bool:
         """Send email via Gmail SMTP"""
@@ -156,18 +192,35 @@ class EmailReporter:
             # Attach HTML content
             msg.attach(MimeText(html_content, 'html'))
             
-            # Connect to Gmail SMTP server
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.gmail_user, self.gmail_password)
-            
-            # Send email
+            # Send email over the kept-alive connection, reconnecting once if Gmail dropped it
             text = msg.as_string()
-            server.sendmail(self.gmail_user, self.gmail_user, text)
-            server.quit()
+            try:
+                self._connect().sendmail(self.gmail_user, self.gmail_user, text)
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                self._connect().sendmail(self.gmail_user, self.gmail_user, text)
             
             return True
             
         except Exception as e:
             self.logger.error(f"❌ Email sending failed: {e}")
-            return False
\ No newline at end of file
+            self.close()
+            return False
+    
+    def _connect(self) -> smtplib.SMTP:
+        """Open the Gmail SMTP connection on first use and keep it for later reports"""
+        if self._smtp is None:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+            server.starttls()
+            server.login(self.gmail_user, self.gmail_password)
+            self._smtp = server
+        return self._smtp
+    
+    def close(self):
+        """Close the SMTP connection if one is open"""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
\ No newline at end of file
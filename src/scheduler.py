@@ -1,7 +1,7 @@
-import schedule
+import asyncio
 import time
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from threading import Thread
 import sys
 import os
@@ -20,6 +20,8 @@ class TradingScheduler:
         self.trading_agent = BitcoinTradingAgent(self.config)
         self.is_running = False
         self.scheduler_thread = None
+        self.loop = None
+        self.tasks = []
         
         self.logger.info("🕒 Trading scheduler initialized")
 
@@ -27,18 +29,6 @@ class TradingScheduler:
         """Start the 24/7 trading system"""
         self.is_running = True
         
-        # Schedule trading cycles (every 2 minutes for active trading)
-        schedule.every(2).minutes.do(self._run_trading_cycle)
-        
-        # Schedule weekly email report (Monday 9:00 AM)
-        schedule.every().monday.at("09:00").do(self._send_weekly_report)
-        
-        # Schedule daily status update (8:00 AM daily)
-        schedule.every().day.at("08:00").do(self._send_daily_status)
-        
-        # Schedule health check (every 6 hours)
-        schedule.every(6).hours.do(self._send_health_check)
-        
         # Send startup notification
         self.trading_agent.send_system_notification(
             "🚀 **24/7 TRADING SYSTEM STARTED**\n\n"
@@ -53,7 +43,8 @@ class TradingScheduler:
         
         self.logger.info("✅ 24/7 trading system started")
         
-        # Run scheduler in background thread
+        # Run the asyncio scheduler loop in a background thread
+        self.loop = asyncio.new_event_loop()
         self.scheduler_thread = Thread(target=self._run_scheduler, daemon=True)
         self.scheduler_thread.start()
         
@@ -62,19 +53,60 @@ class TradingScheduler:
     def stop_scheduler(self):
         """Stop the scheduler"""
         self.is_running = False
-        schedule.clear()
+        if self.loop is not None:
+            for task in self.tasks:
+                self.loop.call_soon_threadsafe(task.cancel)
         self.trading_agent.send_system_notification("🛑 Trading system stopped manually")
         self.logger.info("🛑 Scheduler stopped")
 
     def _run_scheduler(self):
         """Run the scheduler loop"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._schedule_jobs())
+        finally:
+            self.loop.close()
+
+    async def _schedule_jobs(self):
+        """Start one task per job; each sleeps until its own next run time"""
+        self.tasks = [
+            # Trading cycles (every 2 minutes for active trading)
+            asyncio.create_task(self._tick_every(120, self._run_trading_cycle)),
+            # Weekly email report (Monday 9:00 AM)
+            asyncio.create_task(self._tick_at(9, 0, self._send_weekly_report, weekday=0)),
+            # Daily status update (8:00 AM daily)
+            asyncio.create_task(self._tick_at(8, 0, self._send_daily_status)),
+            # Health check (every 6 hours)
+            asyncio.create_task(self._tick_every(6 * 3600, self._send_health_check)),
+        ]
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def _tick_every(self, delay, job):
+        """Run job every `delay` seconds in a worker thread"""
+        next_run = self.loop.time() + delay
+        while self.is_running:
+            await asyncio.sleep(max(next_run - self.loop.time(), 0))
+            next_run += delay
+            await self._run_job(job)
+
+    async def _tick_at(self, hour, minute, job, weekday=None):
+        """Run job at hour:minute local time, daily or on the given weekday"""
         while self.is_running:
-            try:
-                schedule.run_pending()
-                time.sleep(30)  # Check every 30 seconds
-            except Exception as e:
-                self.logger.error(f"❌ Scheduler error: {e}")
-                time.sleep(60)  # Wait longer if error occurs
+            now = datetime.now()
+            next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if weekday is not None:
+                next_run += timedelta(days=(weekday - now.weekday()) % 7)
+            if next_run <= now:
+                next_run += timedelta(days=7 if weekday is not None else 1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            await self._run_job(job)
+
+    async def _run_job(self, job):
+        """Run a blocking job off the event loop"""
+        try:
+            await asyncio.to_thread(job)
+        except Exception as e:
+            self.logger.error(f"❌ Scheduler error: {e}")
 
     def _run_trading_cycle(self):
         """Execute one trading cycle"""
@@ -1,8 +1,23 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import atexit
 import logging
 import os
+import queue
+import threading
+import weakref
 from typing import Dict, Optional
 
+# Notifiers with a running worker; one exit hook sends whatever they still have queued
+_OPEN_NOTIFIERS = weakref.WeakSet()
+
+def _close_open_notifiers():
+    for notifier in list(_OPEN_NOTIFIERS):
+        notifier.close()
+
+atexit.register(_close_open_notifiers)
+
 class TelegramNotifier:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -10,13 +25,26 @@ class TelegramNotifier:
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
         self.enabled = bool(self.bot_token and self.chat_id)
         
+        # Reuse one keep-alive TLS connection for all notifications
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=4, pool_maxsize=4,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        ))
+        
+        # Notifications are posted by a background worker so callers never wait on Telegram
+        self._queue = queue.Queue()
+        self._worker = None
+        
         if self.enabled:
             self.logger.info("✅ Telegram notifications enabled")
         else:
             self.logger.warning("❌ Telegram notifications disabled - set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID")
     
     def send_notification(self, message: str, trade_data: Optional[Dict] = None) -> bool:
-        """Send notification to Telegram"""
+        """Queue a notification for Telegram. Returns True once it is queued, not delivered:
+        the worker posts it later (failures are only logged), flush() waits for delivery and
+        anything still queued at interpreter exit is sent by an atexit hook"""
         if not self.enabled:
             return False
             
@@ -31,7 +59,32 @@ class TelegramNotifier:
                 'parse_mode': 'HTML'
             }
             
-            response = requests.post(url, json=payload, timeout=10)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._send_loop, name="telegram-notifier", daemon=True)
+                self._worker.start()
+                _OPEN_NOTIFIERS.add(self)
+            self._queue.put_nowait((url, payload))
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"❌ Failed to queue Telegram notification: {e}")
+            return False
+    
+    def _send_loop(self):
+        """Background worker: post queued notifications until the None sentinel arrives"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                self._post(*item)
+            finally:
+                self._queue.task_done()
+    
+    def _post(self, url: str, payload: Dict) -> bool:
+        """POST one notification over the shared session"""
+        try:
+            response = self.session.post(url, json=payload, timeout=10)
             response.raise_for_status()
             
             self.logger.info("📱 Telegram notification sent successfully")
@@ -41,6 +94,19 @@ class TelegramNotifier:
             self.logger.error(f"❌ Failed to send Telegram notification: {e}")
             return False
     
+    def flush(self):
+        """Block until every queued notification has been handled"""
+        if self._worker is not None:
+            self._queue.join()
+    
+    def close(self):
+        """Send the remaining notifications and stop the worker"""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+        _OPEN_NOTIFIERS.discard(self)
+    
     def _format_message(self, message: str, trade_data: Optional[Dict] = None) -> str:
         """Format message with HTML formatting"""
         if trade_data:
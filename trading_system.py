@@ -4,8 +4,14 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import orjson
+import atexit
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
-from binance.client import Client
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -14,13 +20,307 @@ import pytz
 # Load environment variables
 load_dotenv('config/secrets.env')
 
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+KLINES_LIMIT = 1000  # Max klines Binance returns per request
+
+# Longest indicator window (SMA_200): bars of history needed to recompute the latest values
+INDICATOR_LOOKBACK = 200
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Bars per closed-form block in ema(); decay**-EMA_BLOCK stays small enough to keep full precision
+EMA_BLOCK = 64
+
+# Gemma strategy outcomes as (action, percent, reason), indexed by gemma_signals codes
+GEMMA_SIGNALS = (
+    ("HOLD", 0, "High volatility - too risky"),
+    ("BUY", 15, "Bull market & RSI oversold"),
+    ("BUY", 10, "Bull market & momentum up"),
+    ("HOLD", 0, "Bull market but waiting"),
+    ("SELL", 15, "Bear market & RSI overbought"),
+    ("SELL", 10, "Bear market & momentum down"),
+    ("HOLD", 0, "Bear market but waiting"),
+    ("BUY", 5, "RSI very oversold"),
+    ("SELL", 5, "RSI very overbought"),
+    ("HOLD", 0, "Market neutral - no clear signal"),
+)
+GEMMA_NEUTRAL = 9
+GEMMA_INITIAL_BUY = ("BUY", 10, "Initial portfolio setup")
+
+# Gmail wrapper around every alert body (str.format_map fields: message, time)
+GMAIL_HTML_TEMPLATE = """
+            <html>
+                <head>
+                    <style>
+                        body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
+                        .container {{ background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
+                        .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; }}
+                        .trade-buy {{ background-color: #d4edda; border-left: 4px solid #28a745; padding: 15px; margin: 10px 0; border-radius: 5px; }}
+                        .trade-sell {{ background-color: #f8d7da; border-left: 4px solid #dc3545; padding: 15px; margin: 10px 0; border-radius: 5px; }}
+                        .metric {{ background: #f8f9fa; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #007bff; }}
+                        .footer {{ margin-top: 20px; padding: 15px; background: #e9ecef; border-radius: 5px; font-size: 12px; color: #6c757d; }}
+                    </style>
+                </head>
+                <body>
+                    <div class="container">
+                        <div class="header">
+                            <h1>🚀 Bitcoin Trading System</h1>
+                            <p>Automated Trading Report</p>
+                        </div>
+                        {message}
+                        <div class="footer">
+                            <p>This is an automated message from your Bitcoin Trading System.</p>
+                            <p>Time: {time}</p>
+                        </div>
+                    </div>
+                </body>
+            </html>
+            """
+
+# Daily Telegram report; the labels are picked in send_comprehensive_telegram_report
+TELEGRAM_REPORT_TEMPLATE = """
+📊 **DAILY TRADING REPORT**
+━━━━━━━━━━━━━━━━━━━━
+
+💰 **PORTFOLIO OVERVIEW**
+• Total Value: ${current_value:,.2f}
+• Return: <b>{total_return:+.2f}%</b>
+• BTC Price: ${price:,.2f}
+
+📈 **TRADING ACTIVITY**  
+• Total Trades: {total_trades}
+• Buy Trades: {buy_trades}
+• Sell Trades: {sell_trades}
+• Total Volume: ${total_volume:,.0f}
+
+🎯 **MARKET CONDITIONS**
+• RSI: {rsi:.1f} ({rsi_label})
+• MACD: {macd:.4f} ({macd_label})
+• ATR: ${atr:,.0f}
+• Trend: {trend}
+
+🤖 **STRATEGY OUTLOOK**
+• Action: <b>{action}</b>
+• Allocation: {percent}%
+• Reason: {reason}
+
+🕒 Report Time: {time}
+━━━━━━━━━━━━━━━━━━━━
+💡 <i>Bitcoin Trading System - Automated 24/7</i>
+            """
+
+# One of today's trades in the daily Gmail report
+DAILY_TRADE_ROW = """
+                    <div class="trade">
+                        {emoji} <strong>{action}</strong> - ${amount:,.2f} 
+                        at ${price:,.2f}<br>
+                        <em>Reason: {reason}</em>
+                    </div>
+                    """
+
+# Indicator columns behind the self.indicators keys, in the same order as their fallbacks
+# Stored in the indicator cache's Parquet metadata; bump it whenever an indicator's definition
+# changes so caches written under the old one are recomputed instead of extended
+INDICATOR_SCHEMA_VERSION = b'2'  # 2: RSI_14 with Wilder smoothing
+INDICATOR_COLUMNS = ['SMA_20', 'SMA_50', 'SMA_200', 'EMA_12', 'EMA_26', 'MACD', 'MACD_Signal', 'RSI_14', 'ATR_14']
+
+# Trade history: an append-only directory of Parquet parts (one per flush), plus the
+# legacy CSV kept up to date for older readers
+TRADES_DATASET_PATH = 'data/real_trading_history'
+TRADES_CSV_PATH = 'data/real_trading_history.csv'
+TRADE_HISTORY_SCHEMA = pa.schema([
+    ('timestamp', pa.string()),
+    ('action', pa.string()),
+    ('price', pa.float64()),
+    ('amount', pa.float64()),
+    ('quantity', pa.float64()),
+    ('reason', pa.string()),
+    ('portfolio_value', pa.float64()),
+    ('cash_balance', pa.float64()),
+    ('btc_balance', pa.float64()),
+    ('data_source', pa.string())
+])
+
+# Systems not closed yet; one exit hook writes out and closes whatever they still hold
+_OPEN_SYSTEMS = set()
+
+def _close_open_systems():
+    for system in list(_OPEN_SYSTEMS):
+        system.close()
+
+atexit.register(_close_open_systems)
+
+# Parts a history dataset may collect before they are merged back into one
+MAX_DATASET_PARTS = 32
+
+# Portfolio snapshots: the same append-only layout (buffered and written by flush_history);
+# only the dataset is written now
+PORTFOLIO_DATASET_PATH = 'data/portfolio_history'
+PORTFOLIO_CSV_PATH = 'data/portfolio_history.csv'
+PORTFOLIO_HISTORY_SCHEMA = pa.schema([
+    ('timestamp', pa.string()),
+    ('cash', pa.float64()),
+    ('btc', pa.float64()),
+    ('total_value', pa.float64()),
+    ('btc_price', pa.float64())
+])
+
+def rolling_mean(values, window):
+    """Trailing mean over a NaN-free float array (cumsum difference), NaN until the window fills.
+    A 2-D array is bars x symbols and is averaged down each column"""
+    out = np.full(np.shape(values), np.nan)
+    if len(values) >= window:
+        csum = np.cumsum(values, axis=0)
+        out[window - 1:] = csum[window - 1:]
+        out[window:] -= csum[:-window]
+        out[window - 1:] /= window
+    return out
+
+def ema(values, span):
+    """Same result as ewm(span=span, adjust=False).mean() on a NaN-free float array.
+    Inside each EMA_BLOCK-bar block the recurrence is a cumsum of rescaled inputs, so only
+    the carry from one block to the next is a Python loop. A 2-D array (bars x symbols) is
+    smoothed down each column"""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    alpha = 2.0 / (span + 1)
+    decay = 1.0 - alpha
+    if n == 0:
+        return np.empty(values.shape)
+    if decay == 0:  # span 1: no smoothing (and decay ** -k below would overflow)
+        return values.copy()
+    
+    cols = values.shape[1:]
+    k = np.arange(EMA_BLOCK).reshape((-1,) + (1,) * len(cols))
+    blocks = np.concatenate((values, np.zeros((-n % EMA_BLOCK,) + cols))).reshape((-1, EMA_BLOCK) + cols)
+    local = alpha * np.cumsum(blocks * decay ** -k, axis=1) * decay ** k  # each block started from 0
+    carry_weight = decay ** (k + 1)
+    
+    out = np.empty_like(local)
+    carry = values[0]
+    for b in range(len(blocks)):
+        out[b] = local[b] + carry_weight * carry
+        carry = out[b, -1]
+    return out.reshape((-1,) + cols)[:n]
+
+def wilder_mean(values, n):
+    """Wilder's smoothed average: the plain mean of the first n values, then avg += (x - avg) / n
+    (an EMA with alpha 1/n, i.e. span 2n - 1); NaN until n values are in"""
+    out = np.full(np.shape(values), np.nan)
+    if len(values) >= n:
+        out[n - 1:] = ema(np.concatenate((values[:n].mean(axis=0, keepdims=True), values[n:])), 2 * n - 1)
+    return out
+
+def compute_indicators(close, high, low):
+    """INDICATOR_COLUMNS -> array for float64 close/high/low arrays: 1-D for one symbol,
+    or 2-D bars x symbols to compute every symbol in the same passes"""
+    columns = {}
+    
+    # SMA
+    columns['SMA_20'] = rolling_mean(close, 20)
+    columns['SMA_50'] = rolling_mean(close, 50)
+    columns['SMA_200'] = rolling_mean(close, 200)
+    
+    # EMA
+    ema12 = ema(close, 12)
+    ema26 = ema(close, 26)
+    columns['EMA_12'] = ema12
+    columns['EMA_26'] = ema26
+    
+    # MACD
+    macd = ema12 - ema26
+    columns['MACD'] = macd
+    columns['MACD_Signal'] = ema(macd, 9)
+    
+    # RSI with Wilder's smoothing of the gains and losses (100 when there are no losses)
+    delta = np.diff(close, axis=0)
+    avg_gain = wilder_mean(np.maximum(delta, 0.0), 14)
+    avg_loss = wilder_mean(np.maximum(-delta, 0.0), 14)
+    rsi = np.full(np.shape(close), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi[1:] = np.where(avg_loss > 0, 100 - (100 / (1 + avg_gain / avg_loss)), 100.0)
+    rsi[1:][np.isnan(avg_gain)] = np.nan
+    columns['RSI_14'] = rsi
+    
+    # ATR (fmax skips the missing previous close on the first bar)
+    prev_close = np.concatenate((np.full((1,) + np.shape(close)[1:], np.nan), close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    columns['ATR_14'] = rolling_mean(true_range, 14)
+    return columns
+
+def klines_to_frame(klines):
+    """OHLCV frame indexed by candle open time from [open_time, open, high, low, close, volume] rows.
+    An object array keeps the parsed values as they are (no fixed-width string copy of every
+    cell), and the prices go into the frame as a single float64 block"""
+    arr = np.asarray(klines, dtype=object).reshape(-1, 6)
+    ohlcv = arr[:, 1:].astype(np.float64)
+    timestamps = pd.to_datetime(arr[:, 0].astype(np.int64), unit='ms')
+    return pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS, index=pd.DatetimeIndex(timestamps, name='timestamp'))
+
+def index_trades_by_time(trades_df):
+    """Trades indexed by their parsed timestamp (ISO strings as written by save_trade_to_history)"""
+    if 'timestamp' not in trades_df.columns:
+        return trades_df
+    trades_df = trades_df.assign(timestamp=pd.to_datetime(trades_df['timestamp'], format='ISO8601', cache=True))
+    return trades_df.set_index('timestamp')
+
+def _finish_compaction(path):
+    """Complete a compaction that was interrupted: a _compacted.ready file holds every row of
+    the parts it replaces, so those parts are dropped and it becomes the only part. A bare
+    _compacted.tmp may be half written and is discarded (its parts were never touched)"""
+    ready = os.path.join(path, '_compacted.ready')
+    if os.path.exists(ready):
+        for name in os.listdir(path):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                os.remove(os.path.join(path, name))
+        os.replace(ready, os.path.join(path, f"part-{time.time_ns()}.parquet"))
+    staged = os.path.join(path, '_compacted.tmp')
+    if os.path.exists(staged):
+        os.remove(staged)
+
+def append_dataset_part(path, rows, schema, legacy_csv=None):
+    """Write rows as one new Parquet part under path (a legacy CSV history becomes the first part)"""
+    if legacy_csv and not os.path.isdir(path) and os.path.exists(legacy_csv):
+        legacy = pa.Table.from_pandas(pd.read_csv(legacy_csv), schema=schema, preserve_index=False)
+        os.makedirs(path, exist_ok=True)
+        pq.write_table(legacy, os.path.join(path, 'part-0.parquet'), compression='snappy')
+    
+    os.makedirs(path, exist_ok=True)
+    _finish_compaction(path)
+    table = pa.Table.from_pylist(rows, schema=schema)
+    pq.write_table(table, os.path.join(path, f"part-{time.time_ns()}.parquet"), compression='snappy')
+
+def compact_dataset(path):
+    """Merge the parts under path into one once there are more than MAX_DATASET_PARTS
+    (staged under names dataset scans ignore, so readers never see rows twice, and finished
+    by the next append if a crash cuts it short)"""
+    _finish_compaction(path)
+    parts = [name for name in os.listdir(path) if name.startswith('part-') and name.endswith('.parquet')]
+    if len(parts) > MAX_DATASET_PARTS:
+        staged = os.path.join(path, '_compacted.tmp')
+        pq.write_table(ds.dataset(path, format='parquet').to_table(), staged, compression='snappy')
+        # Fully written: from here on the merged file wins over the parts, even after a crash
+        os.replace(staged, os.path.join(path, '_compacted.ready'))
+        _finish_compaction(path)
+
+def last_portfolio_value(default=100000):
+    """Latest saved total_value, or default when there is none. Only the total_value column
+    of the portfolio history is read (the legacy CSV if it has not been migrated yet)"""
+    if os.path.isdir(PORTFOLIO_DATASET_PATH):
+        values = ds.dataset(PORTFOLIO_DATASET_PATH, format='parquet').to_table(columns=['total_value']).column(0)
+    elif os.path.exists(PORTFOLIO_CSV_PATH):
+        values = pd.read_csv(PORTFOLIO_CSV_PATH, usecols=['total_value'])['total_value'].to_numpy()
+    else:
+        return default
+    return float(values[len(values) - 1]) if len(values) else default
+
 class RealTradingSystem:
     def __init__(self):
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
         
-        # Initialize Binance Client (public API - no keys needed)
-        self.client = Client()
+        # Keep-alive HTTP session for Binance's public REST API (no keys needed)
+        self._http = requests.Session()
+        self._http.headers.update({'Accept-Encoding': 'gzip'})
         
         # Trading parameters
         self.portfolio = {
@@ -39,63 +339,66 @@ class RealTradingSystem:
         self.previous_price = 0
         self.indicators = {}
         
-        # Gmail configuration
+        # Gmail configuration (the SMTP login is reused across emails until close)
         self.gmail_user = os.getenv('GMAIL_USER')
         self.gmail_password = os.getenv('GMAIL_PASSWORD')
+        self._smtp = None
+        
+        # Background threads for alerts and reports that nothing else in the run waits on
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
         
         # Riyadh timezone
         self.riyadh_tz = pytz.timezone('Asia/Riyadh')
         
+        # Hourly candles with indicators from the last run, extended incrementally
+        self.indicator_cache_path = 'data/indicators.parquet'
+        
+        # Trades and portfolio snapshots recorded this run, written out once by flush_history at the end of the run
+        # (the exit hook only catches what a crashed or interrupted run left behind)
+        self._trade_buffer = []
+        self._portfolio_buffer = []
+        
+        # Saved trade history as last read, and the file signature it was read at
+        self._trades_cache = None
+        self._trades_sig = None
+        
+        # Last strategy decision and the state it was made for
+        self._gemma_cache_key = None
+        self._gemma_cache = None
+        
         # Ensure data directory exists
         os.makedirs('data', exist_ok=True)
+        
+        _OPEN_SYSTEMS.add(self)
+    
+    def close(self):
+        """Write out buffered history, log out of Gmail and stop the I/O threads"""
+        _OPEN_SYSTEMS.discard(self)
+        self.flush_history()
+        self.close_smtp()
+        self._io_pool.shutdown()
+        self._http.close()
     
-    def get_binance_data(self, symbol="BTCUSDT", interval="1h", days=60):
-        """Fetch cryptocurrency data from Binance API"""
-        print(f"🔄 Fetching {symbol} {interval} data for {days} days from Binance...")
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def get_binance_data(self, symbol="BTCUSDT", interval="1h", days=60, start=None):
+        """Fetch cryptocurrency data from Binance API (from start up to now, if a start candle time is given)"""
+        if start is not None:
+            print(f"🔄 Fetching {symbol} {interval} data since {start} from Binance...")
+        else:
+            print(f"🔄 Fetching {symbol} {interval} data for {days} days from Binance...")
         
         try:
-            # Calculate start date
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-            
             # Fetch klines (candlestick data)
-            klines = self.client.get_historical_klines(
-                symbol=symbol,
-                interval=interval,
-                start_str=start_date.strftime("%d %b, %Y"),
-                end_str=end_date.strftime("%d %b, %Y")
-            )
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'Open Time', 'Open', 'High', 'Low', 'Close', 'Volume',
-                'Close Time', 'Quote Asset Volume', 'Number of Trades',
-                'Taker Buy Base Asset Volume', 'Taker Buy Quote Asset Volume', 'Ignore'
-            ])
-            
-            # Convert data types
-            numeric_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-            
-            for col in numeric_columns:
-                df[col] = pd.to_numeric(df[col])
-            
-            # Convert timestamp to datetime
-            df['Open Time'] = pd.to_datetime(df['Open Time'], unit='ms')
-            df['Close Time'] = pd.to_datetime(df['Close Time'], unit='ms')
-            
-            # Rename columns to match standard format
-            df = df.rename(columns={
-                'Open Time': 'timestamp',
-                'Open': 'open',
-                'High': 'high', 
-                'Low': 'low',
-                'Close': 'close',
-                'Volume': 'volume'
-            })
-            
-            # Select and reorder columns
-            df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-            df.set_index('timestamp', inplace=True)
+            if start is not None:
+                start_ms = int(start.value // 1_000_000)
+            else:
+                start_ms = int((time.time() - days * 86400) * 1000)
+            df = klines_to_frame(self._fetch_klines(symbol, interval, start_ms))
             
             # Set current and previous prices
             if len(df) >= 2:
@@ -114,8 +417,38 @@ class RealTradingSystem:
             print(f"❌ Error fetching Binance data: {e}")
             return None
 
+    def get_symbols_data(self, symbols, interval="1h", days=30):
+        """Fetch several symbols concurrently: dict of symbol -> OHLCV frame, or None on error.
+        Unlike get_binance_data this leaves current_price alone"""
+        print(f"🔄 Fetching {', '.join(symbols)} {interval} data for {days} days from Binance...")
+        start_ms = int((time.time() - days * 86400) * 1000)
+        try:
+            klines = list(self._io_pool.map(lambda symbol: self._fetch_klines(symbol, interval, start_ms), symbols))
+        except Exception as e:
+            print(f"❌ Error fetching Binance data: {e}")
+            return None
+        return {symbol: klines_to_frame(rows) for symbol, rows in zip(symbols, klines)}
+
+    def _fetch_klines(self, symbol, interval, start_ms):
+        """[open_time, open, high, low, close, volume] rows from start_ms up to now,
+        one klines request per KLINES_LIMIT candles"""
+        rows = []
+        while True:
+            response = self._http.get(KLINES_URL, params={
+                'symbol': symbol,
+                'interval': interval,
+                'startTime': start_ms,
+                'limit': KLINES_LIMIT
+            }, timeout=10)
+            response.raise_for_status()
+            page = orjson.loads(response.content)
+            rows.extend(kline[:6] for kline in page)
+            if len(page) < KLINES_LIMIT:
+                return rows
+            start_ms = page[-1][0] + 1
+
     def save_portfolio_state(self):
-        """Save current portfolio state for dashboard"""
+        """Record current portfolio state for dashboard (written out by flush_history)"""
         try:
             portfolio_data = {
                 'timestamp': datetime.now().isoformat(),
@@ -125,29 +458,36 @@ class RealTradingSystem:
                 'btc_price': self.current_price
             }
             
-            file_path = 'data/portfolio_history.csv'
-            df = pd.DataFrame([portfolio_data])
-            
-            if os.path.exists(file_path):
-                df.to_csv(file_path, mode='a', header=False, index=False)
-            else:
-                df.to_csv(file_path, index=False)
-                
+            self._portfolio_buffer.append(portfolio_data)
             print(f"✅ Portfolio state saved: ${self.portfolio['total_value']:,.0f}")
             
         except Exception as e:
             print(f"❌ Error saving portfolio: {e}")
 
     def get_market_data_for_dashboard(self):
-        """Get BTC data for dashboard"""
+        """Get BTC data for dashboard (only candles newer than the indicator cache are fetched)"""
         try:
-            btc_data = self.get_binance_data(symbol="BTCUSDT", interval="1h", days=30)
-            
-            if btc_data is None or btc_data.empty:
-                raise Exception("No data received from Binance")
+            btc_data = None
+            cached = self.load_indicator_cache()
+            if cached is not None:
+                # The last cached candle is fetched again because it may still have been open
+                new_data = self.get_binance_data(symbol="BTCUSDT", interval="1h", start=cached.index[-1])
+                if new_data is not None and not new_data.empty:
+                    btc_data = self.extend_indicators(cached, new_data)
+            
+            if btc_data is None:
+                btc_data = self.get_binance_data(symbol="BTCUSDT", interval="1h", days=30)
+                
+                if btc_data is None or btc_data.empty:
+                    raise Exception("No data received from Binance")
+                
+                # Calculate technical indicators
+                self.calculate_technical_indicators(btc_data)
             
-            # Calculate technical indicators
-            self.calculate_technical_indicators(btc_data)
+            try:
+                self.save_indicator_cache(btc_data)
+            except Exception as e:
+                print(f"⚠️ Could not update indicator cache: {e}")
             
             # Save market data for dashboard
             market_data_path = 'data/btc_market_data.csv'
@@ -160,50 +500,71 @@ class RealTradingSystem:
             print(f"❌ Error fetching market data: {e}")
             return False
 
+    def save_indicator_cache(self, data):
+        """Write candles and indicators to the cache, tagged with INDICATOR_SCHEMA_VERSION"""
+        table = pa.Table.from_pandas(data)
+        metadata = {**(table.schema.metadata or {}), b'indicator_schema': INDICATOR_SCHEMA_VERSION}
+        pq.write_table(table.replace_schema_metadata(metadata), self.indicator_cache_path, compression='snappy')
+
+    def load_indicator_cache(self):
+        """Cached candles and indicators, or None when missing, unreadable, written under another
+        INDICATOR_SCHEMA_VERSION or older than 30 days"""
+        if not os.path.exists(self.indicator_cache_path):
+            return None
+        try:
+            table = pq.read_table(self.indicator_cache_path)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable indicator cache: {e}")
+            return None
+        if (table.schema.metadata or {}).get(b'indicator_schema') != INDICATOR_SCHEMA_VERSION:
+            print("⚠️ Ignoring indicator cache from an older indicator definition")
+            return None
+        cached = table.to_pandas()
+        
+        # Candle times are UTC
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        if cached.empty or cached.index[-1] < now - timedelta(days=30):
+            return None
+        return cached
+
+    def extend_indicators(self, cached, new_data):
+        """Append new candles to the cached frame, recomputing indicators only for the new rows
+        (each from the INDICATOR_LOOKBACK candles before it). SMA and ATR match a full recompute;
+        the EMAs and Wilder-smoothed RSI restart at the lookback, so they drift by a few 1e-6"""
+        merged = pd.concat([cached[OHLCV_COLUMNS], new_data[OHLCV_COLUMNS]])
+        merged = merged[~merged.index.duplicated(keep='last')]
+        merged = merged[merged.index > merged.index[-1] - timedelta(days=30)]
+        
+        n_new = int((merged.index >= new_data.index[0]).sum())
+        self.current_price = merged['close'].iloc[-1]
+        self.previous_price = merged['close'].iloc[-2] if len(merged) >= 2 else self.current_price
+        
+        tail = merged.iloc[-(n_new + INDICATOR_LOOKBACK):].copy()
+        self.calculate_technical_indicators(tail)
+        
+        head = cached.loc[merged.index[:len(merged) - n_new]]
+        return pd.concat([head, tail.iloc[-n_new:]])
+
     def calculate_technical_indicators(self, data):
         """Calculate all technical indicators from Binance data"""
         try:
-            # SMA
-            data['SMA_20'] = data['close'].rolling(window=20).mean()
-            data['SMA_50'] = data['close'].rolling(window=50).mean()
-            data['SMA_200'] = data['close'].rolling(window=200).mean()
-            
-            # EMA
-            data['EMA_12'] = data['close'].ewm(span=12, adjust=False).mean()
-            data['EMA_26'] = data['close'].ewm(span=26, adjust=False).mean()
-            
-            # MACD
-            data['MACD'] = data['EMA_12'] - data['EMA_26']
-            data['MACD_Signal'] = data['MACD'].ewm(span=9, adjust=False).mean()
-            
-            # RSI
-            delta = data['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            data['RSI_14'] = 100 - (100 / (1 + rs))
-            
-            # ATR
-            high_low = data['high'] - data['low']
-            high_close = np.abs(data['high'] - data['close'].shift())
-            low_close = np.abs(data['low'] - data['close'].shift())
-            ranges = pd.concat([high_low, high_close, low_close], axis=1)
-            true_range = np.max(ranges, axis=1)
-            data['ATR_14'] = true_range.rolling(window=14).mean()
-            
-            # Get latest values
+            # Indicators are computed on the raw float64 arrays and assigned once each
+            columns = compute_indicators(data['close'].to_numpy(dtype=np.float64),
+                                         data['high'].to_numpy(dtype=np.float64),
+                                         data['low'].to_numpy(dtype=np.float64))
+            for name, values in columns.items():
+                data[name] = values
+            
+            # Get latest values: one row slice, NaNs replaced by the fallbacks (v != v only for NaN)
             if not data.empty:
-                self.indicators = {
-                    'sma20': data['SMA_20'].iloc[-1] if not pd.isna(data['SMA_20'].iloc[-1]) else self.current_price,
-                    'sma50': data['SMA_50'].iloc[-1] if not pd.isna(data['SMA_50'].iloc[-1]) else self.current_price,
-                    'sma200': data['SMA_200'].iloc[-1] if not pd.isna(data['SMA_200'].iloc[-1]) else self.current_price,
-                    'ema12': data['EMA_12'].iloc[-1] if not pd.isna(data['EMA_12'].iloc[-1]) else self.current_price,
-                    'ema26': data['EMA_26'].iloc[-1] if not pd.isna(data['EMA_26'].iloc[-1]) else self.current_price,
-                    'macd': data['MACD'].iloc[-1] if not pd.isna(data['MACD'].iloc[-1]) else 0,
-                    'macd_signal': data['MACD_Signal'].iloc[-1] if not pd.isna(data['MACD_Signal'].iloc[-1]) else 0,
-                    'rsi': data['RSI_14'].iloc[-1] if not pd.isna(data['RSI_14'].iloc[-1]) else 50,
-                    'atr': data['ATR_14'].iloc[-1] if not pd.isna(data['ATR_14'].iloc[-1]) else 1000
+                price = self.current_price
+                fallbacks = {
+                    'sma20': price, 'sma50': price, 'sma200': price, 'ema12': price, 'ema26': price,
+                    'macd': 0, 'macd_signal': 0, 'rsi': 50, 'atr': 1000
                 }
+                last = data.iloc[-1:][INDICATOR_COLUMNS].to_numpy()[0]
+                self.indicators = {key: (fallbacks[key] if value != value else value)
+                                   for key, value in zip(fallbacks, last)}
             
             print(f"📊 Indicators - RSI: {self.indicators['rsi']:.1f}, ATR: ${self.indicators['atr']:,.0f}")
             
@@ -215,6 +576,27 @@ class RealTradingSystem:
                 'rsi': 50, 'atr': 1000
             }
 
+    def calculate_technical_indicators_batch(self, frames):
+        """Indicators for several symbols at once: dict of symbol -> OHLCV frame in, the same
+        frames cut to their common candle times and with indicator columns out. Each indicator
+        is one pass over a bars x symbols array (self.indicators is not touched)"""
+        symbols = list(frames)
+        index = frames[symbols[0]].index
+        for symbol in symbols[1:]:
+            index = index.intersection(frames[symbol].index)
+        
+        def stack(column):
+            return np.column_stack([frames[symbol].loc[index, column].to_numpy(dtype=np.float64) for symbol in symbols])
+        
+        columns = compute_indicators(stack('close'), stack('high'), stack('low'))
+        return {
+            symbol: pd.concat([
+                frames[symbol].loc[index, OHLCV_COLUMNS],
+                pd.DataFrame({name: values[:, i] for name, values in columns.items()}, index=index)
+            ], axis=1)
+            for i, symbol in enumerate(symbols)
+        }
+
     def send_telegram_alert(self, message):
         """Send formatted message to Telegram"""
         if not self.bot_token or not self.chat_id:
@@ -252,62 +634,65 @@ class RealTradingSystem:
             msg['Subject'] = subject
             
             # HTML content
-            html_content = f"""
-            <html>
-                <head>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-                        .container {{ background: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                        .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; }}
-                        .trade-buy {{ background-color: #d4edda; border-left: 4px solid #28a745; padding: 15px; margin: 10px 0; border-radius: 5px; }}
-                        .trade-sell {{ background-color: #f8d7da; border-left: 4px solid #dc3545; padding: 15px; margin: 10px 0; border-radius: 5px; }}
-                        .metric {{ background: #f8f9fa; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #007bff; }}
-                        .footer {{ margin-top: 20px; padding: 15px; background: #e9ecef; border-radius: 5px; font-size: 12px; color: #6c757d; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="header">
-                            <h1>🚀 Bitcoin Trading System</h1>
-                            <p>Automated Trading Report</p>
-                        </div>
-                        {message}
-                        <div class="footer">
-                            <p>This is an automated message from your Bitcoin Trading System.</p>
-                            <p>Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                        </div>
-                    </div>
-                </body>
-            </html>
-            """
+            html_content = GMAIL_HTML_TEMPLATE.format_map({
+                'message': message,
+                'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            })
             
             msg.attach(MIMEText(html_content, 'html'))
             
-            # Send email
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(gmail_user, gmail_password)
+            # Send email over the kept-alive SMTP connection
             text = msg.as_string()
-            server.sendmail(gmail_user, gmail_user, text)
-            server.quit()
+            try:
+                self._get_smtp(gmail_user, gmail_password).sendmail(gmail_user, gmail_user, text)
+            except smtplib.SMTPServerDisconnected:
+                # Dropped between the probe and the send; log in again once
+                self._smtp = None
+                self._get_smtp(gmail_user, gmail_password).sendmail(gmail_user, gmail_user, text)
             
             print(f"✅ Gmail alert sent: {subject}")
             return True
             
         except Exception as e:
             print(f"❌ Gmail error: {str(e)}")
+            self.close_smtp()
             return False
 
+    def _get_smtp(self, gmail_user, gmail_password):
+        """The open Gmail SMTP connection if it still answers NOOP, else a freshly logged-in one"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self.close_smtp()
+        
+        server = smtplib.SMTP('smtp.gmail.com', 587, timeout=30)
+        server.starttls()
+        server.login(gmail_user, gmail_password)
+        self._smtp = server
+        return server
+
+    def close_smtp(self):
+        """Log out of Gmail SMTP if a connection is open"""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
     def send_comprehensive_telegram_report(self):
         """Send complete daily report via Telegram"""
         try:
             # Load trading data
             try:
-                trades_df = pd.read_csv("data/real_trading_history.csv")
-                portfolio_df = pd.read_csv("data/portfolio_history.csv")
+                trades_df = self.load_trades()
+                current_value = self.latest_portfolio_value()
             except:
                 trades_df = pd.DataFrame()
-                portfolio_df = pd.DataFrame()
+                current_value = 100000
             
             # Calculate metrics
             total_trades = len(trades_df)
@@ -315,43 +700,33 @@ class RealTradingSystem:
             sell_trades = len(trades_df[trades_df['action'] == 'SELL']) if not trades_df.empty else 0
             total_volume = trades_df['amount'].sum() if not trades_df.empty else 0
             
-            current_value = portfolio_df['total_value'].iloc[-1] if not portfolio_df.empty else 100000
             total_return = ((current_value - 100000) / 100000) * 100
             
             # Get strategy decision
             strategy = self.execute_gemma_strategy()
             
             # Create comprehensive message
-            message = f"""
-📊 **DAILY TRADING REPORT**
-━━━━━━━━━━━━━━━━━━━━
-
-💰 **PORTFOLIO OVERVIEW**
-• Total Value: ${current_value:,.2f}
-• Return: <b>{total_return:+.2f}%</b>
-• BTC Price: ${self.current_price:,.2f}
-
-📈 **TRADING ACTIVITY**  
-• Total Trades: {total_trades}
-• Buy Trades: {buy_trades}
-• Sell Trades: {sell_trades}
-• Total Volume: ${total_volume:,.0f}
-
-🎯 **MARKET CONDITIONS**
-• RSI: {self.indicators.get('rsi', 0):.1f} ({'🔴 Overbought' if self.indicators.get('rsi', 0) > 70 else '🟢 Oversold' if self.indicators.get('rsi', 0) < 30 else '⚪ Neutral'})
-• MACD: {self.indicators.get('macd', 0):.4f} ({'🟢 Bullish' if self.indicators.get('macd', 0) > 0 else '🔴 Bearish'})
-• ATR: ${self.indicators.get('atr', 0):,.0f}
-• Trend: {'🟢 BULLISH' if self.indicators.get('sma50', 0) > self.indicators.get('sma200', 0) else '🔴 BEARISH'}
-
-🤖 **STRATEGY OUTLOOK**
-• Action: <b>{strategy['action']}</b>
-• Allocation: {strategy['percent']}%
-• Reason: {strategy['reason']}
-
-🕒 Report Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-━━━━━━━━━━━━━━━━━━━━
-💡 <i>Bitcoin Trading System - Automated 24/7</i>
-            """
+            rsi = self.indicators.get('rsi', 0)
+            macd = self.indicators.get('macd', 0)
+            message = TELEGRAM_REPORT_TEMPLATE.format_map({
+                'current_value': current_value,
+                'total_return': total_return,
+                'price': self.current_price,
+                'total_trades': total_trades,
+                'buy_trades': buy_trades,
+                'sell_trades': sell_trades,
+                'total_volume': total_volume,
+                'rsi': rsi,
+                'rsi_label': '🔴 Overbought' if rsi > 70 else '🟢 Oversold' if rsi < 30 else '⚪ Neutral',
+                'macd': macd,
+                'macd_label': '🟢 Bullish' if macd > 0 else '🔴 Bearish',
+                'atr': self.indicators.get('atr', 0),
+                'trend': '🟢 BULLISH' if self.indicators.get('sma50', 0) > self.indicators.get('sma200', 0) else '🔴 BEARISH',
+                'action': strategy['action'],
+                'percent': strategy['percent'],
+                'reason': strategy['reason'],
+                'time': datetime.now().strftime('%Y-%m-%d %H:%M')
+            })
             
             success = self.send_telegram_alert(message)
             if success:
@@ -371,12 +746,12 @@ class RealTradingSystem:
             
             # Load trading data
             try:
-                trades_df = pd.read_csv("data/real_trading_history.csv")
-                portfolio_df = pd.read_csv("data/portfolio_history.csv")
+                trades_df = self.load_trades()
+                current_value = self.latest_portfolio_value()
             except FileNotFoundError:
                 print("❌ No trading data found")
                 trades_df = pd.DataFrame()
-                portfolio_df = pd.DataFrame()
+                current_value = 100000
             
             # Calculate daily metrics
             total_trades = len(trades_df)
@@ -384,17 +759,16 @@ class RealTradingSystem:
             sell_trades = len(trades_df[trades_df['action'] == 'SELL']) if not trades_df.empty else 0
             total_volume = trades_df['amount'].sum() if not trades_df.empty else 0
             
-            if not portfolio_df.empty:
-                current_value = portfolio_df['total_value'].iloc[-1]
-                initial_value = 100000
-                total_return = ((current_value - initial_value) / initial_value) * 100
-            else:
-                current_value = 100000
-                total_return = 0
+            initial_value = 100000
+            total_return = ((current_value - initial_value) / initial_value) * 100
             
-            # Get today's trades
-            today = datetime.now().date()
-            today_trades = trades_df[pd.to_datetime(trades_df['timestamp']).dt.date == today] if not trades_df.empty else pd.DataFrame()
+            # Get today's trades (the history is in time order, so this is a binary search)
+            today = pd.Timestamp(datetime.now().date())
+            if not trades_df.empty:
+                start, end = trades_df.index.searchsorted([today, today + timedelta(days=1)])
+                today_trades = trades_df.iloc[start:end]
+            else:
+                today_trades = pd.DataFrame()
             
             # Create email content
             subject = f"📊 Daily Trading Report - {riyadh_time.strftime('%Y-%m-%d')}"
@@ -433,15 +807,18 @@ class RealTradingSystem:
             # Add today's trades if any
             if len(today_trades) > 0:
                 message += "<h4>🔄 Today's Trades</h4>"
-                for _, trade in today_trades.iterrows():
-                    emoji = "🟢" if trade['action'] == 'BUY' else "🔴"
-                    message += f"""
-                    <div class="trade">
-                        {emoji} <strong>{trade['action']}</strong> - ${trade['amount']:,.2f} 
-                        at ${trade['price']:,.2f}<br>
-                        <em>Reason: {trade['reason']}</em>
-                    </div>
-                    """
+                # One pass over the column arrays rather than a Series per row
+                emojis = np.where(today_trades['action'].to_numpy() == 'BUY', "🟢", "🔴")
+                message += ''.join(
+                    DAILY_TRADE_ROW.format(emoji=emoji, action=action, amount=amount, price=price, reason=reason)
+                    for emoji, action, amount, price, reason in zip(
+                        emojis,
+                        today_trades['action'].to_numpy(),
+                        today_trades['amount'].to_numpy(),
+                        today_trades['price'].to_numpy(),
+                        today_trades['reason'].to_numpy()
+                    )
+                )
             
             # Add strategy recommendation
             strategy_result = self.execute_gemma_strategy()
@@ -482,10 +859,8 @@ class RealTradingSystem:
             return False
 
     def save_trade_to_history(self, trade_data):
-        """Save every trade to CSV for dashboard"""
+        """Record a trade for the dashboard; it is buffered and written by flush_history"""
         try:
-            file_path = 'data/real_trading_history.csv'
-            
             trade_record = {
                 'timestamp': datetime.now().isoformat(),
                 'action': trade_data['action'],
@@ -499,11 +874,7 @@ class RealTradingSystem:
                 'data_source': 'Binance'
             }
             
-            df = pd.DataFrame([trade_record])
-            if os.path.exists(file_path):
-                df.to_csv(file_path, mode='a', header=False, index=False)
-            else:
-                df.to_csv(file_path, index=False)
+            self._trade_buffer.append(trade_record)
                 
             # Save portfolio state after each trade
             self.save_portfolio_state()
@@ -513,6 +884,80 @@ class RealTradingSystem:
         except Exception as e:
             print(f"❌ Error saving trade: {e}")
 
+    def _trades_signature(self):
+        """(path, mtime, size) of the saved trade history, or None when there is none yet"""
+        path = TRADES_DATASET_PATH if os.path.isdir(TRADES_DATASET_PATH) else TRADES_CSV_PATH
+        try:
+            st = os.stat(path)
+            return (path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def load_trades(self):
+        """All trades so far, indexed by time: the saved history plus the ones still buffered.
+        The saved history is only read again when its file or directory has changed"""
+        sig = self._trades_signature()
+        
+        if self._trades_cache is None or sig != self._trades_sig:
+            if sig is None:
+                self._trades_cache = pd.DataFrame()
+            elif sig[0] == TRADES_DATASET_PATH:
+                self._trades_cache = index_trades_by_time(pd.read_parquet(TRADES_DATASET_PATH, engine='pyarrow'))
+            else:
+                self._trades_cache = index_trades_by_time(pd.read_csv(TRADES_CSV_PATH))
+            self._trades_sig = sig
+        
+        trades_df = self._trades_cache
+        if self._trade_buffer:
+            buffered = index_trades_by_time(pd.DataFrame(self._trade_buffer))
+            trades_df = pd.concat([trades_df, buffered]) if len(trades_df) else buffered
+        return trades_df
+
+    def latest_portfolio_value(self):
+        """total_value of the newest snapshot, including ones not written out yet"""
+        if self._portfolio_buffer:
+            return self._portfolio_buffer[-1]['total_value']
+        return last_portfolio_value()
+
+    def flush_history(self):
+        """Write buffered trades as one new Parquet part and one CSV append, and buffered
+        portfolio snapshots as one new Parquet part. A buffer is cleared as soon as its part
+        is written, so a failed compaction or CSV append never writes the same rows twice"""
+        if self._portfolio_buffer:
+            try:
+                append_dataset_part(PORTFOLIO_DATASET_PATH, self._portfolio_buffer, PORTFOLIO_HISTORY_SCHEMA, PORTFOLIO_CSV_PATH)
+                self._portfolio_buffer = []
+            except Exception as e:
+                print(f"❌ Error saving portfolio history: {e}")
+            self._compact_history(PORTFOLIO_DATASET_PATH)
+        
+        if not self._trade_buffer:
+            return
+        trades = self._trade_buffer
+        try:
+            append_dataset_part(TRADES_DATASET_PATH, trades, TRADE_HISTORY_SCHEMA, TRADES_CSV_PATH)
+            self._trade_buffer = []
+            print(f"✅ Saved {len(trades)} trades to history")
+        except Exception as e:
+            print(f"❌ Error saving trade history: {e}")
+            return
+        self._compact_history(TRADES_DATASET_PATH)
+        
+        try:
+            df = pd.DataFrame(trades)
+            df.to_csv(TRADES_CSV_PATH, mode='a', header=not os.path.exists(TRADES_CSV_PATH), index=False)
+        except Exception as e:
+            print(f"❌ Error appending trades to {TRADES_CSV_PATH}: {e}")
+
+    def _compact_history(self, path):
+        """compact_dataset, logging a failure (the parts stay valid and the next flush retries)"""
+        if not os.path.isdir(path):
+            return
+        try:
+            compact_dataset(path)
+        except Exception as e:
+            print(f"⚠️ Error compacting {path}: {e}")
+
     def check_price_drop_dca(self):
         """Check for price drop and execute DCA if triggered"""
         price_drop_percent = ((self.previous_price - self.current_price) / self.previous_price) * 100
@@ -545,58 +990,80 @@ Portfolio: {self.portfolio['btc']:.2f} BTC (${btc_value:,.0f})"""
         
         return False
 
+    def dca_signals(self, data):
+        """Vectorized DCA trigger: True on every bar whose close dropped at least dca_drop_percent
+        from the previous close (the first bar never triggers). Cash is not checked here,
+        since that depends on the trades replayed before each bar"""
+        close = np.asarray(data['close'], dtype=np.float64)
+        triggers = np.zeros(len(close), dtype=bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            triggers[1:] = (close[:-1] - close[1:]) / close[:-1] * 100 >= self.dca_drop_percent
+        return pd.Series(triggers, index=getattr(data, 'index', None))
+
+    def gemma_signals(self, data, has_btc=True):
+        """Vectorized Gemma strategy: a GEMMA_SIGNALS code for every bar of an indicator frame
+        (SMA_50, SMA_200, RSI_14, MACD, ATR_14 columns); has_btc may be a bool or a per-bar array"""
+        sma50 = np.asarray(data['SMA_50'], dtype=np.float64)
+        sma200 = np.asarray(data['SMA_200'], dtype=np.float64)
+        rsi = np.asarray(data['RSI_14'], dtype=np.float64)
+        macd = np.asarray(data['MACD'], dtype=np.float64)
+        atr = np.asarray(data['ATR_14'], dtype=np.float64)
+        bull = sma50 > sma200
+        bear = sma50 < sma200
+        neutral = ~(bull | bear)
+        
+        # Same precedence as the original if/elif chain
+        conditions = [
+            atr > self.atr_high,
+            bull & (rsi < 40),
+            bull & (macd > 0) & (rsi > 50),
+            bull,
+            bear & (rsi > 60) & has_btc,
+            bear & (macd < 0) & (rsi < 50),
+            bear,
+            neutral & (rsi < 35),
+            neutral & (rsi > 65),
+        ]
+        codes = np.select(conditions, np.arange(len(conditions), dtype=np.int8), default=GEMMA_NEUTRAL).astype(np.int8)
+        return pd.Series(codes, index=getattr(data, 'index', None))
+
     def execute_gemma_strategy(self):
-        """Execute Gemma trading strategy"""
-        price = self.current_price
-        sma50 = self.indicators['sma50']
-        sma200 = self.indicators['sma200']
-        macd = self.indicators['macd']
-        rsi = self.indicators['rsi']
-        atr = self.indicators['atr']
-        
-        strat_action = "HOLD"
-        strat_percent = 0.0
-        reason = ""
-
-        # Force some trades for testing if no trades exist
+        """Execute Gemma trading strategy on the latest indicators. The decision is reused
+        until the price, indicators, BTC holding or trade history change"""
+        key = (self.current_price, tuple(self.indicators.items()), self.portfolio['btc'] > 0,
+               self._trades_signature(), len(self._trade_buffer))
+        if key == self._gemma_cache_key:
+            result = self._gemma_cache
+            print(f"🎯 Strategy Decision: {result['action']} {result['percent']}% - {result['reason']}")
+            return dict(result)
+        
         try:
-            trades_df = pd.read_csv('data/real_trading_history.csv')
+            trades_df = self.load_trades()
             if len(trades_df) < 2:  # If less than 2 trades, force some
-                strat_action, strat_percent, reason = "BUY", 10, "Initial portfolio setup"
-            elif atr > self.atr_high:
-                strat_action, strat_percent, reason = "HOLD", 0, "High volatility - too risky"
-            elif sma50 > sma200:
-                if rsi < 40:
-                    strat_action, strat_percent, reason = "BUY", 15, "Bull market & RSI oversold"
-                elif macd > 0 and rsi > 50:
-                    strat_action, strat_percent, reason = "BUY", 10, "Bull market & momentum up"
-                else:
-                    strat_action, strat_percent, reason = "HOLD", 0, "Bull market but waiting"
-            elif sma50 < sma200:
-                if rsi > 60 and self.portfolio['btc'] > 0:
-                    strat_action, strat_percent, reason = "SELL", 15, "Bear market & RSI overbought"
-                elif macd < 0 and rsi < 50:
-                    strat_action, strat_percent, reason = "SELL", 10, "Bear market & momentum down"
-                else:
-                    strat_action, strat_percent, reason = "HOLD", 0, "Bear market but waiting"
+                strat_action, strat_percent, reason = GEMMA_INITIAL_BUY
             else:
-                if rsi < 35:
-                    strat_action, strat_percent, reason = "BUY", 5, "RSI very oversold"
-                elif rsi > 65:
-                    strat_action, strat_percent, reason = "SELL", 5, "RSI very overbought" 
-                else:
-                    strat_action, strat_percent, reason = "HOLD", 0, "Market neutral - no clear signal"
+                latest = {
+                    'SMA_50': [self.indicators['sma50']],
+                    'SMA_200': [self.indicators['sma200']],
+                    'RSI_14': [self.indicators['rsi']],
+                    'MACD': [self.indicators['macd']],
+                    'ATR_14': [self.indicators['atr']]
+                }
+                code = self.gemma_signals(latest, has_btc=self.portfolio['btc'] > 0).iloc[0]
+                strat_action, strat_percent, reason = GEMMA_SIGNALS[code]
         except:
             # If no trade file exists, force initial trade
-            strat_action, strat_percent, reason = "BUY", 10, "Initial portfolio setup"
+            strat_action, strat_percent, reason = GEMMA_INITIAL_BUY
 
         print(f"🎯 Strategy Decision: {strat_action} {strat_percent}% - {reason}")
         
-        return {
+        self._gemma_cache_key = key
+        self._gemma_cache = {
             'action': strat_action,
             'percent': strat_percent,
             'reason': reason
         }
+        return dict(self._gemma_cache)
 
     def execute_strategy_trade(self, strategy_result):
         """Execute trade based on strategy decision"""
@@ -682,7 +1149,7 @@ Portfolio:
 
 Current Price: ${self.current_price:,.0f}
 Initial Portfolio: ${self.portfolio['cash']:,.0f}"""
-        self.send_telegram_alert(startup_msg)
+        startup = self._io_pool.submit(self.send_telegram_alert, startup_msg)
         
         try:
             print("\n1. Checking Price Drop → DCA Buy...")
@@ -699,29 +1166,35 @@ Initial Portfolio: ${self.portfolio['cash']:,.0f}"""
             
             print("\n4. Saving final portfolio state...")
             self.save_portfolio_state()
+            self.flush_history()
             
-            # Send daily report
+            # Send daily report and the final message together (the report reads the saved state)
             print("\n5. Sending Daily Gmail Report...")
-            self.send_daily_report()
-            
             final_msg = f"""🎉 TRADING COMPLETED
 
 Final Portfolio: ${self.portfolio['total_value']:,.0f}
 BTC Holdings: {self.portfolio['btc']:.4f} BTC
 Strategy: {strategy_result['action']} - {strategy_result['reason']}"""
             
-            self.send_telegram_alert(final_msg)
+            pending = [
+                startup,
+                self._io_pool.submit(self.send_daily_report),
+                self._io_pool.submit(self.send_telegram_alert, final_msg)
+            ]
+            for future in as_completed(pending):
+                future.result()
             print("\n🎉 Trading system completed successfully!")
             print("📊 Data saved for dashboard!")
             return True
             
         except Exception as e:
             print(f"❌ System error: {e}")
+            self.flush_history()
             error_msg = f"❌ Trading system error: {str(e)}"
             self.send_telegram_alert(error_msg)
             return False
 
 # Test the system
 if __name__ == "__main__":
-    system = RealTradingSystem()
-    system.run_complete_system()
\ No newline at end of file
+    with RealTradingSystem() as system:
+        system.run_complete_system()
\ No newline at end of file